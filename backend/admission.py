@@ -0,0 +1,143 @@
+"""
+Admission Control for FraudGuard Lite
+Keeps /api/risk-score answering within a latency budget under overload.
+Every request gets a deadline: the X-Deadline-Ms header, or the server
+default. When scoring starts, the controller decides whether the full
+model can still meet it, from the time left, the recent p99 of full
+scoring and how many requests are in flight. If not, the request is
+answered by the cheap fallback scorer and marked degraded, instead of
+queueing behind slower work (a cached decision is still returned first).
+
+Degradation reasons:
+    overload   more requests in flight than max_in_flight
+    deadline   the budget ran out while the request was queued
+    latency    the recent p99 of full scoring exceeds the time left
+
+While the p99 is over budget, one request in probe_every still runs the
+full model, and latency samples expire after window seconds, so the
+controller notices when load drops.
+"""
+
+import threading
+import time
+from collections import Counter, deque
+
+DEADLINE_HEADER = 'X-Deadline-Ms'
+
+DEFAULT_DEADLINE_MS = 250
+MAX_IN_FLIGHT = 64
+
+# Seconds of full-scoring latencies the p99 is taken over, and the most kept
+WINDOW = 10.0
+MAX_SAMPLES = 2048
+
+# While the p99 is over budget, one request in this many still runs the full model
+PROBE_EVERY = 20
+
+REASONS = ('overload', 'deadline', 'latency')
+
+
+class AdmissionController:
+    """Decides per request whether the full model runs or the fallback answers"""
+
+    def __init__(self, default_deadline_ms=DEFAULT_DEADLINE_MS, max_in_flight=MAX_IN_FLIGHT,
+                 window=WINDOW, probe_every=PROBE_EVERY):
+        self.default_deadline = default_deadline_ms / 1000
+        self.max_in_flight = max_in_flight
+        self.window = window
+        self.probe_every = probe_every
+        self.in_flight = 0
+        self.admitted = 0
+        self.degraded = Counter()
+        self._samples = deque(maxlen=MAX_SAMPLES)     # (finished at, seconds)
+        self._p99 = None
+        self._p99_at = 0.0
+        self._over_budget = 0
+        self._lock = threading.Lock()
+
+    def deadline(self, header=None, now=None):
+        """Monotonic deadline of a request arriving now with a deadline header value (ms)"""
+        now = time.monotonic() if now is None else now
+        try:
+            budget = float(header) / 1000 if header not in (None, '') else self.default_deadline
+        except ValueError:
+            budget = self.default_deadline
+        return now + (budget if budget > 0 else self.default_deadline)
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def overloaded(self):
+        return self.in_flight >= self.max_in_flight
+
+    def check(self, deadline, now=None):
+        """
+        None if the full model should score a request due at deadline,
+        else the reason to degrade it (counted)
+        """
+        now = time.monotonic() if now is None else now
+        remaining = deadline - now
+        with self._lock:
+            reason = None
+            if self.in_flight > self.max_in_flight:
+                reason = 'overload'
+            elif remaining <= 0:
+                reason = 'deadline'
+            else:
+                p99 = self._current_p99(now)
+                if p99 is not None and p99 > remaining:
+                    self._over_budget += 1
+                    if self._over_budget % self.probe_every:
+                        reason = 'latency'
+            if reason is None:
+                self.admitted += 1
+            else:
+                self.degraded[reason] += 1
+        return reason
+
+    def shed(self, reason='overload'):
+        """Count a request degraded before it was queued"""
+        with self._lock:
+            self.degraded[reason] += 1
+
+    def observe(self, seconds, now=None):
+        """Record how long a full-model scoring took"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._samples.append((now, seconds))
+
+    def _current_p99(self, now):
+        # Recomputed at most every 100ms; a sort of a few thousand floats
+        if now - self._p99_at < 0.1:
+            return self._p99
+        samples = self._samples
+        while samples and samples[0][0] < now - self.window:
+            samples.popleft()
+        if samples:
+            latencies = sorted(seconds for _, seconds in samples)
+            self._p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        else:
+            self._p99 = None
+        self._p99_at = now
+        return self._p99
+
+    def p99(self, now=None):
+        """Recent p99 of full scoring in seconds, or None without recent samples"""
+        with self._lock:
+            return self._current_p99(time.monotonic() if now is None else now)
+
+    def stats(self):
+        p99 = self.p99()
+        return {
+            "default_deadline_ms": round(self.default_deadline * 1000, 3),
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "degraded": {reason: self.degraded[reason] for reason in REASONS},
+            "p99_ms": round(p99 * 1000, 3) if p99 is not None else None
+        }
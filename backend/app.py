@@ -3,76 +3,260 @@ from flask_cors import CORS
 from datetime import datetime
 import random
 import json
+import hmac
 import os
+import time
+import atexit
+import numpy as np
 from synthetic_data import generate_transaction_history
+from admission import AdmissionController, DEADLINE_HEADER
+from ml_model import fraud_detector, MODEL_PATH
+from decision_cache import DecisionCache, IDEMPOTENCY_HEADER
+from decision_log import DecisionLog
+from decision_stream import DecisionBroadcaster
+from kv_profile_store import KVProfileStore
+from model_registry import ModelRegistry
+from parallel_scoring import ParallelScorer
+from reputation import ReputationTracker
+from shadow import RequestRecorder, ShadowScorer, load_model
+from sharding import HashRing, parse_shards
+from transaction_store import TransactionStore
+import metrics
+import rule_engine
+from transaction_stream import iter_transactions, train_from_file
+from velocity import VelocityTracker
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
 
+# Per-user velocity counters, shared by every model the registry activates
+if os.environ.get('FRAUDGUARD_VELOCITY', '1') not in ('0', 'false', 'off'):
+    fraud_detector.velocity = VelocityTracker(
+        max_users=int(os.environ.get('FRAUDGUARD_VELOCITY_MAX_USERS', 1000000)))
+
+# Population-wide device/merchant/location reputation (a loaded snapshot may bring its own)
+if os.environ.get('FRAUDGUARD_REPUTATION', '1') not in ('0', 'false', 'off'):
+    if fraud_detector.reputation is None:
+        fraud_detector.reputation = ReputationTracker()
+else:
+    fraud_detector.reputation = None
+
+# Shared profile store, so every worker and node scores against the same profiles
+PROFILE_URL = os.environ.get('FRAUDGUARD_PROFILE_URL')
+if PROFILE_URL:
+    profile_backend = fraud_detector.profile_backend = KVProfileStore.from_url(
+        PROFILE_URL, ttl=float(os.environ.get('FRAUDGUARD_PROFILE_TTL', 30)))
+    
+    def _profile_backend_metrics():
+        return {('fraudguard_profile_fallbacks_total', ()): profile_backend.fallbacks}
+    
+    metrics.describe('fraudguard_profile_fallbacks_total', 'counter',
+                     'Profile lookups answered from stale or default profiles because the store was unreachable')
+    metrics.register_collector(_profile_backend_metrics)
+
+# Sharded mode: this node serves the users FRAUDGUARD_SHARDS' hash ring assigns to FRAUDGUARD_SHARD
+SHARD = os.environ.get('FRAUDGUARD_SHARD')
+shard_ring = HashRing(parse_shards(os.environ.get('FRAUDGUARD_SHARDS', SHARD))) if SHARD else None
+
+# Without a snapshot, train at startup on an export (just this shard's users when sharded)
+TRAIN_PATH = os.environ.get('FRAUDGUARD_TRAIN_PATH')
+if TRAIN_PATH and not fraud_detector.is_trained:
+    train_from_file(fraud_detector, TRAIN_PATH, keep=shard_ring.owns(SHARD) if shard_ring is not None else None)
+    print(f"✅ Trained on {len(fraud_detector.user_profiles):,} users from {TRAIN_PATH}" +
+          (f" (shard {SHARD})" if SHARD else ""))
+
+# Active fraud model; retrained snapshots are swapped in without downtime
+HOLDOUT_PATH = os.environ.get('FRAUDGUARD_HOLDOUT_PATH')
+registry = ModelRegistry(
+    fraud_detector,
+    holdout=list(iter_transactions(HOLDOUT_PATH)) if HOLDOUT_PATH else None,
+    min_accuracy=float(os.environ.get('FRAUDGUARD_MIN_ACCURACY', 0))
+)
+
+# Model and rules admin endpoints need this token in the X-Admin-Token header; without one they are off
+ADMIN_TOKEN = os.environ.get('FRAUDGUARD_ADMIN_TOKEN')
+ADMIN_HEADER = 'X-Admin-Token'
+
+# The only directory /api/model/reload loads snapshots from, by file name
+MODEL_DIR = os.environ.get('FRAUDGUARD_MODEL_DIR') or (os.path.dirname(os.path.abspath(MODEL_PATH)) if MODEL_PATH else None)
+
+# The only directory /api/rules/reload reads rule files from, by file name
+RULES_DIR = os.environ.get('FRAUDGUARD_RULES_DIR') or os.path.dirname(os.path.abspath(rule_engine.RULES_PATH))
+
+def admin_allowed(token):
+    """Whether a request's admin token matches FRAUDGUARD_ADMIN_TOKEN"""
+    return bool(ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+def admin_file(directory, name):
+    """Path of the file called name directly inside directory; raises ValueError for anything else"""
+    if not directory or not name or name != os.path.basename(name) or name in ('.', '..'):
+        raise ValueError("Expected a file name from the configured directory")
+    root = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.dirname(path) != root or not os.path.isfile(path):
+        raise ValueError(f"No such file: {name}")
+    return path
+
+# Recent decisions, so client retries and duplicate submissions aren't rescored
+decision_cache = None
+if os.environ.get('FRAUDGUARD_DECISION_CACHE', '1') not in ('0', 'false', 'off'):
+    decision_cache = DecisionCache(
+        max_size=int(os.environ.get('FRAUDGUARD_DECISION_CACHE_SIZE', 100000)),
+        ttl=float(os.environ.get('FRAUDGUARD_DECISION_CACHE_TTL', 60)))
+    
+    def _decision_cache_metrics():
+        stats = decision_cache.stats()
+        return {
+            ('fraudguard_decision_cache_total', (('result', 'hit'),)): stats['hits'] + stats['idempotent_hits'],
+            ('fraudguard_decision_cache_total', (('result', 'miss'),)): stats['misses'],
+            ('fraudguard_decision_cache_evictions_total', ()): stats['evictions'],
+            ('fraudguard_decision_cache_entries', ()): stats['size'],
+        }
+    
+    metrics.describe('fraudguard_decision_cache_total', 'counter', 'Decision cache lookups by result')
+    metrics.describe('fraudguard_decision_cache_evictions_total', 'counter', 'Decisions evicted from the cache')
+    metrics.describe('fraudguard_decision_cache_entries', 'gauge', 'Decisions currently cached')
+    metrics.register_collector(_decision_cache_metrics)
+
+# Deadline-aware admission: under overload /api/risk-score degrades to the fallback scorer
+admission = None
+if os.environ.get('FRAUDGUARD_ADMISSION', '1') not in ('0', 'false', 'off'):
+    admission = AdmissionController(
+        default_deadline_ms=float(os.environ.get('FRAUDGUARD_DEADLINE_MS', 250)),
+        max_in_flight=int(os.environ.get('FRAUDGUARD_MAX_IN_FLIGHT', 64)))
+    
+    def _admission_metrics():
+        stats = admission.stats()
+        values = {('fraudguard_requests_degraded_total', (('reason', reason),)): count
+                  for reason, count in stats['degraded'].items()}
+        values[('fraudguard_requests_admitted_total', ())] = stats['admitted']
+        values[('fraudguard_requests_in_flight', ())] = stats['in_flight']
+        return values
+    
+    metrics.describe('fraudguard_requests_degraded_total', 'counter', 'Risk-score requests answered by the fallback scorer')
+    metrics.describe('fraudguard_requests_admitted_total', 'counter', 'Risk-score requests scored by the full model')
+    metrics.describe('fraudguard_requests_in_flight', 'gauge', 'Risk-score requests queued or being scored')
+    metrics.register_collector(_admission_metrics)
+
+# Optional process pool for large batches of snapshot-backed models
+SCORING_PROCESSES = int(os.environ.get('FRAUDGUARD_SCORING_PROCESSES', 0))
+parallel_scorer = ParallelScorer(SCORING_PROCESSES) if SCORING_PROCESSES > 1 else None
+
+# Optional recording of /api/risk-score payloads, for replaying through candidate models
+RECORD_DIR = os.environ.get('FRAUDGUARD_RECORD_DIR')
+recorder = None
+if RECORD_DIR:
+    # One file sequence per process, so workers never interleave writes
+    recorder = RequestRecorder(
+        RECORD_DIR, max_bytes=int(os.environ.get('FRAUDGUARD_RECORD_MAX_BYTES', 64 * 1024 * 1024)),
+        prefix=f"requests-{os.getpid()}")
+
+# Optional candidate model scored in the background on live traffic
+SHADOW_MODEL_PATH = os.environ.get('FRAUDGUARD_SHADOW_MODEL')
+shadow_scorer = None
+if SHADOW_MODEL_PATH:
+    candidate = load_model(SHADOW_MODEL_PATH, os.environ.get('FRAUDGUARD_SHADOW_RULES'))
+    # The candidate keeps its own velocity counters, fed the same request stream
+    if fraud_detector.velocity is not None:
+        candidate.velocity = VelocityTracker(max_users=fraud_detector.velocity.max_users)
+    if fraud_detector.reputation is not None and candidate.reputation is None:
+        candidate.reputation = ReputationTracker()
+    shadow_scorer = ShadowScorer(candidate, queue_size=int(os.environ.get('FRAUDGUARD_SHADOW_QUEUE', 10000)))
+
+# Scored transactions, for the dashboard's history
+HISTORY_PATH = os.environ.get('FRAUDGUARD_HISTORY_PATH', 'fraudguard_history.db')
+HISTORY_PARAMS = ('user_id', 'status', 'min_risk', 'max_risk', 'cursor', 'limit')
+history = TransactionStore(HISTORY_PATH)
+
+# Decisions reach the history store through a write-behind queue, off the request path
+decision_log = DecisionLog(
+    history,
+    max_queue=int(os.environ.get('FRAUDGUARD_DECISION_LOG_QUEUE', 100000)),
+    batch_size=int(os.environ.get('FRAUDGUARD_DECISION_LOG_BATCH', 1000)),
+    flush_interval=float(os.environ.get('FRAUDGUARD_DECISION_LOG_INTERVAL', 0.5)),
+    policy=os.environ.get('FRAUDGUARD_DECISION_LOG_POLICY', 'drop'))
+
+def _decision_log_metrics():
+    stats = decision_log.stats()
+    return {
+        ('fraudguard_decision_log_total', (('result', 'written'),)): stats['written'],
+        ('fraudguard_decision_log_total', (('result', 'dropped'),)): stats['dropped'],
+        ('fraudguard_decision_log_total', (('result', 'error'),)): stats['errors'],
+        ('fraudguard_decision_log_queued', ()): stats['queued'],
+    }
+
+metrics.describe('fraudguard_decision_log_total', 'counter', 'Logged decisions by outcome')
+metrics.describe('fraudguard_decision_log_queued', 'gauge', 'Decisions waiting to be written')
+metrics.register_collector(_decision_log_metrics)
+
+# New single-endpoint decisions are pushed to dashboards over /api/stream/decisions (asgi.py)
+decision_stream = DecisionBroadcaster(
+    history_size=int(os.environ.get('FRAUDGUARD_STREAM_HISTORY', 1024)),
+    buffer_size=int(os.environ.get('FRAUDGUARD_STREAM_BUFFER', 256)))
+
+def _decision_stream_metrics():
+    stats = decision_stream.stats()
+    return {
+        ('fraudguard_stream_subscribers', ()): stats['subscribers'],
+        ('fraudguard_stream_events_total', ()): stats['published'],
+        ('fraudguard_stream_evictions_total', ()): stats['evicted'],
+    }
+
+metrics.describe('fraudguard_stream_subscribers', 'gauge', 'Open decision stream connections')
+metrics.describe('fraudguard_stream_events_total', 'counter', 'Decisions pushed to the decision stream')
+metrics.describe('fraudguard_stream_evictions_total', 'counter', 'Stream subscribers dropped for falling behind')
+metrics.register_collector(_decision_stream_metrics)
+
+def shutdown():
+    """Write out queued decisions and close recordings"""
+    decision_log.close()
+    if recorder is not None:
+        recorder.close()
+
+atexit.register(shutdown)
+
 # Mock user database (in real app, use a real DB)
 users = {
     "sarah123": {"normal_hours": [9, 21], "avg_amount": 85.0, "usual_device": "iPhone"},
     "john_doe": {"normal_hours": [18, 23], "avg_amount": 120.0, "usual_device": "Windows_PC"}
 }
+DEFAULT_USER_PROFILE = {"normal_hours": [9, 17], "avg_amount": 100.0}
 
 def calculate_risk_score(user_id, transaction_data):
     """Calculate risk score based on transaction behavior"""
-    risk_score = 0
-    reasons = []
+    timer = metrics.timer("calculate_risk_score")
+    rules = rule_engine.engine.active.rulesets['calculate_risk_score']
     
-    if user_id not in users:
-        risk_score += 40
-        reasons.append("Unknown user profile")
-        user_profile = {"normal_hours": [9, 17], "avg_amount": 100.0}
-    else:
-        user_profile = users[user_id]
+    known_user = user_id in users
+    user_profile = users[user_id] if known_user else DEFAULT_USER_PROFILE
+    if timer is not None:
+        timer.mark("profile_lookup")
     
-    # 1. Time anomaly check (30 points max)
-    current_hour = datetime.now().hour
+    # Features the rules are written against (see rules.json)
     normal_start, normal_end = user_profile["normal_hours"]
-    
-    if not (normal_start <= current_hour <= normal_end):
-        time_risk = min(30, abs(current_hour - normal_start) * 3)
-        risk_score += time_risk
-        reasons.append(f"Transaction outside normal hours (user usually shops between {normal_start}:00-{normal_end}:00)")
-    
-    # 2. Amount anomaly (40 points max)
-    amount = transaction_data.get("amount", 0)
-    avg_amount = user_profile.get("avg_amount", 100)
-    
-    if amount > avg_amount * 2:
-        amount_risk = min(40, (amount / avg_amount) * 10)
-        risk_score += amount_risk
-        reasons.append(f"Amount (${amount}) is significantly higher than average (${avg_amount})")
-    
-    # 3. Device check (20 points max)
     device = transaction_data.get("device", "unknown")
     usual_device = user_profile.get("usual_device", "")
     
-    if device != usual_device and usual_device:
-        risk_score += 20
-        reasons.append(f"New device detected: {device} (usual: {usual_device})")
-    
-    # 4. Typing speed anomaly (10 points max)
-    typing_speed = transaction_data.get("typing_speed", 0)
-    if typing_speed > 150 or typing_speed < 20:
-        risk_score += 10
-        reasons.append("Unusual typing pattern detected")
-    
-    # Cap at 100
-    risk_score = min(100, risk_score)
-    
-    # Determine status
-    if risk_score < 30:
-        status = "APPROVED"
-        color = "green"
-    elif risk_score < 70:
-        status = "REVIEW_NEEDED"
-        color = "orange"
-    else:
-        status = "BLOCKED"
-        color = "red"
+    hits = [] if timer is not None else None
+    risk_score, reasons = rules.scorers[rule_engine.NO_GROUPS](
+        hits,
+        known_user=known_user,
+        hour=datetime.now().hour,
+        normal_start=normal_start,
+        normal_end=normal_end,
+        amount=transaction_data.get("amount", 0),
+        avg_amount=user_profile.get("avg_amount", 100),
+        typing_speed=transaction_data.get("typing_speed", 0),
+        device_changed=bool(usual_device) and device != usual_device,
+        device=device,
+        usual_device=usual_device)
+    status, color = rules.status(risk_score)
     
+    if timer is not None:
+        for rule in hits:
+            timer.hit(rule)
+        timer.mark("rules")
+        timer.finish(status)
     return {
         "risk_score": risk_score,
         "status": status,
@@ -81,38 +265,317 @@ def calculate_risk_score(user_id, transaction_data):
         "timestamp": datetime.now().isoformat()
     }
 
+def calculate_risk_score_batch(user_ids, transactions):
+    """
+    Calculate risk scores for many transactions at once.
+    Gives the same results as calling calculate_risk_score on each
+    transaction, with the rules evaluated over NumPy columns.
+    """
+    n = len(transactions)
+    if n == 0:
+        return []
+    rules = rule_engine.engine.active.rulesets['calculate_risk_score']
+    
+    current_hour = datetime.now().hour
+    timestamp = datetime.now().isoformat()
+    
+    # Per-user values, computed once for each distinct user in the batch
+    user_index = {}
+    row_user = np.empty(n, dtype=np.intp)
+    for i, user_id in enumerate(user_ids):
+        row_user[i] = user_index.setdefault(user_id, len(user_index))
+    
+    known = [user_id in users for user_id in user_index]
+    profiles = [users.get(user_id, DEFAULT_USER_PROFILE) for user_id in user_index]
+    avg_amounts = [profile.get("avg_amount", 100) for profile in profiles]
+    usual_devices = [profile.get("usual_device", "") for profile in profiles]
+    
+    amounts = [tx.get("amount", 0) for tx in transactions]
+    devices = [tx.get("device", "unknown") for tx in transactions]
+    typing_speeds = [tx.get("typing_speed", 0) for tx in transactions]
+    
+    # Devices as integer codes; -2 marks users without a usual device
+    device_index = {}
+    row_device = np.fromiter((device_index.setdefault(d, len(device_index)) for d in devices),
+                             dtype=np.intp, count=n)
+    usual_code = np.asarray([device_index.get(d, -1) if d else -2 for d in usual_devices],
+                            dtype=np.intp)[row_user]
+    
+    row_users = row_user.tolist()
+    hours = np.asarray([profile["normal_hours"] for profile in profiles], dtype=np.int64)
+    columns = {
+        "known_user": np.asarray(known, dtype=bool)[row_user],
+        "hour": np.full(n, current_hour),
+        "normal_start": hours[row_user, 0],
+        "normal_end": hours[row_user, 1],
+        "amount": np.asarray(amounts, dtype=np.float64),
+        "avg_amount": np.asarray(avg_amounts, dtype=np.float64)[row_user],
+        "typing_speed": np.asarray(typing_speeds, dtype=np.float64),
+        "device_changed": (usual_code != -2) & (row_device != usual_code)
+    }
+    # Values reasons print exactly as calculate_risk_score would
+    raw = {
+        "amount": amounts,
+        "avg_amount": [avg_amounts[u] for u in row_users],
+        "device": devices,
+        "usual_device": [usual_devices[u] for u in row_users]
+    }
+    risk, is_float, reasons = rules.evaluate_batch(n, columns, raw)
+    
+    # The single path keeps an int score unless a rule contributed a float;
+    # back to Python scalars, since indexing NumPy arrays element-wise is slow
+    results = []
+    for risk_score, as_float, row_reasons in zip(risk.tolist(), is_float.tolist(), reasons):
+        risk_score = risk_score if as_float else int(risk_score)
+        status, color = rules.status(risk_score)
+        results.append({
+            "risk_score": risk_score,
+            "status": status,
+            "color": color,
+            "reasons": row_reasons,
+            "timestamp": timestamp
+        })
+    
+    return results
+
+def score_transaction(user_id, transaction_data, idempotency_key=None, deadline=None, degrade=None):
+    """
+    Score with the active trained model, or the rule-based scorer without one.
+    Repeats of a recent transaction (or idempotency key) get the cached decision.
+    With a deadline (from admission.deadline()) the full model only runs if
+    it can still make it; otherwise, or with a degrade reason, the fallback
+    scorer answers and the result is marked degraded.
+    """
+    if recorder is not None:
+        recorder.record(transaction_data)
+    
+    model = registry.active
+    if decision_cache is not None:
+        key = decision_cache.key(model, user_id, transaction_data)
+        cached = decision_cache.get(key, user_id, idempotency_key)
+        if cached is not None:
+            return cached
+    
+    if not model.is_trained:
+        result = calculate_risk_score(user_id, transaction_data)
+    else:
+        if degrade is None and deadline is not None and admission is not None:
+            degrade = admission.check(deadline)
+        if degrade is not None:
+            # Not cached, so a retry once the load drops gets a full decision
+            result = model.predict_degraded(transaction_data, user_id)
+            result["timestamp"] = datetime.now().isoformat()
+            decision_log.append(user_id, transaction_data, result)
+            decision_stream.publish(user_id, transaction_data, result)
+            return result
+        started = time.perf_counter()
+        result = model.predict(transaction_data, user_id)
+        if admission is not None:
+            admission.observe(time.perf_counter() - started)
+        result["timestamp"] = datetime.now().isoformat()
+    
+    if decision_cache is not None:
+        decision_cache.put(key, result, user_id, idempotency_key)
+    decision_log.append(user_id, transaction_data, result)
+    decision_stream.publish(user_id, transaction_data, result)
+    if shadow_scorer is not None:
+        shadow_scorer.submit(user_id, transaction_data, result)
+    return result
+
+def degraded_decision(user_id, transaction_data):
+    """
+    The fallback scorer's decision, marked degraded, without the cache,
+    recorder, history or stream: it takes no locks and does no I/O, so an
+    event loop can answer with it while every scoring thread is busy.
+    record_degraded() does the rest.
+    """
+    result = registry.active.predict_degraded(transaction_data, user_id)
+    result["timestamp"] = datetime.now().isoformat()
+    return result
+
+def record_degraded(user_id, transaction_data, result, reason='overload'):
+    """Count, record, log and publish a decision from degraded_decision()"""
+    if admission is not None:
+        admission.shed(reason)
+    if recorder is not None:
+        recorder.record(transaction_data)
+    decision_log.append(user_id, transaction_data, result)
+    decision_stream.publish(user_id, transaction_data, result)
+
+def score_batch(user_ids, transactions):
+    """Batch counterpart of score_transaction"""
+    model = registry.active
+    if not model.is_trained:
+        results = calculate_risk_score_batch(user_ids, transactions)
+    else:
+        timestamp = datetime.now().isoformat()
+        if parallel_scorer is not None:
+            results = parallel_scorer.predict_batch(model, transactions, user_ids)
+        else:
+            results = model.predict_batch(transactions, user_ids)
+        for result in results:
+            result["timestamp"] = timestamp
+    
+    decision_log.extend(user_ids, transactions, results)
+    return results
+
 @app.route('/api/risk-score', methods=['POST'])
 def risk_score_endpoint():
     """API endpoint for risk assessment"""
+    timer = metrics.timer("http")
     data = request.json
     user_id = data.get('user_id', 'sarah123')
+    if timer is not None:
+        timer.mark("json_parse")
     
-    result = calculate_risk_score(user_id, data)
-    return jsonify(result)
+    deadline = None
+    if admission is not None:
+        deadline = admission.deadline(request.headers.get(DEADLINE_HEADER))
+        admission.enter()
+    try:
+        result = score_transaction(user_id, data, request.headers.get(IDEMPOTENCY_HEADER), deadline)
+    finally:
+        if admission is not None:
+            admission.leave()
+    if timer is not None:
+        timer.mark("scoring")
+    
+    response = jsonify(result)
+    if timer is not None:
+        timer.mark("serialize")
+        timer.finish(result["status"])
+    return response
+
+@app.route('/api/risk-score/batch', methods=['POST'])
+def risk_score_batch_endpoint():
+    """API endpoint for scoring many transactions in one request"""
+    data = request.json
+    transactions = data.get('transactions', [])
+    user_ids = [tx.get('user_id', 'sarah123') for tx in transactions]
+    
+    results = score_batch(user_ids, transactions)
+    return jsonify({"results": results, "count": len(results)})
+
+def model_details():
+    """Active model, when it was loaded, the version before it and cache stats"""
+    info = registry.info()
+    info["rules"] = rule_engine.engine.info()
+    info["decision_cache"] = decision_cache.stats() if decision_cache is not None else None
+    info["recorder"] = recorder.stats() if recorder is not None else None
+    info["decision_log"] = decision_log.stats()
+    info["admission"] = admission.stats() if admission is not None else None
+    info["decision_stream"] = decision_stream.stats()
+    info["shard"] = {"name": SHARD, "nodes": shard_ring.nodes} if shard_ring is not None else None
+    return info
+
+def shadow_report():
+    """Live shadow comparison so far, or None when no candidate is configured"""
+    return shadow_scorer.stats() if shadow_scorer is not None else None
+
+@app.route('/api/shadow', methods=['GET'])
+def shadow():
+    """Decision flips and score deltas of the shadow candidate against live traffic"""
+    report = shadow_report()
+    if report is None:
+        return jsonify({"error": "Shadow scoring is not enabled"}), 404
+    return jsonify(report)
+
+@app.route('/api/model/info', methods=['GET'])
+def model_info():
+    """Active model, when it was loaded and the version before it"""
+    return jsonify(model_details())
+
+def reload_model(name=None):
+    """
+    Start loading the snapshot called name in MODEL_DIR (the configured one
+    without a name) in the background; returns the name, or None if a load
+    is already running, and raises ValueError for other names
+    """
+    name = name or (os.path.basename(MODEL_PATH) if MODEL_PATH else None)
+    return name if registry.load(admin_file(MODEL_DIR, name)) else None
+
+def rollback_model():
+    """Swap the previous model back in; returns the active model's description, or None without one"""
+    if registry.rollback() is None:
+        return None
+    return registry.info()["active"]
+
+@app.route('/api/model/reload', methods=['POST'])
+def model_reload():
+    """Load a snapshot from FRAUDGUARD_MODEL_DIR in the background and swap it in once validated"""
+    if not admin_allowed(request.headers.get(ADMIN_HEADER)):
+        return jsonify({"error": "Admin token required"}), 403
+    data = request.get_json(silent=True) or {}
+    try:
+        name = reload_model(data.get('snapshot'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if name is None:
+        return jsonify({"error": "A model load is already in progress"}), 409
+    return jsonify({"loading": name}), 202
+
+@app.route('/api/model/rollback', methods=['POST'])
+def model_rollback():
+    """Swap the previous model back in"""
+    if not admin_allowed(request.headers.get(ADMIN_HEADER)):
+        return jsonify({"error": "Admin token required"}), 403
+    active = rollback_model()
+    if active is None:
+        return jsonify({"error": "No previous model to roll back to"}), 409
+    return jsonify({"active": active})
+
+def reload_rules(name=None):
+    """
+    Compile the rule file called name in RULES_DIR (the current one without
+    a name) and swap it in; raises ValueError for other names, and
+    RuleError keeping the old rules on failure
+    """
+    rules = rule_engine.engine.reload(admin_file(RULES_DIR, name) if name else None)
+    if decision_cache is not None:
+        # Cached decisions were made under the old rules
+        decision_cache.clear()
+    return rules.describe()
+
+@app.route('/api/rules/reload', methods=['POST'])
+def rules_reload():
+    """Recompile the risk rules from disk without a restart"""
+    if not admin_allowed(request.headers.get(ADMIN_HEADER)):
+        return jsonify({"error": "Admin token required"}), 403
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(reload_rules(data.get('file')))
+    except (ValueError, rule_engine.RuleError) as e:
+        return jsonify({"error": str(e)}), 400
+
+def _request_rng(seed=None):
+    """RNG for one request: the given seed (repeatable), else freshly random"""
+    return random.Random(seed)
+
+def transaction_history(params, if_none_match=None):
+    """
+    (etag, page) of scored transactions, newest first, for the request
+    parameters in HISTORY_PARAMS. page is None when if_none_match still
+    matches. Raises ValueError for invalid parameters.
+    """
+    query = history.query(**{name: params.get(name) for name in HISTORY_PARAMS})
+    return history.page(query, if_none_match)
 
 @app.route('/api/transactions', methods=['GET'])
 def get_transactions():
-    """Get recent transactions for dashboard"""
-    # Generate mock transaction history
-    transactions = []
-    for i in range(10):
-        amount = random.randint(20, 200)
-        risk = random.randint(0, 80) if i < 8 else random.randint(70, 95)
-        
-        transactions.append({
-            "id": i,
-            "amount": amount,
-            "merchant": ["Amazon", "Starbucks", "Walmart", "Netflix", "Uber"][i % 5],
-            "timestamp": f"2024-01-{15+i%10} 14:{30-i%30}:00",
-            "risk_score": risk,
-            "status": "APPROVED" if risk < 30 else "BLOCKED" if risk > 70 else "REVIEWED"
-        })
-    
-    return jsonify({"transactions": transactions})
+    """Scored transaction history for the dashboard (filters, cursor pagination, ETags)"""
+    try:
+        etag, page = transaction_history(request.args, request.headers.get('If-None-Match'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    response = jsonify(page) if page is not None else app.response_class(status=304)
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
-@app.route('/api/educational-tip', methods=['GET'])
-def get_tip():
-    """Get a random educational tip"""
+def educational_tip(seed=None):
+    """A random educational tip"""
+    rng = _request_rng(seed)
     tips = [
         "Gift cards are the #1 payment method requested by scammers.",
         "Legitimate companies will NEVER ask for payment via wire transfer or gift cards.",
@@ -122,10 +585,20 @@ def get_tip():
         "If an offer seems too good to be true, it probably is."
     ]
     
-    return jsonify({
-        "tip": random.choice(tips),
-        "category": ["Phishing", "Payment", "Account Security"][random.randint(0, 2)]
-    })
+    return {
+        "tip": rng.choice(tips),
+        "category": ["Phishing", "Payment", "Account Security"][rng.randint(0, 2)]
+    }
+
+@app.route('/api/educational-tip', methods=['GET'])
+def get_tip():
+    """Get a random educational tip"""
+    return jsonify(educational_tip(request.args.get('seed')))
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Scoring metrics in the Prometheus text format"""
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
 
 @app.route('/')
 def serve_frontend():
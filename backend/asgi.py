@@ -0,0 +1,355 @@
+"""
+ASGI Entry Point for FraudGuard Lite
+Serves the risk-score API on an asyncio event loop. Request bodies are
+read and responses written on the loop; scoring runs in a worker pool,
+so a slow client only holds a cheap coroutine, never a scoring slot.
+
+Production launch (one event loop per worker process):
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4 \\
+        --backlog 2048 --timeout-keep-alive 5 --limit-concurrency 2000 \\
+        --no-access-log
+
+`python asgi.py` starts the same configuration, read from the environment:
+
+    WEB_CONCURRENCY              worker processes (default: number of CPUs)
+    FRAUDGUARD_BACKLOG           listen backlog (default 2048)
+    FRAUDGUARD_KEEPALIVE         keep-alive timeout in seconds (default 5)
+    FRAUDGUARD_MAX_CONNECTIONS   open connections per worker before 503s (default 2000)
+    FRAUDGUARD_SCORING_THREADS   scoring threads per worker (default 4)
+
+Use about one worker per core; scoring threads only need to cover the
+time a request spends outside the GIL, so a handful is enough. Open
+/api/stream/decisions connections count towards FRAUDGUARD_MAX_CONNECTIONS,
+so raise it by the number of dashboards expected.
+"""
+
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+import metrics
+from admission import DEADLINE_HEADER
+from app import (ADMIN_HEADER, IDEMPOTENCY_HEADER, admin_allowed, admission, decision_stream, educational_tip,
+                 degraded_decision, model_details, record_degraded, reload_model, reload_rules, rollback_model,
+                 score_batch, score_transaction, shadow_report, shutdown, transaction_history)
+from decision_stream import RETRY_MS
+from rule_engine import RuleError
+
+SCORING_THREADS = int(os.environ.get('FRAUDGUARD_SCORING_THREADS', 4))
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+_executor = None
+
+
+class HTTPError(Exception):
+    """An error response raised by a route handler"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class RawResponse:
+    """A pre-encoded response body, sent as is"""
+
+    def __init__(self, body, content_type=b'application/json', status=200, headers=()):
+        self.body = body
+        self.content_type = content_type
+        self.status = status
+        self.headers = list(headers)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(SCORING_THREADS, thread_name_prefix="scoring")
+    return _executor
+
+
+async def _offload(func, *args):
+    """Run CPU-bound work in the scoring pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), func, *args)
+
+
+def _parse_json(body):
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise HTTPError(400, "Request body must be valid JSON")
+    if not isinstance(data, dict):
+        raise HTTPError(400, "Request body must be a JSON object")
+    return data
+
+
+def _score_one(body, idempotency_key=None, deadline=None):
+    timer = metrics.timer("http")
+    data = _parse_json(body)
+    if timer is not None:
+        timer.mark("json_parse")
+    result = score_transaction(data.get('user_id', 'sarah123'), data, idempotency_key, deadline)
+    if timer is None:
+        return result
+    timer.mark("scoring")
+    response = RawResponse(json.dumps(result).encode('utf-8'))
+    timer.mark("serialize")
+    timer.finish(result["status"])
+    return response
+
+
+def _score_many(body):
+    transactions = _parse_json(body).get('transactions', [])
+    user_ids = [tx.get('user_id', 'sarah123') for tx in transactions]
+    results = score_batch(user_ids, transactions)
+    return {"results": results, "count": len(results)}
+
+
+async def risk_score(body, headers, query):
+    """API endpoint for risk assessment"""
+    idempotency_key = headers.get(IDEMPOTENCY_HEADER.lower())
+    if admission is None:
+        return await _offload(_score_one, body, idempotency_key)
+    if admission.overloaded():
+        # The fallback scorer is cheap enough to answer here, without waiting for a scoring thread;
+        # the bookkeeping takes locks the scoring threads hold, so it goes to the pool unawaited
+        data = _parse_json(body)
+        user_id = data.get('user_id', 'sarah123')
+        result = degraded_decision(user_id, data)
+        asyncio.get_running_loop().run_in_executor(_get_executor(), record_degraded, user_id, data, result)
+        return result
+    deadline = admission.deadline(headers.get(DEADLINE_HEADER.lower()))
+    admission.enter()
+    try:
+        return await _offload(_score_one, body, idempotency_key, deadline)
+    finally:
+        admission.leave()
+
+
+async def risk_score_batch(body, headers, query):
+    """API endpoint for scoring many transactions in one request"""
+    return await _offload(_score_many, body)
+
+
+def _history_page(query, if_none_match):
+    try:
+        etag, page = transaction_history(query, if_none_match)
+    except ValueError as e:
+        raise HTTPError(400, str(e))
+    cache_headers = [(b'etag', etag.encode('latin-1')), (b'cache-control', b'no-cache')]
+    if page is None:
+        return RawResponse(b'', status=304, headers=cache_headers)
+    return RawResponse(json.dumps(page).encode('utf-8'), headers=cache_headers)
+
+
+async def transactions(body, headers, query):
+    """Scored transaction history for the dashboard (filters, cursor pagination, ETags)"""
+    return await _offload(_history_page, query, headers.get('if-none-match'))
+
+
+async def tip(body, headers, query):
+    """Get a random educational tip"""
+    return educational_tip(query.get('seed'))
+
+
+async def model_info(body, headers, query):
+    """Active model, when it was loaded and the version before it"""
+    return model_details()
+
+
+async def shadow(body, headers, query):
+    """Decision flips and score deltas of the shadow candidate against live traffic"""
+    report = shadow_report()
+    if report is None:
+        raise HTTPError(404, "Shadow scoring is not enabled")
+    return report
+
+
+async def model_reload(body, headers, query):
+    """Load a snapshot from FRAUDGUARD_MODEL_DIR in the background and swap it in once validated"""
+    if not admin_allowed(headers.get(ADMIN_HEADER.lower())):
+        raise HTTPError(403, "Admin token required")
+    name = _parse_json(body).get('snapshot') if body else None
+    try:
+        name = await _offload(reload_model, name)
+    except ValueError as e:
+        raise HTTPError(400, str(e))
+    if name is None:
+        raise HTTPError(409, "A model load is already in progress")
+    return RawResponse(json.dumps({"loading": name}).encode('utf-8'), status=202)
+
+
+async def model_rollback(body, headers, query):
+    """Swap the previous model back in"""
+    if not admin_allowed(headers.get(ADMIN_HEADER.lower())):
+        raise HTTPError(403, "Admin token required")
+    active = await _offload(rollback_model)
+    if active is None:
+        raise HTTPError(409, "No previous model to roll back to")
+    return {"active": active}
+
+
+async def rules_reload(body, headers, query):
+    """Recompile the risk rules from disk without a restart"""
+    if not admin_allowed(headers.get(ADMIN_HEADER.lower())):
+        raise HTTPError(403, "Admin token required")
+    name = _parse_json(body).get('file') if body else None
+    try:
+        return await _offload(reload_rules, name)
+    except (ValueError, RuleError) as e:
+        raise HTTPError(400, str(e))
+
+
+async def metrics_endpoint(body, headers, query):
+    """Scoring metrics in the Prometheus text format"""
+    return RawResponse(metrics.render().encode('utf-8'), b'text/plain; version=0.0.4')
+
+
+async def _close_on_disconnect(receive, subscriber):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+    subscriber.close()
+
+
+async def stream_decisions(headers, query, receive, send):
+    """Server-Sent Events stream of new risk decisions, resumable with Last-Event-ID"""
+    subscriber = decision_stream.subscribe(headers.get('last-event-id') or query.get('last_event_id'))
+    watcher = asyncio.ensure_future(_close_on_disconnect(receive, subscriber))
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': STREAM_HEADERS + CORS_HEADERS})
+        chunk = f"retry: {RETRY_MS}\n\n".encode()
+        while chunk is not None:
+            await send({'type': 'http.response.body', 'body': chunk or b': keep-alive\n\n', 'more_body': True})
+            chunk = await subscriber.next()
+        # Disconnected, or evicted for falling behind: the browser reconnects and resumes
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+        decision_stream.unsubscribe(subscriber)
+
+
+ROUTES = {
+    ('POST', '/api/risk-score'): risk_score,
+    ('POST', '/api/risk-score/batch'): risk_score_batch,
+    ('GET', '/api/transactions'): transactions,
+    ('GET', '/api/educational-tip'): tip,
+    ('GET', '/api/model/info'): model_info,
+    ('POST', '/api/model/reload'): model_reload,
+    ('POST', '/api/model/rollback'): model_rollback,
+    ('POST', '/api/rules/reload'): rules_reload,
+    ('GET', '/api/shadow'): shadow,
+    ('GET', '/metrics'): metrics_endpoint,
+}
+
+# Routes that write their own (long-lived) response
+STREAM_ROUTES = {
+    ('GET', '/api/stream/decisions'): stream_decisions,
+}
+
+STREAM_HEADERS = [
+    (b'content-type', b'text/event-stream'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+]
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-headers',
+     b'Content-Type, Idempotency-Key, If-None-Match, X-Deadline-Ms, Last-Event-ID, X-Admin-Token'),
+    (b'access-control-expose-headers', b'ETag'),
+    (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+]
+
+
+async def _read_body(receive):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def _send(send, status, payload=None):
+    content_type = b'application/json'
+    extra_headers = []
+    if isinstance(payload, RawResponse):
+        body, content_type, extra_headers = payload.body, payload.content_type, payload.headers
+        status = payload.status
+    else:
+        body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+    headers = [(b'content-type', content_type),
+               (b'content-length', str(len(body)).encode())] + extra_headers + CORS_HEADERS
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            _get_executor()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _executor is not None:
+                _executor.shutdown(wait=True)
+            shutdown()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI application serving the same API routes as the Flask app"""
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    method, path = scope['method'], scope['path']
+    if method == 'OPTIONS':
+        return await _send(send, 204)
+
+    handler = ROUTES.get((method, path)) or STREAM_ROUTES.get((method, path))
+    if handler is None:
+        known_path = any(route_path == path for _, route_path in list(ROUTES) + list(STREAM_ROUTES))
+        status = 405 if known_path else 404
+        return await _send(send, status, {"error": "Method not allowed" if known_path else "Not found"})
+
+    try:
+        body = await _read_body(receive)
+        if body is None:
+            return
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1')
+                   for name, value in scope.get('headers', [])}
+        query = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        if (method, path) in STREAM_ROUTES:
+            return await handler(headers, query, receive, send)
+        payload = await handler(body, headers, query)
+    except HTTPError as e:
+        return await _send(send, e.status, {"error": e.message})
+    await _send(send, 200, payload)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(
+        'asgi:app',
+        host='0.0.0.0',
+        port=int(os.environ.get('PORT', 5000)),
+        workers=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)),
+        backlog=int(os.environ.get('FRAUDGUARD_BACKLOG', 2048)),
+        timeout_keep_alive=int(os.environ.get('FRAUDGUARD_KEEPALIVE', 5)),
+        limit_concurrency=int(os.environ.get('FRAUDGUARD_MAX_CONNECTIONS', 2000)),
+        access_log=False
+    )
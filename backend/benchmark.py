@@ -0,0 +1,234 @@
+"""
+Benchmark Suite for FraudGuard Lite
+Measures throughput, p50/p99 latency and peak memory of the scoring,
+training and data generation paths, saves the results as JSON and can
+compare a run against a stored baseline to catch regressions.
+
+    python benchmark.py --sizes 1e3,1e5,1e6 --users 1e2,1e5 --output results.json
+    python benchmark.py --sizes 1e3 --users 1e2 --compare baseline.json
+"""
+
+import argparse
+import io
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import numpy as np
+
+from app import calculate_risk_score
+from classifier import FEATURES, FraudClassifier, feature_row
+from ml_model import FraudDetector
+from synthetic_data import generate_transaction_history
+from synthetic_scale import iter_chunks
+
+# Per-call latency is sampled on at most this many calls
+LATENCY_SAMPLE = 10000
+
+# Relative slowdown that counts as a regression in compare mode
+DEFAULT_TOLERANCE = 0.15
+
+DEVICES = ["iPhone", "Windows_PC", "MacBook", "Emulator"]
+MERCHANTS = ["Amazon", "Starbucks", "Walmart", "Netflix", "Uber", "Steam"]
+
+
+def make_transactions(n, num_users, seed=0):
+    """Cheap, reproducible benchmark input (not meant to look realistic)"""
+    rng = random.Random(seed)
+    return [{
+        "user_id": f"user_{rng.randrange(num_users)}",
+        "amount": round(rng.uniform(5, 600), 2),
+        "merchant": rng.choice(MERCHANTS),
+        "device": rng.choice(DEVICES),
+        "typing_speed": rng.randint(10, 250),
+        "timestamp": f"2024-01-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00"
+    } for _ in range(n)]
+
+
+def _percentiles(latencies):
+    latencies = np.asarray(latencies) * 1e6
+    return round(float(np.percentile(latencies, 50)), 2), round(float(np.percentile(latencies, 99)), 2)
+
+
+def _peak_memory(run):
+    """Peak traced allocation of run(), in MB"""
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return round(peak / 1e6, 3)
+
+
+def _measure_calls(fn, args_list):
+    """Throughput over all calls, latency over a sample of them"""
+    started = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    elapsed = time.perf_counter() - started
+
+    latencies = []
+    for args in args_list[:LATENCY_SAMPLE]:
+        call_started = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - call_started)
+    p50, p99 = _percentiles(latencies)
+    sample = args_list[:LATENCY_SAMPLE]
+    return {
+        "ops": len(args_list),
+        "throughput_ops": round(len(args_list) / elapsed, 1),
+        "p50_us": p50,
+        "p99_us": p99,
+        "peak_mb": _peak_memory(lambda: [fn(*args) for args in sample])
+    }
+
+
+def _measure_bulk(run, ops, repeats):
+    """Throughput and per-run latency of a bulk operation over ops items"""
+    durations = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        run()
+        durations.append(time.perf_counter() - started)
+    p50, p99 = _percentiles(durations)
+    return {
+        "ops": ops,
+        "throughput_ops": round(ops / float(np.median(durations)), 1),
+        "p50_us": p50,
+        "p99_us": p99,
+        "peak_mb": _peak_memory(run)
+    }
+
+
+def bench_calculate_risk_score(transactions, num_users):
+    return _measure_calls(calculate_risk_score, [(tx["user_id"], tx) for tx in transactions])
+
+
+def _quiet_train(transactions):
+    with redirect_stdout(io.StringIO()):
+        return FraudDetector(jitter=False).train(transactions)
+
+
+def bench_predict(transactions, num_users):
+    detector = _quiet_train(make_transactions(max(num_users * 5, 1000), num_users, seed=1))
+    return _measure_calls(detector.predict, [(tx, tx["user_id"]) for tx in transactions])
+
+
+def bench_classifier(transactions, num_users):
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(1000, len(FEATURES)))
+    model = FraudClassifier.fit(X, X[:, 0] + rng.normal(size=1000) > 1)
+
+    def score(amount, typing_speed):
+        return model.probability(feature_row(amount, 100.0, 0, True, typing_speed, True))
+
+    return _measure_calls(score, [(tx["amount"], tx["typing_speed"]) for tx in transactions])
+
+
+def bench_train(transactions, num_users, repeats=3):
+    return _measure_bulk(lambda: _quiet_train(transactions), len(transactions), repeats)
+
+
+def bench_generate_transaction_history(transactions, num_users, repeats=3):
+    n = len(transactions)
+    return _measure_bulk(lambda: generate_transaction_history("sarah123", num_transactions=n), n, repeats)
+
+
+def bench_generate_synthetic_scale(transactions, num_users, repeats=3):
+    n = len(transactions)
+    return _measure_bulk(lambda: sum(len(c["user"]) for c in iter_chunks(num_users, n)), n, repeats)
+
+
+BENCHMARKS = {
+    "calculate_risk_score": bench_calculate_risk_score,
+    "predict": bench_predict,
+    "classifier": bench_classifier,
+    "train": bench_train,
+    "generate_transaction_history": bench_generate_transaction_history,
+    "generate_synthetic_scale": bench_generate_synthetic_scale,
+}
+
+
+def run_suite(sizes, user_counts, names=None, log=print):
+    """Run every selected benchmark at each size and user count"""
+    results = []
+    for name in names or BENCHMARKS:
+        for size in sizes:
+            # Data generation doesn't depend on the number of users
+            for num_users in (user_counts[:1] if name == "generate_transaction_history" else user_counts):
+                transactions = make_transactions(size, num_users)
+                result = BENCHMARKS[name](transactions, num_users)
+                result.update({"name": name, "size": size, "users": num_users})
+                log(f"   {name:<30} n={size:<9,} users={num_users:<8,} "
+                    f"{result['throughput_ops']:>14,.0f} ops/s  p50 {result['p50_us']:>10,.1f}µs  "
+                    f"p99 {result['p99_us']:>10,.1f}µs  peak {result['peak_mb']:,.1f}MB")
+                results.append(result)
+    return {
+        "created_at": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results
+    }
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare two suite runs case by case. A case regresses when throughput
+    drops or p99 latency grows by more than tolerance.
+    """
+    base = {(r["name"], r["size"], r["users"]): r for r in baseline["results"]}
+    report = []
+    for result in current["results"]:
+        before = base.get((result["name"], result["size"], result["users"]))
+        if before is None:
+            continue
+        throughput_change = result["throughput_ops"] / before["throughput_ops"] - 1
+        p99_change = result["p99_us"] / before["p99_us"] - 1 if before["p99_us"] else 0.0
+        report.append({
+            "name": result["name"],
+            "size": result["size"],
+            "users": result["users"],
+            "throughput_change": round(throughput_change, 4),
+            "p99_change": round(p99_change, 4),
+            "regression": throughput_change < -tolerance or p99_change > tolerance
+        })
+    return report
+
+
+def _parse_counts(text):
+    return [int(float(value)) for value in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FraudGuard Lite benchmark suite")
+    parser.add_argument("--sizes", default="1e3,1e5,1e6", help="Transaction counts")
+    parser.add_argument("--users", default="1e2,1e5", help="Distinct user counts")
+    parser.add_argument("--only", help="Comma-separated benchmark names")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    print("⏱️  Running benchmarks...")
+    names = args.only.split(",") if args.only else None
+    results = run_suite(_parse_counts(args.sizes), _parse_counts(args.users), names)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Saved results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            report = compare(results, json.load(f), args.tolerance)
+        regressions = [r for r in report if r["regression"]]
+        for r in report:
+            flag = "🚨 REGRESSION" if r["regression"] else "ok"
+            print(f"   {r['name']:<30} n={r['size']:<9,} users={r['users']:<8,} "
+                  f"throughput {r['throughput_change']:+.1%}  p99 {r['p99_change']:+.1%}  {flag}")
+        if regressions:
+            print(f"🚨 {len(regressions)} regression(s) against {args.compare}")
+            sys.exit(1)
+        print(f"✅ No regressions against {args.compare}")
@@ -0,0 +1,185 @@
+"""
+Fraud Classifier for FraudGuard Lite
+A logistic regression over a few per-transaction features, fit on labelled
+history (is_fraudulent) with Newton's method and L2 regularisation.
+
+The fit is exported as plain coefficients on the raw features, with the
+standardisation folded in, so scoring needs only the math module for one
+transaction and NumPy for a batch. The export is a small dict that goes
+into model snapshots; no training library is needed to serve it.
+"""
+
+import math
+
+import numpy as np
+
+FEATURES = ('amount_ratio', 'hour_diff', 'new_device', 'typing_deviation', 'unknown_user')
+
+# Typing speed (characters/minute) the typing_deviation feature is measured from
+TYPICAL_TYPING_SPEED = 80
+_LOG_TYPICAL_TYPING = math.log1p(TYPICAL_TYPING_SPEED)
+
+L2 = 1.0                # Penalty on the standardised weights
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-8
+HOLDOUT_FRACTION = 0.2  # Share of the labelled rows held out for the reported metrics
+
+
+def feature_row(amount, avg_amount, hour_diff, known_device, typing_speed, known_user):
+    """Classifier inputs for one transaction, in FEATURES order"""
+    return (
+        math.log1p(max(amount, 0)) - math.log1p(avg_amount),
+        hour_diff,
+        0.0 if known_device else 1.0,
+        abs(math.log1p(max(typing_speed, 0)) - _LOG_TYPICAL_TYPING),
+        0.0 if known_user else 1.0
+    )
+
+
+def feature_matrix(amount, avg_amount, hour_diff, known_device, typing_speed, known_user):
+    """
+    feature_row over NumPy columns. Logarithms go through the math module
+    too, so every row matches feature_row bit for bit.
+    """
+    log1p = math.log1p
+    amount_log = np.asarray([log1p(a) for a in np.maximum(amount, 0).tolist()])
+    average_log = np.asarray([log1p(a) for a in np.asarray(avg_amount, dtype=np.float64).tolist()])
+    typing_log = np.asarray([log1p(t) for t in np.maximum(typing_speed, 0).tolist()])
+    return np.column_stack([
+        amount_log - average_log,
+        np.asarray(hour_diff, dtype=np.float64),
+        np.where(known_device, 0.0, 1.0),
+        np.abs(typing_log - _LOG_TYPICAL_TYPING),
+        np.where(known_user, 0.0, 1.0)
+    ])
+
+
+def _sigmoid(z):
+    # Split on the sign so exp() can't overflow
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+
+def _auc(y, p):
+    """Area under the ROC curve (probability a fraud outranks a legitimate row)"""
+    positives = int(y.sum())
+    negatives = len(y) - positives
+    if not positives or not negatives:
+        return None
+    order = np.argsort(p, kind='mergesort')
+    ranks = np.empty(len(p))
+    ranks[order] = np.arange(1, len(p) + 1)
+    # Tied probabilities share their average rank
+    _, inverse, counts = np.unique(p, return_inverse=True, return_counts=True)
+    sums = np.bincount(inverse, weights=ranks)
+    ranks = (sums / counts)[inverse]
+    return float((ranks[y == 1].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+def evaluate(y, p, threshold=0.5):
+    """Classification metrics of probabilities p against labels y"""
+    y = np.asarray(y, dtype=bool)
+    flagged = np.asarray(p) >= threshold
+    tp = int((flagged & y).sum())
+    fp = int((flagged & ~y).sum())
+    fn = int((~flagged & y).sum())
+    tn = int((~flagged & ~y).sum())
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    auc = _auc(y, np.asarray(p))
+    return {
+        "accuracy": round((tp + tn) / len(y), 4) if len(y) else None,
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1_score": round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0,
+        "false_positive_rate": round(fp / (fp + tn), 4) if fp + tn else 0.0,
+        "auc": round(auc, 4) if auc is not None else None
+    }
+
+
+class FraudClassifier:
+    """Fitted logistic regression: P(fraud) = sigmoid(bias + weights . features)"""
+
+    def __init__(self, weights, bias, features=FEATURES, metrics=None, importance=None):
+        self.weights = tuple(float(w) for w in weights)
+        self.bias = float(bias)
+        self.features = tuple(features)
+        self.metrics = metrics or {}
+        self.importance = importance or {}
+
+    @classmethod
+    def fit(cls, X, y, l2=L2, holdout_fraction=HOLDOUT_FRACTION, seed=0):
+        """
+        Fit on feature matrix X and boolean labels y. A seeded share of the
+        rows is held out to measure the fit; the model keeps the weights
+        learned from the rest. Raises ValueError unless both classes occur.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if len(np.unique(y)) < 2:
+            raise ValueError("Training data needs both fraudulent and legitimate transactions")
+
+        order = np.random.default_rng(seed).permutation(len(y))
+        held = int(len(y) * holdout_fraction)
+        train, holdout = order[held:], order[:held]
+        if held == 0 or len(np.unique(y[train])) < 2:
+            train = holdout = order
+
+        # Standardise so the penalty treats every feature alike
+        mean = X[train].mean(axis=0)
+        scale = X[train].std(axis=0)
+        scale[scale == 0] = 1.0
+        design = np.column_stack([np.ones(len(train)), (X[train] - mean) / scale])
+        penalty = np.full(design.shape[1], l2)
+        penalty[0] = 0.0                  # The intercept isn't penalised
+
+        w = np.zeros(design.shape[1])
+        for _ in range(MAX_ITERATIONS):
+            p = 1.0 / (1.0 + np.exp(-np.clip(design @ w, -500, 500)))
+            gradient = design.T @ (p - y[train]) + penalty * w
+            hessian = (design.T * (p * (1 - p))) @ design + np.diag(penalty)
+            step = np.linalg.solve(hessian + 1e-9 * np.eye(len(w)), gradient)
+            w -= step
+            if np.abs(step).max() < TOLERANCE:
+                break
+
+        # Fold the standardisation into coefficients on the raw features
+        weights = w[1:] / scale
+        bias = w[0] - float((weights * mean).sum())
+        total = np.abs(w[1:]).sum()
+        importance = {name: round(float(abs(v) / total), 4) if total else 0.0
+                      for name, v in zip(FEATURES, w[1:])}
+
+        model = cls(weights, bias, FEATURES, importance=importance)
+        model.metrics = evaluate(y[holdout], model.probabilities(X[holdout]))
+        model.metrics.update({"training_samples": int(len(train)), "holdout_samples": int(len(holdout)),
+                              "fraud_rate": round(float(y.mean()), 4)})
+        return model
+
+    def probability(self, row):
+        """P(fraud) for one feature_row"""
+        z = self.bias
+        for w, x in zip(self.weights, row):
+            z += w * x
+        return _sigmoid(z)
+
+    def probabilities(self, X):
+        """P(fraud) for each row of a feature_matrix, identical to probability() per row"""
+        X = np.asarray(X, dtype=np.float64)
+        z = np.full(len(X), self.bias)
+        # Accumulate in the same order as probability() so the sums round identically
+        for k, w in enumerate(self.weights):
+            z = z + w * X[:, k]
+        return np.asarray([_sigmoid(v) for v in z.tolist()])
+
+    def to_dict(self):
+        return {"features": list(self.features), "weights": list(self.weights), "bias": self.bias,
+                "metrics": self.metrics, "importance": self.importance}
+
+    @classmethod
+    def from_dict(cls, data):
+        if list(data["features"]) != list(FEATURES):
+            raise ValueError(f"Classifier was trained on features {data['features']}, expected {list(FEATURES)}")
+        return cls(data["weights"], data["bias"], data["features"], data.get("metrics"), data.get("importance"))
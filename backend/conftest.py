@@ -0,0 +1,18 @@
+import os
+import shutil
+import tempfile
+
+_history_dir = None
+
+
+def pytest_configure(config):
+    # Importing app opens the history database; keep the tests' rows out of the working directory
+    global _history_dir
+    if 'FRAUDGUARD_HISTORY_PATH' not in os.environ:
+        _history_dir = tempfile.mkdtemp(prefix='fraudguard-test-')
+        os.environ['FRAUDGUARD_HISTORY_PATH'] = os.path.join(_history_dir, 'history.db')
+
+
+def pytest_unconfigure(config):
+    if _history_dir is not None:
+        shutil.rmtree(_history_dir, ignore_errors=True)
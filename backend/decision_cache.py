@@ -0,0 +1,137 @@
+"""
+Decision Cache for FraudGuard Lite
+Remembers recent risk decisions so retried or duplicated requests are
+answered without rescoring.
+
+Only real repeats are answered from the cache: a request carrying an
+Idempotency-Key gets exactly the decision stored under that key for the
+same user (keys are scoped per user, so one caller's key never returns
+another user's decision), and a
+transaction resubmitted with the same transaction_id gets the decision
+keyed by a hash of that id and the fields that drive the score (user,
+amount, device, typing speed, timestamp bucket) and the model version.
+Two purchases that merely look alike are both scored, so velocity and
+reputation see every one of them. Activating another model empties the
+cache, and retraining a user's profile invalidates that user's entries.
+
+Idempotent replays deliberately survive both: a key names one request
+that was already answered, and its retry must get that same answer (the
+one that was logged and acted on), not a fresh decision from whichever
+model is active now. They expire with the TTL, or with clear().
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+from kv_profile_store import MISSING, LRUCache
+from velocity import parse_time
+
+# Transactions this close together (in seconds) share a cache entry
+BUCKET_SECONDS = 60
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+
+class DecisionCache:
+    """Bounded LRU cache of decisions with a per-entry TTL"""
+
+    def __init__(self, max_size=100000, ttl=60.0, bucket_seconds=BUCKET_SECONDS):
+        self.decisions = LRUCache(max_size, ttl)
+        self.idempotent = LRUCache(max_size, ttl)
+        self.bucket_seconds = bucket_seconds
+        self.max_generations = max_size
+        self._generations = {}      # user_id -> bumped whenever their profile changes
+        self._model = None
+        self._lock = threading.Lock()
+        self.model_resets = 0
+        self.user_invalidations = 0
+
+    def _bind(self, model):
+        """Start from an empty cache whenever a different model is active"""
+        if model is self._model:
+            return
+        with self._lock:
+            if model is not self._model:
+                # Idempotent decisions stay: a retry gets the answer its request was given
+                self.decisions.clear()
+                self._generations.clear()
+                self._model = model
+                self.model_resets += 1
+                listeners = getattr(model, 'profile_listeners', None)
+                if listeners is not None and self.invalidate_users not in listeners:
+                    listeners.append(self.invalidate_users)
+
+    def key(self, model, user_id, transaction):
+        """
+        Canonical hash of the transaction's id and everything the decision
+        depends on, or None for a transaction without a transaction_id
+        """
+        self._bind(model)
+        transaction_id = transaction.get('transaction_id')
+        if transaction_id is None:
+            return None
+        seconds = parse_time(transaction.get('timestamp', '') or '')
+        if seconds is None:
+            seconds = time.time()
+        amount = transaction.get('amount', 0)
+        typing_speed = transaction.get('typing_speed', 0)
+        canonical = json.dumps([
+            str(transaction_id),
+            str(user_id),
+            float(amount) if isinstance(amount, (int, float)) else str(amount),
+            str(transaction.get('device', 'unknown')),
+            float(typing_speed) if isinstance(typing_speed, (int, float)) else str(typing_speed),
+            int(seconds // self.bucket_seconds),
+            getattr(model, 'model_version', None),
+            self._generations.get(user_id, 0),
+        ], separators=(',', ':'))
+        return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).digest()
+
+    def get(self, key, user_id, idempotency_key=None):
+        """A stored decision, or None"""
+        if idempotency_key:
+            decision = self.idempotent.get((str(user_id), idempotency_key))
+            if decision is not MISSING:
+                return decision
+        if key is None:
+            return None
+        decision = self.decisions.get(key)
+        return None if decision is MISSING else decision
+
+    def put(self, key, decision, user_id, idempotency_key=None):
+        if key is not None:
+            self.decisions.put(key, decision)
+        if idempotency_key:
+            self.idempotent.put((str(user_id), idempotency_key), decision)
+
+    def invalidate_users(self, user_ids):
+        """Make every cached decision for these users unreachable"""
+        with self._lock:
+            for user_id in set(user_ids):
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+                self.user_invalidations += 1
+            if len(self._generations) > self.max_generations:
+                # Starting over keeps the table bounded; emptying the decisions with it
+                # keeps entries under older generations from becoming reachable again
+                self.decisions.clear()
+                self._generations.clear()
+
+    def clear(self):
+        with self._lock:
+            self.decisions.clear()
+            self.idempotent.clear()
+            self._generations.clear()
+
+    def stats(self):
+        return {
+            "size": len(self.decisions),
+            "hits": self.decisions.hits,
+            "misses": self.decisions.misses,
+            "evictions": self.decisions.evictions,
+            "idempotent_size": len(self.idempotent),
+            "idempotent_hits": self.idempotent.hits,
+            "model_resets": self.model_resets,
+            "user_invalidations": self.user_invalidations
+        }
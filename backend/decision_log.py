@@ -0,0 +1,173 @@
+"""
+Decision Log for FraudGuard Lite
+Write-behind log of every risk decision. Request handlers only append to
+a bounded in-memory queue; a background thread writes the queue to the
+TransactionStore in bulk, once batch_size decisions are waiting or the
+oldest has waited flush_interval seconds. Request latency never depends
+on the disk.
+
+When the queue is full, the 'drop' policy drops the decision and counts
+it, and 'block' waits up to block_timeout for room (backpressure) before
+dropping. close() writes out everything queued before returning.
+
+The logged decisions back the transaction history API and can be
+replayed into FraudDetector.partial_fit with train_from_log(). Only
+APPROVED decisions are learned from by default: a blocked or held
+transaction is likely the fraudster's, not the account owner's habits.
+"""
+
+import queue
+import threading
+import time
+
+# Decisions waiting to be written before new ones are dropped (or block)
+MAX_QUEUE = 100000
+
+# Decisions written per transaction, and the longest one waits before a write
+BATCH_SIZE = 1000
+FLUSH_INTERVAL = 0.5
+
+POLICIES = ('drop', 'block')
+
+# Rows read from the store per partial_fit call
+CHUNK_SIZE = 10000
+
+# Decisions train_from_log learns profiles from
+TRAIN_STATUSES = ('APPROVED',)
+
+_STOP = object()
+
+
+class DecisionLog:
+    """Bounded queue of decisions drained into a TransactionStore by a writer thread"""
+
+    def __init__(self, store, max_queue=MAX_QUEUE, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, policy='drop', block_timeout=1.0):
+        if policy not in POLICIES:
+            raise ValueError(f"Decision log policy must be one of {', '.join(POLICIES)}")
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_write_ms = None
+        self._queue = queue.Queue(max_queue)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="decision-log", daemon=True)
+        self._thread.start()
+
+    def append(self, user_id, transaction, result):
+        """Queue one decision; returns False if it was dropped"""
+        if self._closed:
+            self.dropped += 1
+            return False
+        item = (user_id, transaction, result)
+        try:
+            if self.policy == 'block':
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def extend(self, user_ids, transactions, results):
+        """Queue a batch of decisions; returns how many were kept"""
+        return sum(self.append(user_id, tx, result)
+                   for user_id, tx, result in zip(user_ids, transactions, results))
+
+    def _run(self):
+        while True:
+            batch = []
+            stop = False
+            deadline = None
+            while len(batch) < self.batch_size:
+                try:
+                    if deadline is None:
+                        item = self._queue.get()
+                    else:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        started = time.perf_counter()
+        try:
+            self.store.insert_many([self.store.row(*item) for item in batch])
+        except Exception as e:
+            # One bad decision shouldn't cost the rest of the batch; retry them one at a time
+            self.last_error = str(e)
+            for item in batch:
+                try:
+                    self.store.insert_many([self.store.row(*item)])
+                except Exception as e:
+                    self.errors += 1
+                    self.last_error = str(e)
+                else:
+                    self.written += 1
+            self.batches += 1
+            return
+        self.written += len(batch)
+        self.batches += 1
+        self.last_write_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    def flush(self):
+        """Block until every decision queued so far has been written (or failed)"""
+        self._queue.join()
+
+    def close(self):
+        """Write out the queue and stop the writer; later appends are dropped"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_write_ms": self.last_write_ms,
+            "policy": self.policy
+        }
+
+
+def train_from_log(detector, store, after_id=0, chunk_size=CHUNK_SIZE, decay=None, statuses=TRAIN_STATUSES):
+    """
+    Fold logged decisions with ids above after_id into detector's profiles,
+    only those with a status in statuses (all of them if None).
+    Returns (decisions read, id of the last one) so the next call can
+    carry on from there.
+    """
+    total, last_id = 0, after_id
+    for rows in store.iter_transactions(after_id, chunk_size):
+        # Profiles need an amount and merchant; decisions logged without them are skipped
+        usable = [row for row in rows if 'amount' in row and 'merchant' in row and
+                  (statuses is None or row.get('status') in statuses)]
+        if usable:
+            detector.partial_fit(usable, decay)
+        total += len(rows)
+        last_id = rows[-1]['id']
+    return total, last_id
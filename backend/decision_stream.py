@@ -0,0 +1,206 @@
+"""
+Decision Stream for FraudGuard Lite
+Fans each new risk decision out to every dashboard subscribed to
+/api/stream/decisions (Server-Sent Events), so dashboards stop polling.
+
+Scoring threads only encode a decision once and append it to a ring of
+recent events; each event loop with subscribers is then woken once, and
+copies the new events into its subscribers' buffers on its own thread.
+A subscriber is a coroutine waiting on an asyncio.Event, so thousands of
+idle connections cost no threads, and publishing costs the same however
+many are open.
+
+Each subscriber's buffer holds at most buffer_size events. A client that
+falls that far behind is evicted: its stream ends and the browser's
+EventSource reconnects with Last-Event-ID, which replays whatever it
+missed that is still in the ring. Event ids carry a token of the
+process that issued them, so an id from another worker or an earlier
+run replays nothing instead of the wrong events.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+
+from transaction_store import TransactionStore
+
+# Recent events kept for Last-Event-ID resume, and the most one client may lag
+HISTORY_SIZE = 1024
+BUFFER_SIZE = 256
+
+# Seconds between comment lines that keep idle connections (and proxies) open
+HEARTBEAT = 15.0
+
+# Browsers wait this long (ms) before reconnecting a dropped stream
+RETRY_MS = 3000
+
+_FIELDS = ("user_id", "timestamp", "amount", "merchant", "device", "risk_score", "status")
+
+
+class Subscriber:
+    """One client's bounded buffer of encoded events, read on its event loop"""
+
+    def __init__(self, buffer_size, last_id):
+        self.buffer = deque()
+        self.buffer_size = buffer_size
+        self.last_id = last_id
+        self.evicted = False
+        self.closed = False
+        self._wakeup = asyncio.Event()
+
+    def push(self, events):
+        """Queue (id, data) events newer than the last one queued; evicts on overflow"""
+        if self.evicted or self.closed:
+            return
+        if events and events[0][0] <= self.last_id:
+            events = [event for event in events if event[0] > self.last_id]
+        if not events:
+            return
+        if len(self.buffer) + len(events) > self.buffer_size:
+            self.evicted = True
+            self.buffer.clear()
+        else:
+            self.buffer.extend(data for _, data in events)
+            self.last_id = events[-1][0]
+        self._wakeup.set()
+
+    def close(self):
+        self.closed = True
+        self._wakeup.set()
+
+    async def next(self, timeout=HEARTBEAT):
+        """
+        The buffered events as one chunk, b'' if none arrived within
+        timeout, or None once the subscriber was evicted or closed
+        """
+        if not self.buffer and not (self.evicted or self.closed):
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return b''
+        if self.evicted or self.closed:
+            return None
+        chunk = b''.join(self.buffer)
+        self.buffer.clear()
+        return chunk
+
+
+class _LoopFanout:
+    """Subscribers on one event loop, and the newest event handed to them"""
+
+    def __init__(self, loop, cursor):
+        self.loop = loop
+        self.subscribers = set()
+        self.cursor = cursor
+        self.scheduled = False
+
+
+class DecisionBroadcaster:
+    """Ring of recent decision events, fanned out to subscribers on any event loop"""
+
+    def __init__(self, history_size=HISTORY_SIZE, buffer_size=BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.token = os.urandom(4).hex()
+        self.published = 0
+        self.evicted = 0
+        self._history = deque(maxlen=history_size)      # (sequence number, encoded event)
+        self._fanouts = {}
+        self._lock = threading.Lock()
+
+    def event(self, user_id, transaction, result):
+        """The decision as sent to dashboards, in the /api/transactions row shape"""
+        event = dict(zip(_FIELDS, TransactionStore.row(user_id, transaction, result)))
+        event["reasons"] = result.get("reasons", [])
+        event["model_version"] = result.get("model_version")
+        if result.get("degraded"):
+            event["degraded"] = True
+        return event
+
+    def publish(self, user_id, transaction, result):
+        """Send a new decision to every subscriber; safe to call from any thread"""
+        if not self._fanouts:
+            # Nobody has subscribed yet, so there is nothing to deliver or resume
+            return
+        with self._lock:
+            self.published += 1
+            sequence = self.published
+            event = self.event(user_id, transaction, result)
+            event["id"] = f"{self.token}-{sequence}"
+            data = (f"id: {event['id']}\nevent: decision\n"
+                    f"data: {json.dumps(event)}\n\n").encode('utf-8')
+            self._history.append((sequence, data))
+            wake = [fanout for fanout in self._fanouts.values() if not fanout.scheduled]
+            for fanout in wake:
+                fanout.scheduled = True
+        for fanout in wake:
+            try:
+                fanout.loop.call_soon_threadsafe(self._deliver, fanout)
+            except RuntimeError:
+                # The loop has closed; its subscribers went with it
+                with self._lock:
+                    self._fanouts.pop(fanout.loop, None)
+
+    def _since(self, sequence):
+        """Events in the ring after sequence number sequence, oldest first"""
+        events = []
+        for event in reversed(self._history):
+            if event[0] <= sequence:
+                break
+            events.append(event)
+        events.reverse()
+        return events
+
+    def _deliver(self, fanout):
+        # Runs on the fanout's loop: copy new events into each subscriber's buffer
+        with self._lock:
+            fanout.scheduled = False
+            events = self._since(fanout.cursor)
+            if events:
+                fanout.cursor = events[-1][0]
+        for subscriber in list(fanout.subscribers):
+            subscriber.push(events)
+            if subscriber.evicted:
+                fanout.subscribers.discard(subscriber)
+                self.evicted += 1
+
+    def _resume_point(self, last_event_id):
+        """Sequence number to replay from for a Last-Event-ID, or None for none"""
+        token, _, sequence = (last_event_id or '').rpartition('-')
+        if token != self.token or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def subscribe(self, last_event_id=None):
+        """
+        A Subscriber on the running event loop, already holding the events
+        after last_event_id that are still in the ring (at most buffer_size)
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            fanout = self._fanouts.get(loop)
+            if fanout is None:
+                fanout = self._fanouts[loop] = _LoopFanout(loop, self.published)
+            resume = self._resume_point(last_event_id)
+            replay = self._since(resume)[-self.buffer_size:] if resume is not None else []
+            subscriber = Subscriber(self.buffer_size, resume if resume is not None else self.published)
+            fanout.subscribers.add(subscriber)
+        subscriber.push(replay)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscriber.close()
+        with self._lock:
+            for fanout in self._fanouts.values():
+                fanout.subscribers.discard(subscriber)
+
+    def stats(self):
+        return {
+            "subscribers": sum(len(fanout.subscribers) for fanout in list(self._fanouts.values())),
+            "published": self.published,
+            "evicted": self.evicted,
+            "buffer_size": self.buffer_size,
+            "history_size": self._history.maxlen
+        }
@@ -0,0 +1,355 @@
+"""
+Network Profile Store for FraudGuard Lite
+Keeps scoring profiles in a Redis-compatible key-value server, so every
+worker and node scores against the same state.
+
+FraudDetector reads profiles through a small interface that both stores
+implement:
+
+    lookup(user_id)          handle for a user, or None if unknown
+    lookup_many(user_ids)    handles for many users at once
+    avg_amount(handle)       average transaction amount
+    amount_p99(handle)       99th percentile of the user's amounts
+    common_hours(handle)     most common shopping hours
+    hour_shares(handle)      share of transactions in each hour of the day
+    has_device(handle, d)    whether the user has used device d
+    device_names(handle)     every device the user has used
+
+ProfileStore is the in-process implementation. KVProfileStore reads
+through a local LRU cache with a TTL, fetches misses for a batch with
+pipelined MGETs, and keeps a pool of open connections. publish() copies a
+trained ProfileStore into the server.
+
+If the server can't be reached (or times out), lookups answer from
+expired cache entries, or None (the default profile) for users never
+cached, instead of failing the request; fell_back() tells the scoring
+thread its last lookup did so.
+"""
+
+import json
+import math
+import socket
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from queue import Empty, LifoQueue
+from urllib.parse import urlsplit
+
+KEY_PREFIX = "fg:profile:"
+
+# Keys per MGET / MSET command; a batch sends several commands in one pipeline
+KEYS_PER_COMMAND = 500
+
+MISSING = object()
+
+
+class KVError(Exception):
+    """An error reply from the key-value server"""
+
+
+class RESPConnection:
+    """One connection speaking the Redis protocol"""
+
+    def __init__(self, host, port, timeout=5.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    @staticmethod
+    def _encode(args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    def _read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return KVError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            return None if length < 0 else self.reader.read(length + 2)[:length]
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise KVError(f"Unexpected reply {line!r}")
+
+    def pipeline(self, commands):
+        """Send every command in one write, then read the replies in order"""
+        self.sock.sendall(b"".join(self._encode(args) for args in commands))
+        replies = [self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, KVError):
+                raise reply
+        return replies
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+
+class ConnectionPool:
+    """Reuses up to max_idle open connections between callers"""
+
+    def __init__(self, host, port, max_idle=8, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle = LifoQueue(max_idle)
+        self.created = 0
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except Empty:
+            conn = RESPConnection(self.host, self.port, self.timeout)
+            self.created += 1
+        reusable = False
+        try:
+            yield conn
+            reusable = True
+        except KVError:
+            # Error replies are read in full, so the connection is still in sync
+            reusable = True
+            raise
+        finally:
+            if reusable and not self._idle.full():
+                self._idle.put_nowait(conn)
+            else:
+                conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                return
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache whose entries expire ttl seconds after being
+    stored. With keep_expired, expired entries stay (until evicted or
+    replaced) for stale() to read.
+    """
+
+    def __init__(self, max_size=100000, ttl=30.0, keep_expired=False):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.keep_expired = keep_expired
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, now=None):
+        """Cached value, or MISSING"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None and not self.keep_expired:
+                    del self._entries[key]
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def stale(self, key):
+        """Cached value even if it has expired, or MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return MISSING if entry is None else entry[1]
+
+    def put(self, key, value, now=None):
+        expires = (time.monotonic() if now is None else now) + self.ttl
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def encode_profile(avg_amount, common_hours, devices, sample_size=0.0, amount_p99=None, hour_shares=None):
+    # JSON has no infinity; a missing percentile is stored as null
+    amount_p99 = amount_p99 if amount_p99 is not None and math.isfinite(amount_p99) else None
+    return json.dumps({"avg_amount": avg_amount, "common_hours": common_hours,
+                       "devices": sorted(devices), "sample_size": sample_size,
+                       "amount_p99": amount_p99, "hour_shares": hour_shares},
+                      separators=(",", ":")).encode("utf-8")
+
+
+def decode_profile(value):
+    profile = json.loads(value)
+    profile["devices"] = frozenset(profile["devices"])
+    # Profiles published before sample sizes were stored count as no history
+    profile.setdefault("sample_size", 0.0)
+    # ...and before percentiles, as no evidence of an unusual amount or hour
+    if profile.get("amount_p99") is None:
+        profile["amount_p99"] = math.inf
+    if profile.get("hour_shares") is None:
+        profile["hour_shares"] = [1.0] * 24
+    return profile
+
+
+class KVProfileStore:
+    """
+    Scoring profiles in a Redis-compatible server, read through a local
+    cache. Unknown users are cached too, so they don't hit the network on
+    every request.
+    """
+
+    def __init__(self, host="127.0.0.1", port=6379, cache_size=100000, ttl=30.0,
+                 max_connections=8, timeout=5.0, prefix=KEY_PREFIX):
+        self.pool = ConnectionPool(host, port, max_connections, timeout)
+        self.cache = LRUCache(cache_size, ttl, keep_expired=True)
+        self.prefix = prefix
+        self.round_trips = 0
+        self.fallbacks = 0
+        self._local = threading.local()
+
+    @classmethod
+    def from_url(cls, url, **options):
+        """KVProfileStore for a redis://host:port URL"""
+        parts = urlsplit(url)
+        return cls(parts.hostname or "127.0.0.1", parts.port or 6379, **options)
+
+    def close(self):
+        self.pool.close()
+
+    def _key(self, user_id):
+        return self.prefix + str(user_id)
+
+    def _fall_back(self, user_ids):
+        """Stale cached profiles (None if never cached) for a lookup the server couldn't answer"""
+        self.fallbacks += 1
+        self._local.fell_back = True
+        profiles = [self.cache.stale(user_id) for user_id in user_ids]
+        return [None if profile is MISSING else profile for profile in profiles]
+
+    def fell_back(self):
+        """Whether this thread's last lookup was answered without the server"""
+        return getattr(self._local, "fell_back", False)
+
+    def lookup(self, user_id):
+        self._local.fell_back = False
+        profile = self.cache.get(user_id)
+        if profile is MISSING:
+            try:
+                with self.pool.connection() as conn:
+                    value = conn.execute("GET", self._key(user_id))
+            except OSError:
+                return self._fall_back([user_id])[0]
+            self.round_trips += 1
+            profile = decode_profile(value) if value is not None else None
+            self.cache.put(user_id, profile)
+        return profile
+
+    def lookup_many(self, user_ids):
+        """Profiles for user_ids in order; cache misses are fetched in one round trip"""
+        self._local.fell_back = False
+        profiles = [self.cache.get(user_id) for user_id in user_ids]
+        missing = list(dict.fromkeys(u for u, p in zip(user_ids, profiles) if p is MISSING))
+        if not missing:
+            return profiles
+
+        commands = [["MGET"] + [self._key(u) for u in missing[i:i + KEYS_PER_COMMAND]]
+                    for i in range(0, len(missing), KEYS_PER_COMMAND)]
+        try:
+            with self.pool.connection() as conn:
+                replies = conn.pipeline(commands)
+        except OSError:
+            fetched = dict(zip(missing, self._fall_back(missing)))
+            return [fetched[u] if p is MISSING else p for u, p in zip(user_ids, profiles)]
+        self.round_trips += 1
+
+        fetched = {}
+        values = [value for reply in replies for value in reply]
+        for user_id, value in zip(missing, values):
+            fetched[user_id] = decode_profile(value) if value is not None else None
+            self.cache.put(user_id, fetched[user_id])
+        return [fetched[u] if p is MISSING else p for u, p in zip(user_ids, profiles)]
+
+    # Accessors matching ProfileStore, on the handles lookup() returns
+    def avg_amount(self, profile):
+        return profile["avg_amount"]
+
+    def amount_p99(self, profile):
+        return profile["amount_p99"]
+
+    def common_hours(self, profile):
+        return profile["common_hours"]
+
+    def hour_shares(self, profile):
+        return profile["hour_shares"]
+
+    def has_device(self, profile, device):
+        return device in profile["devices"]
+
+    def device_names(self, profile):
+        return profile["devices"]
+
+    def sample_size(self, profile):
+        return profile["sample_size"]
+
+    def publish(self, store):
+        """Write every profile in a ProfileStore to the server; returns the count"""
+        items = []
+        for row, user_id in enumerate(store.user_ids):
+            items.append(self._key(user_id))
+            items.append(encode_profile(store.avg_amount(row), store.common_hours(row),
+                                        store.device_names(row), store.sample_size(row),
+                                        store.amount_p99(row), store.hour_shares(row)))
+        step = KEYS_PER_COMMAND * 2
+        commands = [["MSET"] + items[i:i + step] for i in range(0, len(items), step)]
+        if commands:
+            with self.pool.connection() as conn:
+                conn.pipeline(commands)
+        self.cache.clear()
+        return len(items) // 2
+
+    def invalidate(self, user_id=None):
+        """Forget a cached profile (or all of them) so the next lookup reads the server"""
+        if user_id is None:
+            self.cache.clear()
+        else:
+            self.cache.discard(user_id)
+
+    def stats(self):
+        return {
+            "cached_profiles": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "cache_evictions": self.cache.evictions,
+            "round_trips": self.round_trips,
+            "fallbacks": self.fallbacks,
+            "connections_opened": self.pool.created
+        }
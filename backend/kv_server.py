@@ -0,0 +1,159 @@
+"""
+Local Key-Value Server for FraudGuard Lite
+A small in-memory server speaking the Redis protocol (RESP), for tests
+and local runs of the network profile store without a Redis install.
+It implements the handful of commands KVProfileStore uses; pipelined
+commands are answered in order like a real server.
+
+    python kv_server.py --port 6379
+"""
+
+import argparse
+import socketserver
+import threading
+
+
+class ProtocolError(Exception):
+    """Malformed RESP input"""
+
+
+def read_command(stream):
+    """Read one command (an array of bulk strings) or None at end of stream"""
+    line = stream.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Inline command, as typed into telnet
+        return line.split()
+    args = []
+    for _ in range(int(line[1:])):
+        header = stream.readline()
+        if not header.startswith(b"$"):
+            raise ProtocolError("Expected a bulk string")
+        length = int(header[1:])
+        args.append(stream.read(length + 2)[:length])
+    return args
+
+
+def encode(value):
+    """RESP encoding of a reply"""
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, bool):
+        return b"+OK\r\n" if value else b"-ERR\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, str):
+        return b"+" + value.encode() + b"\r\n"
+    if isinstance(value, Exception):
+        return b"-ERR " + str(value).encode() + b"\r\n"
+    return b"*%d\r\n" % len(value) + b"".join(encode(item) for item in value)
+
+
+class KVStore:
+    """The server's data, shared by all connections"""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+        self.commands = 0
+
+    def execute(self, args):
+        name = args[0].upper()
+        handler = getattr(self, "cmd_" + name.decode("ascii", "replace").lower(), None)
+        if handler is None:
+            return ProtocolError(f"unknown command '{name.decode('ascii', 'replace')}'")
+        with self.lock:
+            self.commands += 1
+            try:
+                return handler(*args[1:])
+            except TypeError:
+                return ProtocolError(f"wrong number of arguments for '{name.decode()}'")
+
+    def cmd_ping(self, message=None):
+        return message if message is not None else "PONG"
+
+    def cmd_get(self, key):
+        return self.data.get(key)
+
+    def cmd_set(self, key, value):
+        self.data[key] = value
+        return True
+
+    def cmd_mget(self, *keys):
+        return [self.data.get(key) for key in keys]
+
+    def cmd_mset(self, *pairs):
+        if len(pairs) % 2:
+            raise TypeError
+        for i in range(0, len(pairs), 2):
+            self.data[pairs[i]] = pairs[i + 1]
+        return True
+
+    def cmd_del(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def cmd_exists(self, *keys):
+        return sum(key in self.data for key in keys)
+
+    def cmd_dbsize(self):
+        return len(self.data)
+
+    def cmd_flushdb(self):
+        self.data.clear()
+        return True
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            try:
+                args = read_command(self.rfile)
+            except (ProtocolError, ValueError) as e:
+                self.wfile.write(encode(ProtocolError(f"Protocol error: {e}")))
+                return
+            if args is None:
+                return
+            if not args:
+                continue
+            self.wfile.write(encode(store.execute(args)))
+
+
+class KVServer(socketserver.ThreadingTCPServer):
+    """Threaded RESP server; port 0 picks a free port"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__((host, port), _Handler)
+        self.store = KVStore()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}"
+
+    def start(self):
+        """Serve in a background thread"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-memory Redis-protocol server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+
+    server = KVServer(args.host, args.port)
+    print(f"🗄️  Key-value server listening on {server.url}")
+    server.serve_forever()
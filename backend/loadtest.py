@@ -0,0 +1,148 @@
+"""
+HTTP Load Tester for FraudGuard Lite
+Drives /api/risk-score over keep-alive connections from one asyncio loop
+and reports throughput and latency percentiles. Optional slow clients
+trickle their request bodies to show how the server copes with them.
+With --deadline-ms every request carries an X-Deadline-Ms header, and the
+responses the server degraded to the fallback scorer are counted. With
+--users requests are spread over user_0 .. user_<n-1> (the synthetic_scale
+ids) instead of three demo users.
+
+    python loadtest.py http://127.0.0.1:5000 --connections 64 --duration 10 --slow 32
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+
+def _request(host, path, body, deadline_ms=None):
+    extra = f"X-Deadline-Ms: {deadline_ms}\r\n" if deadline_ms else ""
+    return (f"POST {path} HTTP/1.1\r\nHost: {host}\r\n{extra}"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body
+
+
+def _payload(users=None):
+    return json.dumps({
+        "user_id": f"user_{random.randrange(users)}" if users else random.choice(["sarah123", "john_doe", "emma_w"]),
+        "amount": round(random.uniform(10, 500), 2),
+        "device": random.choice(["iPhone", "Windows_PC", "Emulator"]),
+        "typing_speed": random.randint(10, 250),
+    }).encode()
+
+
+async def _read_response(reader):
+    """
+    Read one HTTP response. Returns (status, keep_alive, body); without a
+    Content-Length the body runs until the server closes the connection.
+    """
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed")
+    keep_alive = status_line.startswith(b"HTTP/1.1")
+    length = None
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "connection":
+            keep_alive = value == "keep-alive" or (keep_alive and value != "close")
+    if length is None:
+        body = await reader.read()
+        keep_alive = False
+    else:
+        body = await reader.readexactly(length)
+    return int(status_line.split()[1]), keep_alive, body
+
+
+async def _client(url, deadline, latencies, errors, degraded, deadline_ms=None, users=None, timeout=10):
+    parts = urlsplit(url)
+    writer = None
+    try:
+        while time.perf_counter() < deadline:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+            started = time.perf_counter()
+            writer.write(_request(parts.netloc, "/api/risk-score", _payload(users), deadline_ms))
+            status, keep_alive, body = await asyncio.wait_for(_read_response(reader), timeout)
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+                if b'"degraded"' in body:
+                    degraded.append(1)
+            else:
+                errors.append(status)
+            if not keep_alive:
+                writer.close()
+                writer = None
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, OSError):
+        errors.append("connection")
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def _slow_client(url, deadline, delay=0.05):
+    """Send a request one byte at a time, over and over"""
+    parts = urlsplit(url)
+    try:
+        reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+        while time.perf_counter() < deadline:
+            for byte in _request(parts.netloc, "/api/risk-score", _payload()):
+                writer.write(bytes([byte]))
+                await asyncio.sleep(delay)
+                if time.perf_counter() >= deadline:
+                    return
+            _, keep_alive, _ = await _read_response(reader)
+            if not keep_alive:
+                writer.close()
+                reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+    except (ConnectionError, asyncio.IncompleteReadError, OSError):
+        pass
+
+
+async def run(url, connections, duration, slow=0, deadline_ms=None, users=None):
+    """Run the load test and return a summary dict"""
+    deadline = time.perf_counter() + duration
+    latencies, errors, degraded = [], [], []
+    started = time.perf_counter()
+    tasks = [_client(url, deadline, latencies, errors, degraded, deadline_ms, users) for _ in range(connections)]
+    tasks += [_slow_client(url, deadline) for _ in range(slow)]
+    await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    latency_ms = np.array(latencies) * 1000
+    return {
+        "url": url,
+        "connections": connections,
+        "slow_clients": slow,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "degraded": len(degraded),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latency_ms, 50)), 2) if len(latency_ms) else None,
+        "p99_ms": round(float(np.percentile(latency_ms, 99)), 2) if len(latency_ms) else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the risk-score API")
+    parser.add_argument("url", help="Base URL, e.g. http://127.0.0.1:5000")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--slow", type=int, default=0, help="Slow clients trickling their requests")
+    parser.add_argument("--deadline-ms", type=float, default=None, help="Deadline sent with every request")
+    parser.add_argument("--users", type=int, default=None, help="Spread requests over this many synthetic users")
+    args = parser.parse_args()
+
+    print(f"🔄 Load testing {args.url} for {args.duration}s...")
+    summary = asyncio.run(run(args.url, args.connections, args.duration, args.slow, args.deadline_ms, args.users))
+    print(json.dumps(summary, indent=2))
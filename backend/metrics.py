@@ -0,0 +1,183 @@
+"""
+Hot-path Instrumentation for FraudGuard Lite
+Per-stage timings, per-rule hit counters and decision latency histograms,
+rendered in the Prometheus text exposition format for /metrics.
+
+Scoring code asks for a timer once per call; when metrics are disabled
+(FRAUDGUARD_METRICS=0 or configure(False)) it gets None and skips every
+measurement behind a single `is not None` check.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3,
+           5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+enabled = os.environ.get('FRAUDGUARD_METRICS', '1') not in ('0', 'false', 'off')
+
+_lock = threading.Lock()
+_histograms = {}        # (name, labels) -> [bucket counts..., sum, count]
+_counters = {}          # (name, labels) -> value
+_series = {}            # (name, scorer, label value) -> histogram, for Timer.finish
+_collectors = []        # Functions returning values owned by other modules
+_help = {
+    'fraudguard_stage_seconds': ('histogram', 'Time spent in each stage of a scoring call'),
+    'fraudguard_decision_seconds': ('histogram', 'Scoring latency by decision status'),
+    'fraudguard_rule_hits_total': ('counter', 'Number of times each risk rule fired'),
+}
+
+
+def configure(on):
+    """Turn instrumentation on or off at runtime"""
+    global enabled
+    enabled = bool(on)
+
+
+def reset():
+    """Clear every recorded metric"""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _series.clear()
+
+
+def describe(name, kind, text):
+    """Register HELP/TYPE lines for a metric recorded by another module"""
+    _help[name] = (kind, text)
+
+
+def register_collector(collect):
+    """
+    Add a function called on every render(); it returns
+    {(name, labels): value} for counters and gauges kept elsewhere.
+    """
+    _collectors.append(collect)
+
+
+def _observe(key, value):
+    histogram = _histograms.get(key)
+    if histogram is None:
+        histogram = _histograms[key] = [0] * (len(BUCKETS) + 3)
+    histogram[bisect_left(BUCKETS, value)] += 1
+    histogram[-2] += value
+    histogram[-1] += 1
+
+
+def observe(name, labels, value):
+    """Record one histogram observation"""
+    with _lock:
+        _observe((name, labels), value)
+
+
+def inc(name, labels, amount=1):
+    """Increment a counter"""
+    key = (name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+class Timer:
+    """
+    Collects stage durations and rule hits for one scoring call, then
+    publishes them together under a single lock acquisition.
+    """
+
+    __slots__ = ('scorer', 'started', 'last', 'stages', 'hits')
+
+    def __init__(self, scorer):
+        self.scorer = scorer
+        self.started = self.last = time.perf_counter()
+        self.stages = []
+        self.hits = []
+
+    def mark(self, stage):
+        """End the current stage, named stage"""
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def hit(self, rule):
+        self.hits.append(rule)
+
+    def finish(self, status):
+        """Record all stages, rule hits and the total latency under status"""
+        total = time.perf_counter() - self.started
+        scorer = self.scorer
+        with _lock:
+            for stage, duration in self.stages:
+                histogram = _series.get(('fraudguard_stage_seconds', scorer, stage))
+                if histogram is None:
+                    histogram = _histogram_series('fraudguard_stage_seconds', scorer, 'stage', stage)
+                histogram[bisect_left(BUCKETS, duration)] += 1
+                histogram[-2] += duration
+                histogram[-1] += 1
+            for rule in self.hits:
+                key = ('fraudguard_rule_hits_total', (('scorer', scorer), ('rule', rule)))
+                _counters[key] = _counters.get(key, 0) + 1
+            histogram = _series.get(('fraudguard_decision_seconds', scorer, status))
+            if histogram is None:
+                histogram = _histogram_series('fraudguard_decision_seconds', scorer, 'status', status)
+            histogram[bisect_left(BUCKETS, total)] += 1
+            histogram[-2] += total
+            histogram[-1] += 1
+
+
+def _histogram_series(name, scorer, label, value):
+    """Create a labelled histogram and remember it for Timer.finish (caller holds _lock)"""
+    key = (name, (('scorer', scorer), (label, value)))
+    histogram = _histograms.get(key)
+    if histogram is None:
+        histogram = _histograms[key] = [0] * (len(BUCKETS) + 3)
+    _series[(name, scorer, value)] = histogram
+    return histogram
+
+
+def timer(scorer):
+    """A Timer for one scoring call, or None when metrics are disabled"""
+    if enabled:
+        return Timer(scorer)
+    return None
+
+
+def _format_labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    with _lock:
+        histograms = {key: list(values) for key, values in _histograms.items()}
+        counters = dict(_counters)
+    for collect in _collectors:
+        counters.update(collect())
+
+    by_name = {}
+    for (name, labels), values in histograms.items():
+        by_name.setdefault(name, []).append((labels, values))
+    for (name, labels), value in counters.items():
+        by_name.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name in sorted(by_name):
+        kind, text = _help.get(name, ('untyped', name))
+        lines.append(f'# HELP {name} {text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, values in sorted(by_name[name], key=lambda item: item[0]):
+            if kind != 'histogram':
+                lines.append(f'{name}{_format_labels(labels)} {values}')
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS, values):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {values[-1]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {values[-2]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {values[-1]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,166 @@
+"""
+Model Registry for FraudGuard Lite
+Loads retrained FraudDetector snapshots in the background, validates them
+on a holdout sample and swaps them in atomically.
+
+Request handlers read `registry.active` once and score with that model, so
+a swap never blocks scoring and in-flight requests finish on the model
+they started with. The locks below only serialise loads and swaps.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+from ml_model import FraudDetector
+
+# Probe transactions used when no holdout sample is configured
+DEFAULT_PROBES = [
+    {"user_id": "sarah123", "amount": 85.0, "device": "iPhone", "typing_speed": 80,
+     "timestamp": "2024-01-15T14:30:00"},
+    {"user_id": "unknown_user", "amount": 950.0, "device": "Emulator", "typing_speed": 240,
+     "timestamp": "2024-01-15T03:10:00"}
+]
+
+# FraudDetector attributes describing live serving state rather than the model
+LIVE_STATE = ("velocity", "profile_backend", "profile_listeners")
+
+# Live state a snapshot can also carry; the running copy is more current, so it wins
+SHARED_STATE = ("reputation",)
+
+
+class ModelValidationError(Exception):
+    """Raised when a candidate model fails holdout validation"""
+
+
+class ModelEntry:
+    """An activated model and when it went live"""
+
+    __slots__ = ("model", "version", "loaded_at", "source")
+
+    def __init__(self, model, source=None):
+        self.model = model
+        self.version = model.model_version
+        self.loaded_at = datetime.now().isoformat()
+        self.source = source
+
+    def describe(self):
+        return {"version": self.version, "loaded_at": self.loaded_at, "source": self.source}
+
+
+class ModelRegistry:
+    """
+    Holds the active model and the one before it, for rollback.
+    A candidate must be trained, score every holdout transaction within
+    0-100 and, if the holdout is labelled, reach min_accuracy.
+    """
+
+    def __init__(self, model, holdout=None, min_accuracy=0.0):
+        self.holdout = holdout or DEFAULT_PROBES
+        self.min_accuracy = min_accuracy
+        self._current = ModelEntry(model, source="startup")
+        self._previous = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loading = None             # Path of a snapshot being loaded
+        self.last_error = None
+
+    @property
+    def active(self):
+        return self._current.model
+
+    def validate(self, model):
+        """Score the holdout with model; returns metrics or raises ModelValidationError"""
+        if not model.is_trained:
+            raise ModelValidationError("Candidate model is not trained")
+
+        # Holdout transactions must not reach live velocity or reputation counters
+        velocity, model.velocity = model.velocity, None
+        reputation, model.reputation = model.reputation, None
+        started = time.perf_counter()
+        try:
+            results = model.predict_batch(self.holdout)
+        except Exception as e:
+            raise ModelValidationError(f"Candidate model failed on holdout: {e}")
+        finally:
+            model.velocity = velocity
+            model.reputation = reputation
+        elapsed = time.perf_counter() - started
+
+        if any(not 0 <= r["risk_score"] <= 100 for r in results):
+            raise ModelValidationError("Candidate model produced scores outside 0-100")
+
+        metrics = {"holdout_size": len(results), "holdout_ms": round(elapsed * 1000, 3)}
+        labelled = [(tx["is_fraudulent"], r["status"] != "APPROVED")
+                    for tx, r in zip(self.holdout, results) if "is_fraudulent" in tx]
+        if labelled:
+            accuracy = sum(label == flagged for label, flagged in labelled) / len(labelled)
+            metrics["accuracy"] = round(accuracy, 4)
+            if accuracy < self.min_accuracy:
+                raise ModelValidationError(
+                    f"Holdout accuracy {accuracy:.3f} is below {self.min_accuracy:.3f}")
+        return metrics
+
+    def activate(self, model, source=None):
+        """Validate model and make it the active one"""
+        self.validate(model)
+        # Live serving state (velocity counters, shared profiles, cache hooks) isn't
+        # part of the model, so the new model inherits whatever it doesn't set itself
+        for name in LIVE_STATE:
+            if not getattr(model, name):
+                setattr(model, name, getattr(self._current.model, name))
+        for name in SHARED_STATE:
+            if getattr(self._current.model, name) is not None:
+                setattr(model, name, getattr(self._current.model, name))
+        with self._lock:
+            self._previous, self._current = self._current, ModelEntry(model, source)
+        return self._current.version
+
+    def rollback(self):
+        """Swap the previous model back in; returns its version or None"""
+        with self._lock:
+            if self._previous is None:
+                return None
+            self._previous, self._current = self._current, self._previous
+            return self._current.version
+
+    def load(self, path, background=True, verify=True):
+        """
+        Load, validate and activate the snapshot at path.
+        Returns False without loading if another load is already running.
+        In the foreground, load and validation errors are raised.
+        """
+        if not self._load_lock.acquire(blocking=False):
+            return False
+        self.loading = path
+        if background:
+            threading.Thread(target=self._load, args=(path, verify, False), daemon=True).start()
+            return True
+        return self._load(path, verify, True)
+
+    def _load(self, path, verify, raise_errors):
+        try:
+            model = FraudDetector.load(path, verify=verify)
+            self.activate(model, source=path)
+            self.last_error = None
+            return True
+        except Exception as e:
+            self.last_error = {"path": path, "error": str(e), "at": datetime.now().isoformat()}
+            if raise_errors:
+                raise
+            return False
+        finally:
+            self.loading = None
+            self._load_lock.release()
+
+    def info(self):
+        """Active model info plus registry state"""
+        current, previous = self._current, self._previous
+        info = current.model.get_model_info()
+        info.update({
+            "active": current.describe(),
+            "previous": previous.describe() if previous else None,
+            "loading": self.loading,
+            "last_error": self.last_error
+        })
+        return info
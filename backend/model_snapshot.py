@@ -0,0 +1,127 @@
+"""
+Model Snapshot Format for FraudGuard Lite
+A compact binary file holding a JSON header and raw NumPy arrays.
+Arrays are 64-byte aligned so a loaded snapshot can memory-map them;
+every process that loads the same file shares one copy of the pages.
+
+Layout:
+    MAGIC (8 bytes) | header length (uint64 LE) | JSON header | padding |
+    array bytes, each starting on a 64-byte boundary
+
+The SHA-256 checksum covers the header (canonical JSON, without the
+checksum itself) and then the array bytes, so a model whose thresholds or
+classifier change gets a new version even if its profiles don't.
+Format 1 files, whose checksum covers the arrays only, still load.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"FGSNAP01"
+FORMAT_VERSION = 2
+READABLE_FORMATS = (1, 2)
+ALIGNMENT = 64
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is invalid or corrupted"""
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _header_bytes(header):
+    """Canonical encoding of a header for the checksum, which it excludes"""
+    header = {name: value for name, value in header.items() if name != "checksum"}
+    return json.dumps(header, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def write_snapshot(path, metadata, arrays):
+    """
+    Write metadata and named arrays to path atomically.
+    Returns the SHA-256 checksum of the header and array data.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    # Lay out arrays relative to the start of the data section
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        layout[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset += array.nbytes
+
+    header = dict(metadata, format=FORMAT_VERSION, arrays=layout)
+    checksum = hashlib.sha256(_header_bytes(header))
+    for name, array in arrays.items():
+        checksum.update(array.data)
+
+    header["checksum"] = checksum.hexdigest()
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.write(b"\0" * (data_start + layout[name]["offset"] - f.tell()))
+            f.write(array.data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return header["checksum"]
+
+
+def read_snapshot(path, verify=True):
+    """
+    Memory-map a snapshot. Returns (header, arrays) where arrays are
+    read-only views backed by the file.
+    """
+    with open(path, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise SnapshotError(f"{path} is empty")
+
+    if mapped[:len(MAGIC)] != MAGIC:
+        raise SnapshotError(f"{path} is not a FraudGuard model snapshot")
+    header_start = len(MAGIC) + 8
+    if len(mapped) < header_start:
+        raise SnapshotError(f"{path} is truncated")
+    (header_length,) = struct.unpack_from("<Q", mapped, len(MAGIC))
+    if header_start + header_length > len(mapped):
+        raise SnapshotError(f"{path} is truncated")
+    try:
+        header = json.loads(bytes(mapped[header_start:header_start + header_length]))
+    except ValueError:
+        raise SnapshotError(f"{path} has a corrupt header")
+    if not isinstance(header, dict):
+        raise SnapshotError(f"{path} has a corrupt header")
+    if header.get("format") not in READABLE_FORMATS:
+        raise SnapshotError(f"Unsupported snapshot format {header.get('format')} in {path}")
+    data_start = _align(header_start + header_length)
+
+    arrays = {}
+    checksum = hashlib.sha256(_header_bytes(header) if header["format"] >= 2 else b"")
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        start = data_start + spec["offset"]
+        if start + count * dtype.itemsize > len(mapped):
+            raise SnapshotError(f"{path} is truncated")
+        array = np.frombuffer(mapped, dtype=dtype, count=count, offset=start)
+        arrays[name] = array.reshape(spec["shape"])
+        if verify:
+            checksum.update(arrays[name].data)
+
+    if verify and checksum.hexdigest() != header["checksum"]:
+        raise SnapshotError(f"Checksum mismatch in {path}")
+    return header, arrays
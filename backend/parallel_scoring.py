@@ -0,0 +1,180 @@
+"""
+Multi-core Batch Scoring for FraudGuard Lite
+Fans predict_batch work out to a pool of worker processes. Workers never
+receive pickled user profiles: each one memory-maps the model snapshot
+the parent was loaded from, so all workers share one copy of the profile
+pages and their private memory stays flat as the number of users grows.
+If the file was replaced since the parent loaded it, the batch is scored
+in-process instead.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import rule_engine
+from ml_model import FraudDetector
+from model_snapshot import SnapshotError
+
+# Transactions sent to a worker per task
+CHUNK_SIZE = 5000
+
+# Per-process state: the detector loaded from the current snapshot
+_worker_model = None
+_worker_key = None
+
+
+class SnapshotChanged(RuntimeError):
+    """The snapshot file no longer holds the model the parent loaded"""
+
+
+def _worker_detector(path, checksum, jitter, seed):
+    """Load (or reuse) the worker's mapping of the snapshot"""
+    global _worker_model, _worker_key
+    key = (path, checksum, jitter, seed)
+    if key != _worker_key:
+        _worker_model = FraudDetector.load(path, verify=False, jitter=jitter, seed=seed)
+        if _worker_model.snapshot["checksum"] != checksum:
+            raise SnapshotChanged(f"Snapshot {path} changed on disk")
+        # Reputation counters live in the parent, like velocity
+        _worker_model.reputation = None
+        _worker_key = key
+    return _worker_model
+
+
+def _score_chunk(path, checksum, jitter, seed, transactions, user_ids, velocity_features=None, rules=None,
+                 reputation_features=None):
+    if rules is not None:
+        # Score with the parent's rules, even if they were reloaded after this worker started
+        rule_engine.engine.use(*rules)
+    return _worker_detector(path, checksum, jitter, seed).predict_batch(
+        transactions, user_ids, velocity_features, reputation_features=reputation_features)
+
+
+def _worker_memory():
+    """Resident memory of a worker split into private (anon) and file-backed pages, in kB"""
+    memory = {"pid": os.getpid()}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("VmRSS", "RssAnon", "RssFile"):
+                memory[name] = int(value.split()[0])
+    return memory
+
+
+class ParallelScorer:
+    """
+    Process pool for batch scoring with snapshot-backed models.
+    Models that were not loaded from a snapshot are scored in-process.
+    """
+
+    def __init__(self, workers=None, chunk_size=CHUNK_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        # Spawned workers start clean instead of inheriting the parent's heap
+        self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def predict_batch(self, model, transactions, user_ids=None):
+        """Same results as model.predict_batch (with jitter off or seeded), computed across processes"""
+        if user_ids is None:
+            user_ids = [tx.get('user_id', 'sarah123') for tx in transactions]
+        if model.snapshot is None or not model.is_trained or len(transactions) <= self.chunk_size:
+            return model.predict_batch(transactions, user_ids)
+
+        # Velocity and reputation counters live in this process, so they're read here and shipped with each chunk
+        features = reputation = None
+        if model.velocity is not None:
+            features = [model.velocity.observe(user_id, tx) for tx, user_id in zip(transactions, user_ids)]
+        if model.reputation is not None:
+            reputation = [model.reputation.observe(user_id, tx) for tx, user_id in zip(transactions, user_ids)]
+        
+        path, checksum = model.snapshot["path"], model.snapshot["checksum"]
+        rules = model.rules or rule_engine.engine.active
+        size = max(self.chunk_size, -(-len(transactions) // (self.workers * 4)))
+        starts = range(0, len(transactions), size)
+        futures = [self._pool.submit(_score_chunk, path, checksum, model.jitter, model.seed,
+                                     transactions[i:i + size], user_ids[i:i + size],
+                                     features and features[i:i + size],
+                                     (rules.document, rules.checksum),
+                                     reputation and reputation[i:i + size])
+                   for i in starts]
+        results = []
+        try:
+            for future in futures:
+                results.extend(future.result())
+        except (SnapshotChanged, SnapshotError):
+            # Workers can't map the parent's model any more (replaced or broken on disk);
+            # score it here, with the features already read
+            for future in futures:
+                future.cancel()
+            return model.predict_batch(transactions, user_ids, features, reputation_features=reputation)
+        return results
+
+    def worker_memory(self):
+        """Memory of each worker process (requires /proc)"""
+        futures = [self._pool.submit(_worker_memory) for _ in range(self.workers * 2)]
+        return list({m["pid"]: m for m in (f.result() for f in futures)}.values())
+
+
+# Throughput and per-worker memory benchmark when run directly
+if __name__ == "__main__":
+    import random
+
+    import numpy as np
+
+    def synthetic_model(num_users, path):
+        detector = FraudDetector(jitter=False)
+        user_ids = [f"user_{i}" for i in range(num_users)]
+        detector.user_profiles.update(
+            user_ids, np.random.uniform(20, 200, num_users), np.random.randint(8, 22, num_users),
+            np.random.choice(["iPhone", "MacBook", "Windows_PC"], num_users).tolist(),
+            ["Amazon"] * num_users)
+        detector.user_profiles.refresh()
+        detector.is_trained = True
+        detector.save(path)
+        return FraudDetector.load(path, jitter=False)
+
+    def transactions_for(num_users, n):
+        return [{"user_id": f"user_{random.randrange(num_users)}",
+                 "amount": round(random.uniform(10, 600), 2),
+                 "device": random.choice(["iPhone", "MacBook", "Emulator"]),
+                 "typing_speed": random.randint(10, 250),
+                 "timestamp": f"2024-01-15T{random.randint(0, 23):02d}:{random.randint(0, 59):02d}:00"}
+                for _ in range(n)]
+
+    directory = tempfile.mkdtemp()
+    batch = 200000
+    print(f"🖥️  {os.cpu_count()} CPUs")
+
+    model = synthetic_model(100000, os.path.join(directory, "model.fgsnap"))
+    transactions = transactions_for(100000, batch)
+    started = time.perf_counter()
+    model.predict_batch(transactions)
+    print(f"   in-process: {batch / (time.perf_counter() - started):,.0f} tx/s")
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        with ParallelScorer(workers) as scorer:
+            scorer.predict_batch(model, transactions[:scorer.chunk_size * workers + 1])  # warm up
+            started = time.perf_counter()
+            scorer.predict_batch(model, transactions)
+            print(f"   {workers} workers: {batch / (time.perf_counter() - started):,.0f} tx/s")
+
+    print("📊 Worker memory vs number of users (kB):")
+    for num_users in (10000, 100000, 1000000):
+        model = synthetic_model(num_users, os.path.join(directory, f"model_{num_users}.fgsnap"))
+        with ParallelScorer(2) as scorer:
+            scorer.predict_batch(model, transactions_for(num_users, 50000))
+            memory = scorer.worker_memory()
+        anon = max(m["RssAnon"] for m in memory)
+        shared = max(m["RssFile"] for m in memory)
+        print(f"   {num_users:>9,} users: private {anon:,} kB, shared file pages {shared:,} kB")
@@ -0,0 +1,551 @@
+"""
+Compact Profile Store for FraudGuard Lite
+Keeps per-user sufficient statistics in NumPy columns instead of raw
+per-user lists and sets, so memory per user stays constant with history.
+"""
+
+import math
+import sys
+import tracemalloc
+from array import array
+
+import numpy as np
+
+import quantile_sketch
+
+# Number of most frequent hours kept as a user's "common hours"
+COMMON_HOURS = 4
+
+# Per-user columns and the fill value of an empty row
+COLUMNS = (('count', 0), ('weight', 0), ('amount_sum', 0), ('amount_min', 0),
+           ('amount_max', 0), ('decayed_at', 0), ('hour_counts', 0),
+           ('hour_first', -1), ('top_hours', -1), ('amount_bins', 0), ('p99_amount', np.inf))
+
+
+class StringTable:
+    """Interns strings (devices, merchants) to small integer IDs"""
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name):
+        """ID for name, assigning a new one if it hasn't been seen"""
+        string_id = self.ids.get(name)
+        if string_id is None:
+            string_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return string_id
+
+    def get(self, name):
+        """ID for name, or None if it was never interned"""
+        return self.ids.get(name)
+
+    def memory_usage(self):
+        return (sys.getsizeof(self.ids) + sys.getsizeof(self.names)
+                + sum(sys.getsizeof(name) for name in self.names))
+
+
+class SortedIndex:
+    """
+    Read-only user_id -> row mapping over a sorted array of UTF-8 user IDs.
+    Used by snapshot-loaded stores so the index can stay memory-mapped.
+    """
+
+    def __init__(self, keys):
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, row):
+        return self.keys[row].decode("utf-8")
+
+    def __iter__(self):
+        return (key.decode("utf-8") for key in self.keys)
+
+    def get(self, user_id, default=None):
+        if not isinstance(user_id, str):
+            return default
+        key = user_id.encode("utf-8")
+        row = int(np.searchsorted(self.keys, key))
+        if row < len(self.keys) and self.keys[row] == key:
+            return row
+        return default
+
+    def __contains__(self, user_id):
+        return self.get(user_id) is not None
+
+
+class CsrRows:
+    """Read-only per-row ID lists stored as offsets into one flat array"""
+
+    def __init__(self, offsets, ids):
+        self.offsets = offsets
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return self.ids[self.offsets[row]:self.offsets[row + 1]]
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+
+def _to_csr(rows, order):
+    """Flatten per-row ID lists (taken in the given row order) to offsets/ids"""
+    sizes = np.fromiter((len(rows[row]) for row in order), dtype=np.int64, count=len(order))
+    offsets = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    ids = np.fromiter((i for row in order for i in rows[row]), dtype=np.uint32, count=int(offsets[-1]))
+    return offsets, ids
+
+
+class ProfileStore:
+    """
+    Columnar store of user behaviour profiles.
+    Each user is a row: transaction count, amount sum/min/max, a 24-bin
+    hour histogram, a quantile sketch of amounts (see quantile_sketch)
+    and the IDs of the devices and merchants they used.
+    
+    Amount sums, hour counts and sketch bins are weights that can decay
+    exponentially.
+    Decay is applied lazily, when a user next receives data, against a
+    global clock; everything read for scoring is a ratio of weights, so a
+    user that has not been touched yet reads the same either way, except
+    sample_size(), which applies the row's pending decay itself.
+    
+    A store loaded from a snapshot is read-only and backed by the mapped
+    file; the first update() copies it into ordinary writable columns.
+    """
+
+    def __init__(self, capacity=1024):
+        self.index = {}                 # user_id -> row
+        self.user_ids = []              # row -> user_id
+        self.devices = StringTable()
+        self.merchants = StringTable()
+
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.weight = np.zeros(capacity, dtype=np.float64)
+        self.amount_sum = np.zeros(capacity, dtype=np.float64)
+        self.amount_min = np.zeros(capacity, dtype=np.float64)
+        self.amount_max = np.zeros(capacity, dtype=np.float64)
+        self.hour_counts = np.zeros((capacity, 24), dtype=np.float32)
+        self.decayed_at = np.zeros(capacity, dtype=np.float64)
+        # Order in which each hour was first seen, used to break ties between
+        # equally common hours the same way the original dict-based count did
+        self.hour_first = np.full((capacity, 24), -1, dtype=np.int8)
+        self.top_hours = np.full((capacity, COMMON_HOURS), -1, dtype=np.int8)
+        self.amount_bins = np.zeros((capacity, quantile_sketch.NUM_BINS), dtype=np.float32)
+        self.p99_amount = np.full(capacity, np.inf, dtype=np.float64)
+
+        self.user_devices = []          # row -> array of device IDs
+        self.user_merchants = []        # row -> array of merchant IDs
+        self._stale = set()             # rows whose top_hours need refreshing
+        self.clock = 0.0                # total log-decay applied so far
+        self.read_only = False
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def __contains__(self, user_id):
+        return user_id in self.index
+
+    def _resize(self, capacity):
+        """Copy every column into new arrays of the given capacity"""
+        used = len(self)
+        for name, fill in COLUMNS:
+            column = getattr(self, name)
+            resized = np.full((capacity,) + column.shape[1:], fill, dtype=column.dtype)
+            resized[:used] = column[:used]
+            setattr(self, name, resized)
+
+    def _grow(self):
+        """Double the capacity of every column"""
+        self._resize(len(self.count) * 2)
+
+    def _thaw(self):
+        """Turn a snapshot-loaded store into a writable one"""
+        self.index = {user_id: row for row, user_id in enumerate(self.user_ids)}
+        self.user_ids = list(self.index)
+        self.user_devices = [array('I', ids.tolist()) for ids in self.user_devices]
+        self.user_merchants = [array('I', ids.tolist()) for ids in self.user_merchants]
+        self._resize(max(1024, len(self.user_ids)))
+        self.read_only = False
+
+    def row_for(self, user_id):
+        """Row of user_id, creating an empty profile if needed"""
+        row = self.index.get(user_id)
+        if row is None:
+            row = len(self.user_ids)
+            if row == len(self.count):
+                self._grow()
+            self.index[user_id] = row
+            self.user_ids.append(user_id)
+            self.user_devices.append(array('I'))
+            self.user_merchants.append(array('I'))
+        return row
+
+    def update(self, user_ids, amounts, hours, devices, merchants, decay=None):
+        """
+        Fold a batch of transactions into the profiles, in O(batch) time.
+        Columns are parallel sequences; an hour of -1 means it is unknown.
+        Amounts are summed in input order, so results match a sequential scan.
+        
+        decay is the weight (0-1] that existing history keeps relative to
+        this batch. Min and max amounts are all-time and do not decay.
+        """
+        n = len(user_ids)
+        if n == 0:
+            return
+        if self.read_only:
+            self._thaw()
+        if decay is not None and decay < 1:
+            self.clock -= math.log(decay)
+        
+        first_new = len(self.user_ids)
+        rows = np.fromiter((self.row_for(user_id) for user_id in user_ids), dtype=np.intp, count=n)
+        if len(self.user_ids) > first_new:
+            self.amount_min[first_new:len(self.user_ids)] = np.inf
+            self.amount_max[first_new:len(self.user_ids)] = -np.inf
+            self.decayed_at[first_new:len(self.user_ids)] = self.clock
+        if self.clock:
+            self._decay(np.unique(rows))
+
+        amount = np.asarray(amounts, dtype=np.float64)
+        np.add.at(self.count, rows, 1)
+        np.add.at(self.weight, rows, 1)
+        np.add.at(self.amount_sum, rows, amount)
+        np.minimum.at(self.amount_min, rows, amount)
+        np.maximum.at(self.amount_max, rows, amount)
+        np.add.at(self.amount_bins, (rows, quantile_sketch.bins(amount)), 1)
+        self._stale.update(np.unique(rows).tolist())
+
+        hour = np.asarray(hours, dtype=np.intp)
+        valid = hour >= 0
+        hour_rows, hour = rows[valid], hour[valid]
+        if len(hour):
+            self._record_first_hours(hour_rows, hour)
+            np.add.at(self.hour_counts, (hour_rows, hour), 1)
+
+        device_ids = [self.devices.intern(device) for device in devices]
+        for row, device_id in set(zip(rows.tolist(), device_ids)):
+            if device_id not in self.user_devices[row]:
+                self.user_devices[row].append(device_id)
+
+        merchant_ids = [self.merchants.intern(merchant) for merchant in merchants]
+        for row, merchant_id in set(zip(rows.tolist(), merchant_ids)):
+            if merchant_id not in self.user_merchants[row]:
+                self.user_merchants[row].append(merchant_id)
+
+    def _decay(self, rows):
+        """Bring the weights of rows up to the current decay clock"""
+        behind = self.decayed_at[rows] < self.clock
+        rows = rows[behind]
+        if not len(rows):
+            return
+        factor = np.exp(self.decayed_at[rows] - self.clock)
+        self.weight[rows] *= factor
+        self.amount_sum[rows] *= factor
+        self.hour_counts[rows] *= factor[:, None].astype(np.float32)
+        self.amount_bins[rows] *= factor[:, None].astype(np.float32)
+        self.decayed_at[rows] = self.clock
+        self._stale.update(rows.tolist())
+
+    def _record_first_hours(self, rows, hours):
+        """Number newly seen (row, hour) pairs in order of first appearance"""
+        keys, first_seen = np.unique(rows * 24 + hours, return_index=True)
+        rows, hours = np.divmod(keys, 24)
+        new = self.hour_first[rows, hours] < 0
+        if not new.any():
+            return
+        rows, hours, first_seen = rows[new], hours[new], first_seen[new]
+
+        order = np.lexsort((first_seen, rows))
+        rows, hours = rows[order], hours[order]
+        group_start = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        group_size = np.diff(np.r_[group_start, len(rows)])
+        rank = np.arange(len(rows)) - np.repeat(group_start, group_size)
+
+        already_seen = np.count_nonzero(self.hour_first[rows] >= 0, axis=1)
+        self.hour_first[rows, hours] = already_seen + rank
+
+    def merge(self, other):
+        """
+        Fold another store's profiles into this one, e.g. shards trained on
+        different parts of the data. Counts, weights, hour histograms and
+        amount sketches add up and min/max combine, so merged shards read
+        like one store trained on everything. Both stores must have applied
+        the same decay.
+        """
+        if other.clock != self.clock:
+            raise ValueError("Can't merge profile stores with different decay histories")
+        n = len(other)
+        if n == 0:
+            return
+        if self.read_only:
+            self._thaw()
+        
+        first_new = len(self.user_ids)
+        rows = np.fromiter((self.row_for(user_id) for user_id in other.user_ids), dtype=np.intp, count=n)
+        if len(self.user_ids) > first_new:
+            self.amount_min[first_new:len(self.user_ids)] = np.inf
+            self.amount_max[first_new:len(self.user_ids)] = -np.inf
+            self.decayed_at[first_new:len(self.user_ids)] = self.clock
+        if self.clock:
+            self._decay(rows)
+        
+        # Bring the other store's rows up to its (equal) decay clock first
+        factor = np.exp(other.decayed_at[:n] - other.clock)
+        self.count[rows] += other.count[:n]
+        self.weight[rows] += other.weight[:n] * factor
+        self.amount_sum[rows] += other.amount_sum[:n] * factor
+        self.amount_min[rows] = np.minimum(self.amount_min[rows], other.amount_min[:n])
+        self.amount_max[rows] = np.maximum(self.amount_max[rows], other.amount_max[:n])
+        self.hour_counts[rows] += other.hour_counts[:n] * factor[:, None].astype(np.float32)
+        self.amount_bins[rows] += other.amount_bins[:n] * factor[:, None].astype(np.float32)
+        
+        # Hours new to a row are numbered after the ones it had, in the other store's order
+        mine, theirs = self.hour_first[rows], other.hour_first[:n]
+        new = (mine < 0) & (theirs >= 0)
+        rank = np.argsort(np.argsort(np.where(new, theirs, 127), axis=1, kind="stable"), axis=1)
+        seen = np.count_nonzero(mine >= 0, axis=1)
+        self.hour_first[rows] = np.where(new, seen[:, None] + rank, mine)
+        
+        for row, device_ids, merchant_ids in zip(rows.tolist(), other.user_devices, other.user_merchants):
+            for name in (other.devices.names[i] for i in device_ids):
+                device_id = self.devices.intern(name)
+                if device_id not in self.user_devices[row]:
+                    self.user_devices[row].append(device_id)
+            for name in (other.merchants.names[i] for i in merchant_ids):
+                merchant_id = self.merchants.intern(name)
+                if merchant_id not in self.user_merchants[row]:
+                    self.user_merchants[row].append(merchant_id)
+        
+        self._stale.update(rows.tolist())
+        self.refresh()
+
+    def take(self, user_ids):
+        """
+        A new writable store holding copies of these users' profiles (unknown
+        users are skipped), e.g. to move them to another shard with merge()
+        """
+        self.refresh()
+        rows = [row for row in map(self.index.get, user_ids) if row is not None]
+        part = ProfileStore(capacity=max(1024, len(rows)))
+        part.clock = self.clock
+        selected = np.array(rows, dtype=np.intp)
+        for name, _ in COLUMNS:
+            getattr(part, name)[:len(rows)] = getattr(self, name)[selected]
+        for row in rows:
+            user_id = self.user_ids[row]
+            part.index[user_id] = len(part.user_ids)
+            part.user_ids.append(user_id)
+            part.user_devices.append(array('I', (part.devices.intern(self.devices.names[i])
+                                                 for i in self.user_devices[row])))
+            part.user_merchants.append(array('I', (part.merchants.intern(self.merchants.names[i])
+                                                   for i in self.user_merchants[row])))
+        return part
+
+    def refresh(self):
+        """Recompute common hours and amount quantiles of every profile touched since the last refresh"""
+        if not self._stale:
+            return
+        rows = np.fromiter(self._stale, dtype=np.intp, count=len(self._stale))
+        self._stale.clear()
+
+        counts = self.hour_counts[rows]
+        # Most frequent first, ties broken by first appearance
+        order = np.lexsort((self.hour_first[rows], -counts), axis=-1)[:, :COMMON_HOURS]
+        top = np.take_along_axis(counts, order, axis=1)
+        self.top_hours[rows] = np.where(top > 0, order, -1)
+        self.p99_amount[rows] = quantile_sketch.quantiles(
+            self.amount_bins[rows], 0.99, self.amount_min[rows], self.amount_max[rows])
+
+    def lookup(self, user_id):
+        """Row of a user, or None if unknown"""
+        return self.index.get(user_id)
+
+    def lookup_many(self, user_ids):
+        index = self.index
+        return [index.get(user_id) for user_id in user_ids]
+
+    def avg_amount(self, row):
+        return float(self.amount_sum[row] / self.weight[row])
+
+    def sample_size(self, row):
+        """
+        Transactions behind a profile, counting decayed history at its current
+        weight, including decay not yet applied to the row (unlike the
+        ratios, the absolute weight changes with it)
+        """
+        return float(self.weight[row] * math.exp(self.decayed_at[row] - self.clock))
+
+    def amount_p99(self, row):
+        """99th percentile of the user's amounts, from the sketch (decayed like the average)"""
+        return float(self.p99_amount[row])
+
+    def amount_quantile(self, row, q):
+        counts = self.amount_bins[row:row + 1]
+        return float(quantile_sketch.quantiles(counts, q, self.amount_min[row], self.amount_max[row])[0])
+
+    def hour_shares(self, row):
+        """
+        Share of the user's (weighted) transactions in each hour of the day;
+        1.0 for every hour (no evidence either way) if no hours were recorded
+        """
+        counts = self.hour_counts[row].astype(np.float64)
+        total = counts.sum()
+        return (counts / total).tolist() if total > 0 else [1.0] * 24
+
+    def common_hours(self, row):
+        """Most common shopping hours of a user (empty if none were recorded)"""
+        return [hour for hour in self.top_hours[row].tolist() if hour >= 0]
+
+    def has_device(self, row, device):
+        device_id = self.devices.get(device)
+        return device_id is not None and device_id in self.user_devices[row]
+
+    def device_names(self, row):
+        return {self.devices.names[i] for i in self.user_devices[row]}
+
+    def merchant_names(self, row):
+        return {self.merchants.names[i] for i in self.user_merchants[row]}
+
+    def profile(self, user_id):
+        """Readable summary of one user's profile, or None if unknown"""
+        row = self.index.get(user_id)
+        if row is None:
+            return None
+        return {
+            'transaction_count': int(self.count[row]),
+            'weight': self.sample_size(row),
+            'avg_amount': self.avg_amount(row),
+            'min_amount': float(self.amount_min[row]),
+            'max_amount': float(self.amount_max[row]),
+            'amount_p99': self.amount_p99(row),
+            'common_hours': self.common_hours(row),
+            'devices': self.device_names(row),
+            'merchants': self.merchant_names(row)
+        }
+
+    def memory_usage(self):
+        """Approximate bytes held by the store"""
+        used = len(self)
+        total = sum(getattr(self, name)[:used].nbytes for name, _ in COLUMNS)
+        total += self.devices.memory_usage() + self.merchants.memory_usage()
+        if self.read_only:
+            total += self.index.keys.nbytes
+            for rows in (self.user_devices, self.user_merchants):
+                total += rows.offsets.nbytes + rows.ids.nbytes
+            return total
+        total += sys.getsizeof(self.index) + sys.getsizeof(self.user_ids)
+        total += sum(sys.getsizeof(ids) for ids in self.user_devices)
+        total += sum(sys.getsizeof(ids) for ids in self.user_merchants)
+        total += sys.getsizeof(self.user_devices) + sys.getsizeof(self.user_merchants)
+        return total
+
+    def to_arrays(self):
+        """
+        Export the store as (metadata, arrays) for a snapshot.
+        Rows are sorted by user ID so the index can be searched in place.
+        """
+        self.refresh()
+        used = len(self)
+        keys = np.array([str(user_id).encode("utf-8") for user_id in self.user_ids],
+                        dtype=bytes if used else "S1")
+        order = np.argsort(keys, kind="stable")
+
+        arrays = {name: getattr(self, name)[:used][order] for name, _ in COLUMNS}
+        arrays["user_ids"] = keys[order]
+        arrays["device_offsets"], arrays["device_ids"] = _to_csr(self.user_devices, order)
+        arrays["merchant_offsets"], arrays["merchant_ids"] = _to_csr(self.user_merchants, order)
+        metadata = {
+            "clock": self.clock,
+            "devices": self.devices.names,
+            "merchants": self.merchants.names
+        }
+        return metadata, arrays
+
+    @classmethod
+    def from_arrays(cls, metadata, arrays):
+        """Build a read-only store directly on top of snapshot arrays"""
+        store = cls(capacity=0)
+        used = len(arrays["user_ids"])
+        for name, fill in COLUMNS:
+            if name in arrays:
+                setattr(store, name, arrays[name])
+            else:
+                # Snapshots from before the column existed
+                column = getattr(store, name)
+                setattr(store, name, np.full((used,) + column.shape[1:], fill, dtype=column.dtype))
+        store.index = store.user_ids = SortedIndex(arrays["user_ids"])
+        store.user_devices = CsrRows(arrays["device_offsets"], arrays["device_ids"])
+        store.user_merchants = CsrRows(arrays["merchant_offsets"], arrays["merchant_ids"])
+        for name in metadata["devices"]:
+            store.devices.intern(name)
+        for name in metadata["merchants"]:
+            store.merchants.intern(name)
+        store.clock = metadata["clock"]
+        store.read_only = True
+        return store
+
+
+def _measure(build):
+    """Memory still allocated after build(), in bytes"""
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+# Memory comparison against the list/set profiles when run directly
+if __name__ == "__main__":
+    from datetime import datetime
+    from synthetic_data import generate_transaction_history
+
+    def build_lists(history):
+        profiles = {}
+        for tx in history:
+            profile = profiles.setdefault(tx["user_id"], {
+                'transaction_count': 0, 'amounts': [], 'devices': set(),
+                'hours': [], 'merchants': set()
+            })
+            profile['transaction_count'] += 1
+            profile['amounts'].append(tx['amount'])
+            profile['devices'].add(tx['device'])
+            profile['hours'].append(datetime.fromisoformat(tx['timestamp']).hour)
+            profile['merchants'].add(tx['merchant'])
+        return profiles
+
+    def build_store(history):
+        store = ProfileStore()
+        store.update([tx["user_id"] for tx in history],
+                     [tx["amount"] for tx in history],
+                     [datetime.fromisoformat(tx["timestamp"]).hour for tx in history],
+                     [tx["device"] for tx in history],
+                     [tx["merchant"] for tx in history])
+        store.refresh()
+        return store
+
+    num_users = 1000
+    for per_user in (50, 500):
+        print(f"🔄 Generating {per_user} transactions for each of {num_users} users...")
+        history = []
+        for i in range(num_users):
+            user_history = generate_transaction_history("sarah123", num_transactions=per_user)
+            for tx in user_history:
+                tx["user_id"] = f"user_{i}"
+            history.extend(user_history)
+
+        _, before = _measure(lambda: build_lists(history))
+        store, after = _measure(lambda: build_store(history))
+        print(f"📊 {per_user} transactions/user:")
+        print(f"   lists/sets profiles: {before / num_users:,.0f} bytes/user")
+        print(f"   profile store:       {after / num_users:,.0f} bytes/user")
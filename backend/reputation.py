@@ -0,0 +1,208 @@
+"""
+Population Reputation for FraudGuard Lite
+Counts how many distinct accounts used each device, merchant and
+location over the last day, across every user, in fixed memory.
+
+The day is a ring of time buckets. Each bucket has a Bloom filter of the
+(kind, value, user) pairs seen in it and a count-min sketch of distinct
+users per (kind, value). A pair is counted once, in the bucket where it
+was last seen: when a user comes back in a later bucket, their count
+moves from the older bucket to the new one. The users of a value over
+the window are read from a running total of the bucket sketches, so
+recording a transaction and answering a query both cost a fixed number
+of hash lookups. A bucket is subtracted from the total and cleared as
+time moves past it.
+
+Sketches only overestimate, and Bloom false positives can miss a new
+user; both stay rare at the default sizes below up to about a million
+distinct pairs per bucket. The whole state is two NumPy arrays, saved in
+model snapshots.
+
+As with velocity, live scoring counts transactions at the server clock:
+one request dated years ahead would otherwise clear every bucket and
+leave all later real-time transactions outside the window. Replays pass
+use_timestamps=True.
+"""
+
+import hashlib
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from velocity import event_time
+
+# Transaction fields tracked, and the feature each one reports
+KINDS = (
+    ('device', 'device_users_24h'),
+    ('merchant', 'merchant_users_24h'),
+    ('location', 'location_users_24h'),
+)
+
+WINDOW = 86400
+BUCKETS = 4
+
+# Count-min sketch rows x counters, and Bloom filter bits and hashes, per bucket
+DEPTH = 4
+WIDTH = 1 << 16
+BLOOM_BITS = 1 << 23
+BLOOM_HASHES = 4
+
+
+def _hashes(key, count, size):
+    """count indices in [0, size) for key, by double hashing one 128-bit digest"""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], 'little')
+    h2 = int.from_bytes(digest[8:], 'little') | 1
+    return [(h1 + i * h2) % size for i in range(count)]
+
+
+@lru_cache(maxsize=65536)
+def _cells(key, depth, width):
+    """Offsets of a value's counters, one per sketch row; devices and merchants repeat a lot"""
+    return tuple(r * width + col for r, col in enumerate(_hashes(key, depth, width)))
+
+
+class ReputationTracker:
+    """
+    Distinct users per device, merchant and location over a sliding
+    window, shared by every account. Safe to share between scoring threads.
+    """
+
+    def __init__(self, window=WINDOW, buckets=BUCKETS, depth=DEPTH, width=WIDTH,
+                 bloom_bits=BLOOM_BITS, bloom_hashes=BLOOM_HASHES, use_timestamps=False):
+        self.window = window
+        self.use_timestamps = use_timestamps
+        self.buckets = buckets
+        self.depth = depth
+        self.width = width
+        self.bloom_bits = bloom_bits
+        self.bloom_hashes = bloom_hashes
+        self.bucket_seconds = window / buckets
+        self.head = None              # Epoch (bucket number) of the newest bucket
+        self.observed = 0
+        self._bind(np.zeros((buckets, depth, width), dtype=np.int32),
+                   np.zeros((buckets, bloom_bits // 8), dtype=np.uint8))
+        self._lock = threading.Lock()
+
+    def _bind(self, sketch, bloom):
+        self.sketch = sketch
+        self.bloom = bloom
+        self.total = sketch.sum(axis=0, dtype=np.int32)
+        # Flat views for the per-transaction updates; indexing NumPy arrays one element at a time is slow
+        self._counters = memoryview(sketch.reshape(-1))
+        self._totals = memoryview(self.total.reshape(-1))
+        self._bits = memoryview(bloom.reshape(-1))
+
+    def _advance(self, epoch):
+        """Make epoch the newest bucket, clearing the ones time moved past"""
+        if self.head is None:
+            self.head = epoch
+            return
+        if epoch <= self.head:
+            return
+        for e in range(max(self.head + 1, epoch - self.buckets + 1), epoch + 1):
+            self.total -= self.sketch[e % self.buckets]
+            self.sketch[e % self.buckets] = 0
+            self.bloom[e % self.buckets] = 0
+        self.head = epoch
+
+    def _live(self, b):
+        """Epoch bucket b currently holds"""
+        return self.head - (self.head - b) % self.buckets
+
+    def _cells(self, kind, value):
+        return _cells(f"{kind}\0{value}", self.depth, self.width)
+
+    def _seen(self, b, bits):
+        base, view = b * (self.bloom_bits // 8), self._bits
+        return all(view[base + (bit >> 3)] & (1 << (bit & 7)) for bit in bits)
+
+    def _add(self, b, cells, delta):
+        base, view, totals = b * self.depth * self.width, self._counters, self._totals
+        for cell in cells:
+            view[base + cell] += delta
+            totals[cell] += delta
+
+    def _count(self, cells):
+        """Count-min estimate of a value's users over the live buckets"""
+        totals = self._totals
+        return max(0, min(totals[cell] for cell in cells))
+
+    def _record(self, epoch, kind, value, user_id):
+        cells = self._cells(kind, value)
+        b = epoch % self.buckets
+        bits = _hashes(f"{kind}\0{value}\0{user_id}", self.bloom_hashes, self.bloom_bits)
+        if not self._seen(b, bits):
+            base, view = b * (self.bloom_bits // 8), self._bits
+            for bit in bits:
+                view[base + (bit >> 3)] |= 1 << (bit & 7)
+            # The bucket the user was last counted in for this value, if it is still live
+            last = max((self._live(other) for other in range(self.buckets)
+                        if other != b and self._seen(other, bits)), default=None)
+            if last is None or last < epoch:
+                self._add(b, cells, 1)
+                if last is not None:
+                    self._add(last % self.buckets, cells, -1)
+        return self._count(cells)
+
+    def observe(self, user_id, transaction):
+        """
+        Record a transaction and return the distinct users of its device,
+        merchant and location over the window, including this user.
+        Recorded at the server clock, or with use_timestamps at the
+        transaction's timestamp when it has one.
+        """
+        now = event_time(transaction, self.use_timestamps)
+        epoch = int(now // self.bucket_seconds)
+        user_id = str(user_id)
+        features = {}
+        with self._lock:
+            self._advance(epoch)
+            # Transactions older than the whole window are scored but not recorded
+            recordable = epoch > self.head - self.buckets
+            for kind, feature in KINDS:
+                value = transaction.get(kind)
+                if value is None:
+                    features[feature] = 0
+                elif recordable:
+                    features[feature] = self._record(epoch, kind, value, user_id)
+                else:
+                    features[feature] = self._count(self._cells(kind, value))
+            self.observed += 1
+        return features
+
+    def users(self, kind, value):
+        """Distinct users of a device/merchant/location over the window, as of the latest transaction"""
+        cells = self._cells(kind, value)
+        with self._lock:
+            return self._count(cells)
+
+    def memory_usage(self):
+        return self.sketch.nbytes + self.bloom.nbytes
+
+    def to_arrays(self):
+        """(metadata, arrays) for a model snapshot"""
+        metadata = {
+            "window": self.window, "buckets": self.buckets, "depth": self.depth, "width": self.width,
+            "bloom_bits": self.bloom_bits, "bloom_hashes": self.bloom_hashes,
+            "head": self.head, "observed": self.observed
+        }
+        return metadata, {"reputation_sketch": self.sketch, "reputation_bloom": self.bloom}
+
+    @classmethod
+    def from_arrays(cls, metadata, arrays):
+        """Tracker restored from snapshot arrays (copied, since it keeps counting)"""
+        tracker = cls(metadata["window"], metadata["buckets"], metadata["depth"], metadata["width"],
+                      metadata["bloom_bits"], metadata["bloom_hashes"])
+        tracker._bind(np.array(arrays["reputation_sketch"]), np.array(arrays["reputation_bloom"]))
+        tracker.head = metadata["head"]
+        tracker.observed = metadata["observed"]
+        return tracker
+
+    def stats(self):
+        return {
+            "window_seconds": self.window,
+            "observed_transactions": self.observed,
+            "memory_bytes": self.memory_usage()
+        }
@@ -0,0 +1,350 @@
+"""
+Shadow Scoring for FraudGuard Lite
+Compares a candidate model (a retrained snapshot, changed rules or both)
+with the live one before it is promoted.
+
+RequestRecorder appends /api/risk-score payloads to rotating NDJSON
+files. replay() scores recorded files with both models across worker
+processes and reports decision flips, score deltas and throughput.
+ShadowScorer scores live traffic with the candidate on a background
+thread: requests only enqueue, and are dropped if the queue is full, so
+the response never waits for the candidate.
+
+    python shadow.py --live model.fgm --candidate retrained.fgm recordings/
+    python shadow.py --live model.fgm --candidate-rules new_rules.json recordings/
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import rule_engine
+from ml_model import FraudDetector
+from reputation import ReputationTracker
+from transaction_stream import chunked, iter_ndjson
+from velocity import VelocityTracker
+
+# Recording files are rotated once they reach this size
+MAX_FILE_BYTES = 64 * 1024 * 1024
+
+# Payloads scored per replay task
+CHUNK_SIZE = 5000
+
+# Live payloads waiting for the candidate before new ones are dropped
+QUEUE_SIZE = 10000
+
+# Queued payloads the shadow thread scores per predict_batch call
+BATCH_SIZE = 256
+
+# Flipped decisions kept as examples in a report
+MAX_EXAMPLES = 20
+
+
+class RequestRecorder:
+    """
+    Appends request payloads to numbered NDJSON files in a directory,
+    starting a new file once the current one reaches max_bytes.
+    Numbering continues after files already in the directory.
+    """
+
+    def __init__(self, directory, max_bytes=MAX_FILE_BYTES, prefix="requests"):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.prefix = prefix
+        self.records = 0
+        self._file = None
+        self._size = 0
+        self._sequence = len(glob.glob(os.path.join(directory, f"{prefix}-*.ndjson")))
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f"{self.prefix}-{self._sequence:05d}.ndjson")
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+            self._sequence += 1
+        self._file = open(self.path, "ab", buffering=1 << 16)
+        self._size = self._file.tell()
+
+    def record(self, payload):
+        line = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+        with self._lock:
+            if self._file is None or (self._size and self._size + len(line) > self.max_bytes):
+                self._rotate()
+            self._file.write(line)
+            self._size += len(line)
+            self.records += 1
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self):
+        return {"directory": self.directory, "records": self.records, "current_file": self.path}
+
+
+class ShadowReport:
+    """Decision flips and score deltas between live and candidate results"""
+
+    def __init__(self):
+        self.count = 0
+        self.flips = Counter()              # "APPROVED->BLOCKED" -> count
+        self.delta_sum = 0.0
+        self.abs_delta_sum = 0.0
+        self.delta_histogram = np.zeros(101, dtype=np.int64)   # |delta| rounded to whole points
+        self.examples = []
+
+    def add(self, payload, live, candidate):
+        self.count += 1
+        delta = candidate["risk_score"] - live["risk_score"]
+        self.delta_sum += delta
+        self.abs_delta_sum += abs(delta)
+        self.delta_histogram[min(100, int(round(abs(delta))))] += 1
+        if live["status"] != candidate["status"]:
+            self.flips[f"{live['status']}->{candidate['status']}"] += 1
+            if len(self.examples) < MAX_EXAMPLES:
+                self.examples.append({"transaction": payload,
+                                      "live": {"risk_score": live["risk_score"], "status": live["status"]},
+                                      "candidate": {"risk_score": candidate["risk_score"],
+                                                    "status": candidate["status"]}})
+
+    def merge(self, other):
+        self.count += other.count
+        self.flips.update(other.flips)
+        self.delta_sum += other.delta_sum
+        self.abs_delta_sum += other.abs_delta_sum
+        self.delta_histogram += other.delta_histogram
+        self.examples.extend(other.examples[:MAX_EXAMPLES - len(self.examples)])
+        return self
+
+    def _abs_percentile(self, q):
+        cumulative = np.cumsum(self.delta_histogram)
+        return int(np.searchsorted(cumulative, q * self.count))
+
+    def summary(self):
+        flipped = sum(self.flips.values())
+        return {
+            "transactions": self.count,
+            "flips": dict(self.flips.most_common()),
+            "flip_count": flipped,
+            "flip_rate": round(flipped / self.count, 6) if self.count else 0.0,
+            "score_delta": {
+                "mean": round(self.delta_sum / self.count, 4) if self.count else 0.0,
+                "mean_abs": round(self.abs_delta_sum / self.count, 4) if self.count else 0.0,
+                "p50_abs": self._abs_percentile(0.5) if self.count else 0,
+                "p99_abs": self._abs_percentile(0.99) if self.count else 0,
+                "max_abs": int(np.flatnonzero(self.delta_histogram)[-1]) if self.count else 0
+            },
+            "examples": self.examples
+        }
+
+
+def load_model(snapshot, rules_path=None):
+    """Shadow model for a (snapshot, rules file) pair; rules default to the engine's"""
+    model = FraudDetector.load(snapshot, verify=False)
+    if rules_path:
+        model.rules = rule_engine.Rules.load(rules_path)
+    return model
+
+
+# Per-process models of the current replay, by (snapshot, rules path)
+_worker_models = {}
+
+
+def _worker_model(spec):
+    model = _worker_models.get(spec)
+    if model is None:
+        model = _worker_models[spec] = load_model(*spec)
+        # Reputation, like velocity, is computed once in the parent
+        model.reputation = None
+    return model
+
+
+def _replay_chunk(live, candidate, payloads, velocity_features=None, reputation_features=None):
+    """ShadowReport of one chunk of recorded payloads"""
+    user_ids = [p.get('user_id', 'sarah123') for p in payloads]
+    live_results = _worker_model(live).predict_batch(
+        payloads, user_ids, velocity_features, reputation_features=reputation_features)
+    candidate_results = _worker_model(candidate).predict_batch(
+        payloads, user_ids, velocity_features, reputation_features=reputation_features)
+    report = ShadowReport()
+    for payload, live_result, candidate_result in zip(payloads, live_results, candidate_results):
+        report.add(payload, live_result, candidate_result)
+    return report
+
+
+def recording_files(paths):
+    """Recording files in order; directories expand to their NDJSON files"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.ndjson"))))
+        else:
+            files.append(path)
+    return files
+
+
+def _payloads(paths):
+    for path in recording_files(paths):
+        yield from iter_ndjson(path)
+
+
+def replay(paths, live, candidate, processes=None, chunk_size=CHUNK_SIZE, velocity=True, reputation=True):
+    """
+    Score recorded payloads with the live and candidate models and compare.
+    live and candidate are (snapshot path, rules path or None) pairs.
+    Velocity and reputation features are computed once, in recording
+    order, and shared by both models. Returns the report summary plus
+    throughput.
+    """
+    processes = processes or os.cpu_count() or 1
+    tracker = VelocityTracker(use_timestamps=True) if velocity else None
+    population = ReputationTracker(use_timestamps=True) if reputation else None
+    report = ShadowReport()
+    started = time.perf_counter()
+
+    def tasks():
+        for payloads in chunked(_payloads(paths), chunk_size):
+            features = shared = None
+            if tracker is not None:
+                features = [tracker.observe(p.get('user_id', 'sarah123'), p) for p in payloads]
+            if population is not None:
+                shared = [population.observe(p.get('user_id', 'sarah123'), p) for p in payloads]
+            yield payloads, features, shared
+
+    if processes == 1:
+        _worker_models.clear()
+        for payloads, features, shared in tasks():
+            report.merge(_replay_chunk(live, candidate, payloads, features, shared))
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(processes, mp_context=context) as pool:
+            # At most two chunks per worker in flight, so memory stays bounded
+            pending = []
+            for payloads, features, shared in tasks():
+                pending.append(pool.submit(_replay_chunk, live, candidate, payloads, features, shared))
+                if len(pending) >= processes * 2:
+                    report.merge(pending.pop(0).result())
+            for future in pending:
+                report.merge(future.result())
+
+    elapsed = time.perf_counter() - started
+    summary = report.summary()
+    summary.update({"seconds": round(elapsed, 3),
+                    "throughput_tps": round(report.count / elapsed, 1) if elapsed else 0.0,
+                    "processes": processes})
+    return summary
+
+
+class ShadowScorer:
+    """
+    Scores live requests with a candidate model on a background thread.
+    submit() never blocks: when the queue is full the payload is dropped
+    and counted instead.
+    """
+
+    def __init__(self, candidate, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE):
+        self.candidate = candidate
+        self.batch_size = batch_size
+        self.report = ShadowReport()
+        self.dropped = 0
+        self.errors = 0
+        self._queue = queue.Queue(queue_size)
+        self._thread = threading.Thread(target=self._run, name="shadow-scoring", daemon=True)
+        self._thread.start()
+
+    def submit(self, user_id, transaction, live_result):
+        try:
+            self._queue.put_nowait((user_id, transaction, live_result))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None
+            if stop:
+                batch.pop()
+            if batch:
+                self._score(batch)
+            if stop:
+                return
+
+    def _score(self, batch):
+        user_ids = [user_id for user_id, _, _ in batch]
+        transactions = [transaction for _, transaction, _ in batch]
+        try:
+            results = self.candidate.predict_batch(transactions, user_ids)
+        except Exception:
+            self.errors += len(batch)
+            return
+        for (_, transaction, live_result), result in zip(batch, results):
+            self.report.add(transaction, live_result, result)
+
+    def close(self, timeout=None):
+        """Score what is already queued, then stop the thread"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def stats(self):
+        summary = self.report.summary()
+        summary.update({"candidate_version": self.candidate.model_version,
+                        "queued": self._queue.qsize(), "dropped": self.dropped, "errors": self.errors})
+        return summary
+
+
+# Replay recordings from the command line
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded requests through a live and a candidate model")
+    parser.add_argument("recordings", nargs="+", help="NDJSON recording files or directories")
+    parser.add_argument("--live", required=True, help="Snapshot of the live model")
+    parser.add_argument("--live-rules", help="Rule file of the live model (default: the engine's)")
+    parser.add_argument("--candidate", help="Snapshot of the candidate model (default: the live one)")
+    parser.add_argument("--candidate-rules", help="Rule file of the candidate model")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--no-velocity", action="store_true", help="Score without velocity features")
+    parser.add_argument("--no-reputation", action="store_true", help="Score without reputation features")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    live = (args.live, args.live_rules)
+    candidate = (args.candidate or args.live, args.candidate_rules)
+    print(f"🔄 Replaying {', '.join(args.recordings)} with {args.processes} processes...")
+    summary = replay(args.recordings, live, candidate, args.processes, args.chunk_size,
+                     velocity=not args.no_velocity, reputation=not args.no_reputation)
+    print(f"✅ {summary['transactions']:,} transactions in {summary['seconds']}s "
+          f"({summary['throughput_tps']:,.0f} tx/s)")
+    print(f"🔀 {summary['flip_count']:,} decision flips ({summary['flip_rate']:.3%})")
+    for flip, count in summary["flips"].items():
+        print(f"   {flip}: {count:,}")
+    delta = summary["score_delta"]
+    print(f"📊 Score delta: mean {delta['mean']:+}, mean |delta| {delta['mean_abs']}, "
+          f"p50 {delta['p50_abs']}, p99 {delta['p99_abs']}, max {delta['max_abs']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
@@ -0,0 +1,109 @@
+"""
+Shard Scaling Benchmark for FraudGuard Lite
+Starts a local cluster of 1, 2, ... N shard processes behind the shard
+router, each trained at startup on its users' share of one synthetic
+export, drives /api/risk-score through the router with loadtest.py and
+reports throughput and latency per cluster size.
+
+    python shard_benchmark.py --shards 1,2,4 --users 1e5 --transactions 1e6 --duration 20
+
+Every shard and router worker is a separate process; give the machine at
+least as many cores as the largest cluster has processes, or the numbers
+measure the scheduler instead of the cluster.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from loadtest import run
+from synthetic_scale import write_ndjson_chunks
+
+SHARD_NAMES = "abcdefghijklmnopqrstuvwxyz"
+
+
+def _wait_ready(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def _start(module, port, env, workers=1):
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning", "--no-access-log", "--timeout-keep-alive", "30"],
+        env=env, stdout=subprocess.DEVNULL, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_cluster(num_shards, train_path, workdir, args):
+    """Load test a cluster of num_shards shards and return the loadtest summary"""
+    ports = {SHARD_NAMES[i]: args.base_port + 1 + i for i in range(num_shards)}
+    shards = ",".join(f"{name}=http://127.0.0.1:{port}" for name, port in ports.items())
+    processes = []
+    try:
+        for name, port in ports.items():
+            env = dict(os.environ, FRAUDGUARD_SHARD=name, FRAUDGUARD_SHARDS=shards,
+                       FRAUDGUARD_TRAIN_PATH=train_path, FRAUDGUARD_SCORING_THREADS="2",
+                       FRAUDGUARD_HISTORY_PATH=os.path.join(workdir, f"history-{num_shards}-{name}.db"),
+                       FRAUDGUARD_METRICS="0")
+            processes.append(_start("asgi", port, env))
+        for port in ports.values():
+            _wait_ready(f"http://127.0.0.1:{port}/api/model/info", args.startup_timeout)
+        processes.append(_start("shard_router", args.base_port, dict(os.environ, FRAUDGUARD_SHARDS=shards),
+                                args.router_workers))
+        url = f"http://127.0.0.1:{args.base_port}"
+        _wait_ready(url + "/api/cluster", args.startup_timeout)
+        return asyncio.run(run(url, args.connections, args.duration, users=args.users))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput of 1..N user-sharded scoring nodes")
+    parser.add_argument("--shards", default="1,2,4", help="Cluster sizes to run")
+    parser.add_argument("--users", default="1e5", help="Synthetic users (spread over the shards)")
+    parser.add_argument("--transactions", default="1e6", help="Training transactions")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--router-workers", type=int, default=2)
+    parser.add_argument("--base-port", type=int, default=5100)
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+    args.users = int(float(args.users))
+    num_transactions = int(float(args.transactions))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"🔄 Generating {num_transactions:,} transactions for {args.users:,} users...")
+        train_path, = write_ndjson_chunks(workdir, args.users, num_transactions, chunk_size=num_transactions)
+
+        results = []
+        for num_shards in [int(n) for n in args.shards.split(",")]:
+            print(f"🔄 {num_shards} shard(s)...")
+            summary = run_cluster(num_shards, train_path, workdir, args)
+            summary["shards"] = num_shards
+            results.append(summary)
+            speedup = summary["throughput_rps"] / results[0]["throughput_rps"] if results[0]["throughput_rps"] else 0
+            print(f"📊 {num_shards} shard(s): {summary['throughput_rps']:,.0f} req/s "
+                  f"({speedup:.2f}x), p50 {summary['p50_ms']} ms, p99 {summary['p99_ms']} ms, "
+                  f"{summary['errors']} errors")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
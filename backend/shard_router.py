@@ -0,0 +1,346 @@
+"""
+Shard Router for FraudGuard Lite
+Thin ASGI front for a user-sharded cluster (see sharding.py). Single
+risk-score requests go to the shard that owns the user; batches are
+split per shard, scored by the shards concurrently and put back in
+order. Requests with a user_id query parameter go to that user's shard.
+Model and rules admin calls go to every shard, and fail if any shard
+fails, so the cluster never quietly runs mixed models or rules. History
+is kept per shard, so /api/transactions needs a user_id. The rest (tips,
+model info) goes to the first shard.
+
+The router holds no profiles and does no scoring: it parses the JSON it
+needs for routing and keeps a pool of keep-alive connections per shard.
+Every node, and the router, is given the same shard list:
+
+    FRAUDGUARD_SHARDS=a=http://127.0.0.1:5001,b=http://127.0.0.1:5002 \\
+        uvicorn shard_router:app --port 5000 --workers 2 --no-access-log
+
+Decision streams are per shard; subscribe to each shard's
+/api/stream/decisions directly.
+"""
+
+import asyncio
+import json
+import os
+from collections import Counter
+from urllib.parse import parse_qsl, urlsplit
+
+from sharding import HashRing, parse_shards
+
+# Idle keep-alive connections kept per shard (per router process)
+MAX_IDLE = 64
+
+# Seconds to wait for a shard before answering 502
+SHARD_TIMEOUT = 10.0
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+# Request headers passed on to the shards
+FORWARDED_HEADERS = ('content-type', 'idempotency-key', 'x-deadline-ms', 'if-none-match', 'x-admin-token')
+
+# Calls that change a shard's model or rules, sent to every shard
+BROADCAST_ROUTES = {
+    ('POST', '/api/model/reload'),
+    ('POST', '/api/model/rollback'),
+    ('POST', '/api/rules/reload'),
+}
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-headers', b'Content-Type, Idempotency-Key, If-None-Match, X-Deadline-Ms, X-Admin-Token'),
+    (b'access-control-expose-headers', b'ETag'),
+    (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+]
+
+
+class ShardError(Exception):
+    """A shard could not be reached or answered badly"""
+
+
+class ShardClient:
+    """Keep-alive HTTP/1.1 connections to one shard"""
+
+    def __init__(self, name, url, max_idle=MAX_IDLE, timeout=SHARD_TIMEOUT):
+        parts = urlsplit(url)
+        self.name = name
+        self.url = url
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.netloc = parts.netloc
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle = []
+
+    async def request(self, method, path, body=b'', headers=None):
+        """(status, headers, body) of a request to the shard; raises ShardError"""
+        head = [f"{method} {path} HTTP/1.1", f"Host: {self.netloc}", f"Content-Length: {len(body)}"]
+        head += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        message = ("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body
+        # A pooled connection may have been closed by the shard's keep-alive timeout; retry once on a new one
+        for attempt in range(2):
+            reused = bool(self._idle)
+            try:
+                reader, writer = self._idle.pop() if reused else await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout)
+                writer.write(message)
+                status, response_headers, response_body, keep_alive = await asyncio.wait_for(
+                    self._read_response(reader), self.timeout)
+            except (ConnectionError, OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                if reused and not isinstance(e, asyncio.TimeoutError):
+                    writer.close()
+                    continue
+                raise ShardError(f"Shard {self.name} unavailable: {e or type(e).__name__}")
+            if keep_alive and len(self._idle) < self.max_idle:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, response_headers, response_body
+        raise ShardError(f"Shard {self.name} unavailable")
+
+    @staticmethod
+    async def _read_response(reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed")
+        keep_alive = status_line.startswith(b"HTTP/1.1")
+        headers, length = {}, None
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(":")
+            name, value = name.strip().lower(), value.strip()
+            headers[name] = value
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection":
+                keep_alive = value.lower() == "keep-alive" or (keep_alive and value.lower() != "close")
+        if length is None:
+            body = await reader.read()
+            keep_alive = False
+        else:
+            body = await reader.readexactly(length)
+        return int(status_line.split()[1]), headers, body, keep_alive
+
+    def close(self):
+        while self._idle:
+            self._idle.pop()[1].close()
+
+
+class ShardRouter:
+    """Routes API requests to the shards that own their users"""
+
+    def __init__(self, shards):
+        self.ring = HashRing(shards)
+        self.urls = dict(shards)
+        missing = [name for name, url in self.urls.items() if not url]
+        if missing:
+            raise ValueError(f"No URL for shard {', '.join(missing)}")
+        self.forwarded = Counter()
+        self.errors = Counter()
+        self._clients = {}
+
+    def client(self, name):
+        # Connections belong to the event loop that opened them, so each router process makes its own
+        client = self._clients.get(name)
+        if client is None:
+            client = self._clients[name] = ShardClient(name, self.urls[name])
+        return client
+
+    async def forward(self, name, method, path, body=b'', headers=None):
+        self.forwarded[name] += 1
+        try:
+            return await self.client(name).request(method, path, body, headers)
+        except ShardError:
+            self.errors[name] += 1
+            raise
+
+    async def score_batch(self, transactions, headers):
+        """Results of a batch, scored by each transaction's shard, in input order"""
+        user_ids = [tx.get('user_id', 'sarah123') for tx in transactions]
+        groups = self.ring.split(user_ids)
+
+        async def score(name, positions):
+            body = json.dumps({"transactions": [transactions[i] for i in positions]}).encode('utf-8')
+            status, _, response = await self.forward(name, 'POST', '/api/risk-score/batch', body, headers)
+            if status != 200:
+                raise ShardError(f"Shard {name} answered {status}")
+            return positions, json.loads(response)["results"]
+
+        results = [None] * len(transactions)
+        for positions, shard_results in await asyncio.gather(*(score(name, positions)
+                                                                for name, positions in groups.items())):
+            for i, result in zip(positions, shard_results):
+                results[i] = result
+        return results
+
+    async def broadcast(self, method, path, body, headers):
+        """
+        (all succeeded, {shard: {"status", "response"}}) of the same call
+        sent to every shard concurrently
+        """
+        async def call(name):
+            try:
+                status, _, response = await self.forward(name, method, path, body, headers)
+            except ShardError as e:
+                return name, {"status": 502, "response": {"error": str(e)}}
+            try:
+                response = json.loads(response) if response else None
+            except ValueError:
+                response = response.decode('utf-8', 'replace')
+            return name, {"status": status, "response": response}
+
+        replies = dict(await asyncio.gather(*(call(name) for name in self.ring.nodes)))
+        return all(200 <= reply["status"] < 300 for reply in replies.values()), replies
+
+    def stats(self):
+        return {
+            "nodes": self.ring.nodes,
+            "vnodes": self.ring.vnodes,
+            "shards": {name: {"url": self.urls[name], "forwarded": self.forwarded[name],
+                              "errors": self.errors[name]} for name in self.ring.nodes}
+        }
+
+    def close(self):
+        for client in self._clients.values():
+            client.close()
+        self._clients.clear()
+
+
+router = None
+
+
+def get_router():
+    global router
+    if router is None:
+        router = ShardRouter(parse_shards(os.environ.get('FRAUDGUARD_SHARDS')))
+    return router
+
+
+async def _read_body(receive):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return False
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def _send(send, status, body, content_type=b'application/json', headers=()):
+    headers = [(b'content-type', content_type), (b'content-length', str(len(body)).encode())] + \
+        list(headers) + CORS_HEADERS
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _error(message):
+    return json.dumps({"error": message}).encode('utf-8')
+
+
+def _json_object(body):
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def _route(shard_router, method, path, query_string, headers, body):
+    """(status, body, content type, extra headers) for one request"""
+    query = dict(parse_qsl(query_string))
+    forward_headers = {name: value for name, value in headers.items() if name in FORWARDED_HEADERS}
+    target_path = f"{path}?{query_string}" if query_string else path
+
+    if (method, path) == ('GET', '/api/cluster'):
+        return 200, json.dumps(shard_router.stats()).encode('utf-8'), b'application/json', []
+    if path == '/api/stream/decisions':
+        return 404, _error("Decision streams are per shard; subscribe to each shard directly"), b'application/json', []
+
+    if (method, path) in BROADCAST_ROUTES:
+        succeeded, replies = await shard_router.broadcast(method, target_path, body, forward_headers)
+        if not succeeded:
+            failed = sorted(name for name, reply in replies.items() if not 200 <= reply["status"] < 300)
+            payload = {"error": f"Failed on shard {', '.join(failed)}; the cluster may be mixed", "shards": replies}
+            return 502, json.dumps(payload).encode('utf-8'), b'application/json', []
+        status = max(reply["status"] for reply in replies.values())
+        return status, json.dumps({"shards": replies}).encode('utf-8'), b'application/json', []
+
+    if (method, path) == ('GET', '/api/transactions') and not query.get('user_id'):
+        return 400, _error("History is kept per shard; filter by user_id"), b'application/json', []
+
+    if (method, path) == ('POST', '/api/risk-score/batch'):
+        data = _json_object(body)
+        if data is None:
+            return 400, _error("Request body must be a JSON object"), b'application/json', []
+        results = await shard_router.score_batch(data.get('transactions', []), forward_headers)
+        return 200, json.dumps({"results": results, "count": len(results)}).encode('utf-8'), b'application/json', []
+
+    if (method, path) == ('POST', '/api/risk-score'):
+        data = _json_object(body)
+        if data is None:
+            return 400, _error("Request body must be a JSON object"), b'application/json', []
+        name = shard_router.ring.node(data.get('user_id', 'sarah123'))
+    elif 'user_id' in query:
+        name = shard_router.ring.node(query['user_id'])
+    else:
+        name = shard_router.ring.nodes[0]
+
+    status, response_headers, response = await shard_router.forward(name, method, target_path, body, forward_headers)
+    extra = [(b'etag', response_headers['etag'].encode('latin-1'))] if 'etag' in response_headers else []
+    content_type = response_headers.get('content-type', 'application/json').encode('latin-1')
+    return status, response, content_type, extra
+
+
+async def app(scope, receive, send):
+    """ASGI application routing the API to the shards"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                get_router()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if router is not None:
+                    router.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+    if scope['method'] == 'OPTIONS':
+        return await _send(send, 204, b'')
+
+    body = await _read_body(receive)
+    if body is None:
+        return
+    if body is False:
+        return await _send(send, 413, _error("Request body too large"))
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+    try:
+        status, response, content_type, extra = await _route(
+            get_router(), scope['method'], scope['path'], scope.get('query_string', b'').decode('latin-1'),
+            headers, body)
+    except ShardError as e:
+        return await _send(send, 502, _error(str(e)))
+    await _send(send, status, response, content_type, extra)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(
+        'shard_router:app',
+        host='0.0.0.0',
+        port=int(os.environ.get('PORT', 5000)),
+        workers=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)),
+        backlog=int(os.environ.get('FRAUDGUARD_BACKLOG', 2048)),
+        timeout_keep_alive=int(os.environ.get('FRAUDGUARD_KEEPALIVE', 5)),
+        limit_concurrency=int(os.environ.get('FRAUDGUARD_MAX_CONNECTIONS', 2000)),
+        access_log=False
+    )
@@ -0,0 +1,190 @@
+"""
+User Sharding for FraudGuard Lite
+Splits users between scoring nodes with a consistent-hash ring, so each
+node trains and serves only its share of the profiles.
+
+Every node is placed on the ring at VNODES points hashed from its name,
+and a user belongs to the node at the first point at or after the hash
+of their user_id. Adding a node only takes over the users just before
+its own points, about 1/N of them, all moved from the existing nodes to
+the new one; everybody else keeps their node. Nodes and the router build
+the same ring from the same FRAUDGUARD_SHARDS list, in any order.
+
+rebalance carries a resize out on trained shard snapshots: the profiles
+of the users that change owner are taken out of their old shard's
+snapshot and merged into their new shard's, so nothing is retrained.
+
+    python sharding.py plan transactions.ndjson --shards a,b,c --add d
+    python sharding.py train transactions.ndjson --shards a,b,c --out models/
+    python sharding.py rebalance --shards a,b,c --add d --out models/
+"""
+
+import argparse
+import bisect
+import hashlib
+import os
+import sys
+from collections import Counter
+
+from transaction_stream import iter_transactions
+
+# Points per node; more even out the shares at the cost of a larger ring
+VNODES = 160
+
+
+def _point(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def parse_shards(text):
+    """{name: url} from 'a=http://host-a:5000,b=http://host-b:5000' (urls optional)"""
+    shards = {}
+    for item in (text or '').split(','):
+        name, _, url = item.strip().partition('=')
+        if name:
+            shards[name.strip()] = url.strip() or None
+    if not shards:
+        raise ValueError("No shards configured")
+    return shards
+
+
+class HashRing:
+    """Consistent-hash ring of node names"""
+
+    def __init__(self, nodes, vnodes=VNODES):
+        self.nodes = sorted(set(nodes))
+        if not self.nodes:
+            raise ValueError("A hash ring needs at least one node")
+        self.vnodes = vnodes
+        ring = sorted((_point(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._points = [point for point, _ in ring]
+        self._owners = [node for _, node in ring]
+
+    def node(self, user_id):
+        """Node that owns user_id"""
+        index = bisect.bisect_left(self._points, _point(str(user_id)))
+        return self._owners[index % len(self._owners)]
+
+    def owns(self, node):
+        """Predicate for transactions whose user belongs to node"""
+        if node not in self.nodes:
+            raise ValueError(f"Unknown shard {node!r}; the ring has {', '.join(self.nodes)}")
+        return lambda transaction: self.node(transaction.get('user_id', 'sarah123')) == node
+
+    def split(self, user_ids):
+        """{node: [positions in user_ids]} for routing a batch"""
+        groups = {}
+        for i, user_id in enumerate(user_ids):
+            groups.setdefault(self.node(user_id), []).append(i)
+        return groups
+
+    def with_node(self, node):
+        return HashRing(self.nodes + [node], self.vnodes)
+
+    def without_node(self, node):
+        return HashRing([other for other in self.nodes if other != node], self.vnodes)
+
+    def moves(self, other, user_ids):
+        """Counter of (from node, to node) for the user_ids that change owner in other"""
+        return Counter((self.node(u), other.node(u)) for u in user_ids if self.node(u) != other.node(u))
+
+
+def snapshot_path(directory, node):
+    return os.path.join(directory, f"shard-{node}.fgsnap")
+
+
+def rebalance(ring, target, directory):
+    """
+    Rewrite the shard-<name>.fgsnap snapshots in directory, trained for
+    ring, so they match target: every shard keeps the profiles of the
+    users it still owns and receives those moving to it. New shards take
+    the classifier of an existing one. Snapshots of shards
+    that left the ring are left in place. Returns the moves made, as
+    HashRing.moves counts them.
+    """
+    from ml_model import FraudDetector
+    from profile_store import ProfileStore
+
+    sources = {node: FraudDetector.load(snapshot_path(directory, node))
+               for node in ring.nodes}
+    template = sources[ring.nodes[0]]
+    stores = {}
+    for node in target.nodes:
+        stores[node] = ProfileStore()
+        stores[node].clock = template.user_profiles.clock
+    moves = Counter()
+    for node, detector in sources.items():
+        groups = {}
+        for user_id in detector.user_profiles.user_ids:
+            groups.setdefault(target.node(user_id), []).append(user_id)
+        for destination, user_ids in groups.items():
+            stores[destination].merge(detector.user_profiles.take(user_ids))
+            if destination != node:
+                moves[(node, destination)] += len(user_ids)
+
+    for node in target.nodes:
+        detector = sources.get(node)
+        if detector is None:
+            detector = FraudDetector()
+            detector.classifier = template.classifier
+            detector.model_confidence = template.model_confidence
+            detector.is_trained = template.is_trained
+        detector.user_profiles = stores[node]
+        detector.save(snapshot_path(directory, node))
+    return moves
+
+
+# Plan a resize, or train one snapshot per shard, from the command line
+if __name__ == "__main__":
+    from ml_model import FraudDetector
+    from transaction_stream import train_from_file
+
+    parser = argparse.ArgumentParser(description="Consistent-hash user sharding")
+    parser.add_argument("command", choices=["plan", "train", "rebalance"])
+    parser.add_argument("transactions", nargs="?", help="plan/train: NDJSON/JSON transaction export")
+    parser.add_argument("--shards", required=True, help="Shard names, e.g. a,b,c")
+    parser.add_argument("--add", help="plan/rebalance: shard to add")
+    parser.add_argument("--remove", help="plan/rebalance: shard to remove")
+    parser.add_argument("--out", default=".", help="train/rebalance: directory of shard-<name>.fgsnap files")
+    args = parser.parse_args()
+    if args.command != "rebalance" and not args.transactions:
+        parser.error(f"{args.command} needs a transaction export")
+
+    ring = HashRing(parse_shards(args.shards))
+    if args.command == "rebalance":
+        target = ring
+        if args.add:
+            target = target.with_node(args.add)
+        if args.remove:
+            target = target.without_node(args.remove)
+        moves = rebalance(ring, target, args.out)
+        print(f"🔄 {sum(moves.values()):,} users moved")
+        for (source, destination), count in sorted(moves.items()):
+            print(f"   {source} -> {destination}: {count:,}")
+        for node in target.nodes:
+            print(f"✅ Shard {node} -> {snapshot_path(args.out, node)}")
+        sys.exit(0)
+    if args.command == "plan":
+        users = {tx.get('user_id', 'sarah123') for tx in iter_transactions(args.transactions)}
+        target = ring
+        if args.add:
+            target = target.with_node(args.add)
+        if args.remove:
+            target = target.without_node(args.remove)
+        before, after = Counter(map(ring.node, users)), Counter(map(target.node, users))
+        for node in sorted(set(ring.nodes) | set(target.nodes)):
+            print(f"📊 {node}: {before[node]:,} -> {after[node]:,} users")
+        moves = ring.moves(target, users)
+        moved = sum(moves.values())
+        print(f"🔄 {moved:,} of {len(users):,} users move ({moved / max(len(users), 1):.1%})")
+        for (source, destination), count in sorted(moves.items()):
+            print(f"   {source} -> {destination}: {count:,}")
+        sys.exit(0)
+
+    os.makedirs(args.out, exist_ok=True)
+    for node in ring.nodes:
+        detector = FraudDetector()
+        count = train_from_file(detector, args.transactions, keep=ring.owns(node))
+        path = snapshot_path(args.out, node)
+        detector.save(path)
+        print(f"✅ Shard {node}: {count:,} transactions, {len(detector.user_profiles):,} users -> {path}")
@@ -55,6 +55,10 @@ FRAUD_PATTERNS = [
     {"type": "midnight_shopping", "amount_multiplier": 2.5, "merchants": ["Walmart", "Gas Station", "Online Casino"]}
 ]
 
+# Flattened merchant list and merchant -> category lookup
+ALL_MERCHANTS = [m for category in MERCHANT_CATEGORIES.values() for m in category]
+MERCHANT_CATEGORY = {m: cat for cat, merchants in MERCHANT_CATEGORIES.items() for m in merchants}
+
 def generate_legitimate_transaction(user_id=None, days_ago=0):
     """
     Generate a legitimate-looking transaction based on user's normal behavior.
@@ -81,8 +85,7 @@ def generate_legitimate_transaction(user_id=None, days_ago=0):
     if random.random() < 0.8:
         merchant = random.choice(profile["favorite_merchants"])
     else:
-        all_merchants = [m for category in MERCHANT_CATEGORIES.values() for m in category]
-        merchant = random.choice(all_merchants)
+        merchant = random.choice(ALL_MERCHANTS)
     
     # Generate realistic typing speed (characters per minute)
     typing_speed = random.randint(40, 120)  # Normal human typing speed
@@ -96,8 +99,7 @@ def generate_legitimate_transaction(user_id=None, days_ago=0):
         "user_name": profile["name"],
         "amount": amount,
         "merchant": merchant,
-        "category": next((cat for cat, merchants in MERCHANT_CATEGORIES.items() 
-                         if merchant in merchants), "Other"),
+        "category": MERCHANT_CATEGORY.get(merchant, "Other"),
         "timestamp": transaction_time.isoformat(),
         "device": profile["usual_device"],
         "location": profile["usual_location"],
@@ -118,8 +120,8 @@ def generate_fraudulent_transaction(user_id=None):
     fraud_pattern = random.choice(FRAUD_PATTERNS)
     
     # Unusual time (outside normal hours)
-    if fraud_pattern["type"] == "midnight_shopping":
-        hour = random.choice([0, 1, 2, 3, 4, 5])  # Very early morning
+    if fraud_pattern["type"] == "midnight_shopping" or profile["normal_hours"][1] >= 23:
+        hour = random.choice([0, 1, 2, 3, 4, 5])  # Very early morning (or no later hours left)
     else:
         hour = random.randint(profile["normal_hours"][1] + 1, 23)  # After normal hours
     
@@ -203,6 +205,24 @@ def save_to_json(transactions, filename="transactions.json"):
     print(f"✅ Saved {len(transactions)} transactions to {filepath}")
     return filepath
 
+def save_to_ndjson(transactions, filename="transactions.ndjson"):
+    """
+    Save transactions to an NDJSON file, one JSON object per line.
+    Accepts any iterable, so a generator is written without holding it in memory.
+    """
+    os.makedirs("../demo_data", exist_ok=True)
+    filepath = os.path.join("../demo_data", filename)
+    
+    count = 0
+    with open(filepath, "w") as f:
+        for tx in transactions:
+            f.write(json.dumps(tx, default=str))
+            f.write("\n")
+            count += 1
+    
+    print(f"✅ Saved {count} transactions to {filepath}")
+    return filepath
+
 def generate_demo_dataset():
     """
     Generate a complete demo dataset for all users.
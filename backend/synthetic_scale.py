@@ -0,0 +1,291 @@
+"""
+Scale-test Data Generator for FraudGuard Lite
+Vectorized, seedable counterpart of synthetic_data for load and scale
+testing: millions of synthetic users and tens of millions of transactions,
+generated a day at a time with NumPy and streamed to chunked NDJSON files.
+
+Rows have the same fields as generate_transaction_history produces, and
+fraudulent rows follow FRAUD_PATTERNS. Each day is drawn from its own
+(seed, day) random stream, so the output is identical from run to run
+whatever the chunk size, and timestamps increase across the whole stream,
+so it can be replayed in order.
+
+    python synthetic_scale.py --users 1e6 --transactions 1e7 --out ../demo_data/scale
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from synthetic_data import ALL_MERCHANTS, FRAUD_PATTERNS, MERCHANT_CATEGORIES, MERCHANT_CATEGORY
+
+# Rows generated (and written per file) at a time
+CHUNK_SIZE = 100000
+
+# Default end of the generated time span; fixed so output depends only on the seed
+DEFAULT_END = datetime(2024, 6, 1)
+_EPOCH = datetime(1970, 1, 1)
+
+DEVICES = ["iPhone", "Windows_PC", "MacBook", "Android", "iPad"]
+FRAUD_DEVICES = ["Unknown_Device", "Emulator", "Virtual_Machine", "Tor_Browser"]
+LOCATIONS = ["New York, NY", "Chicago, IL", "San Francisco, CA", "Austin, TX", "Seattle, WA",
+             "Boston, MA", "Miami, FL", "Denver, CO", "Atlanta, GA", "Los Angeles, CA"]
+FRAUD_LOCATIONS = ["Overseas", "VPN Detected", "Unknown"]
+FAVORITE_MERCHANTS = 5
+
+# Every merchant and its category, legitimate ones first
+_LEGIT_MERCHANTS = ALL_MERCHANTS
+MERCHANTS = _LEGIT_MERCHANTS + sorted({m for p in FRAUD_PATTERNS for m in p["merchants"]} - set(_LEGIT_MERCHANTS))
+CATEGORIES = list(MERCHANT_CATEGORIES) + ["High Risk"]
+_MERCHANT_CATEGORY = np.array([CATEGORIES.index(MERCHANT_CATEGORY.get(m, "High Risk")) for m in MERCHANTS])
+_PATTERN_SIZES = np.array([len(p["merchants"]) for p in FRAUD_PATTERNS])
+_PATTERN_MERCHANTS = np.array([[MERCHANTS.index(p["merchants"][i % len(p["merchants"])])
+                                for i in range(_PATTERN_SIZES.max())] for p in FRAUD_PATTERNS])
+_PATTERN_MULTIPLIER = np.array([p["amount_multiplier"] for p in FRAUD_PATTERNS])
+_MIDNIGHT = np.array([p["type"] == "midnight_shopping" for p in FRAUD_PATTERNS])
+
+
+class UserPopulation:
+    """Per-user behaviour profiles, stored column-wise"""
+
+    def __init__(self, num_users, seed=0):
+        rng = np.random.default_rng((seed, 0xFEED))
+        self.num_users = num_users
+        self.seed = seed
+        self.start_hour = rng.integers(6, 15, num_users, dtype=np.int8)
+        self.end_hour = np.minimum(self.start_hour + rng.integers(4, 13, num_users, dtype=np.int8), 23)
+        self.avg_amount = np.round(rng.lognormal(np.log(80), 0.5, num_users), 2)
+        self.device = rng.integers(0, len(DEVICES), num_users, dtype=np.int8)
+        self.location = rng.integers(0, len(LOCATIONS), num_users, dtype=np.int8)
+        self.favorites = rng.integers(0, len(_LEGIT_MERCHANTS), (num_users, FAVORITE_MERCHANTS), dtype=np.int16)
+
+    def profile(self, user):
+        """One user's profile, in the USER_PROFILES format"""
+        return {
+            "name": f"User {user}",
+            "normal_hours": [int(self.start_hour[user]), int(self.end_hour[user])],
+            "avg_amount": float(self.avg_amount[user]),
+            "usual_device": DEVICES[self.device[user]],
+            "usual_location": LOCATIONS[self.location[user]],
+            "favorite_merchants": [MERCHANTS[m] for m in self.favorites[user]]
+        }
+
+
+def _fraud_weights(fraud_mix):
+    """Pattern probabilities from a {pattern type: weight} mix (uniform by default)"""
+    if fraud_mix is None:
+        return np.full(len(FRAUD_PATTERNS), 1 / len(FRAUD_PATTERNS))
+    known = {p["type"] for p in FRAUD_PATTERNS}
+    unknown = set(fraud_mix) - known
+    if unknown:
+        raise ValueError(f"Unknown fraud patterns: {sorted(unknown)}")
+    weights = np.array([float(fraud_mix.get(p["type"], 0)) for p in FRAUD_PATTERNS])
+    if weights.sum() <= 0:
+        raise ValueError("fraud_mix needs at least one positive weight")
+    return weights / weights.sum()
+
+
+def generate_day(population, day, size, first_id=0, fraud_percentage=0.2, fraud_mix=None):
+    """
+    One day of transactions as a dict of columns, sorted by timestamp.
+    day counts days since the Unix epoch and seeds the day's random stream.
+    """
+    rng = np.random.default_rng((population.seed, day))
+    users = rng.integers(0, population.num_users, size)
+    fraud = rng.random(size) < fraud_percentage
+    pattern = np.where(fraud, rng.choice(len(FRAUD_PATTERNS), size, p=_fraud_weights(fraud_mix)), -1)
+
+    start_hour = population.start_hour[users].astype(np.int64)
+    end_hour = population.end_hour[users].astype(np.int64)
+    avg_amount = population.avg_amount[users]
+
+    # Legitimate rows: inside the user's hours, near their average, usually a favourite merchant
+    hour = start_hour + (rng.random(size) * (end_hour - start_hour)).astype(np.int64)
+    amount = avg_amount * rng.uniform(0.7, 1.3, size)
+    favorite = population.favorites[users, rng.integers(0, FAVORITE_MERCHANTS, size)]
+    merchant = np.where(rng.random(size) < 0.8, favorite, rng.integers(0, len(_LEGIT_MERCHANTS), size))
+    device = population.device[users].astype(np.int64)
+    location = population.location[users].astype(np.int64)
+    typing_speed = rng.integers(40, 121, size)
+    risk_score = rng.integers(5, 26, size)
+
+    # Fraudulent rows: odd hours, pattern amounts and merchants, unknown devices, bot-like typing
+    rows = np.flatnonzero(fraud)
+    if len(rows):
+        p = pattern[rows]
+        n = len(rows)
+        after_hours = end_hour[rows] + 1 + (rng.random(n) * (23 - end_hour[rows])).astype(np.int64)
+        early = (rng.random(n) * 6).astype(np.int64)
+        # Users whose day ends at 23:00 have no later hours, so they are hit early instead
+        hour[rows] = np.where(_MIDNIGHT[p] | (end_hour[rows] >= 23), early, after_hours)
+        amount[rows] = avg_amount[rows] * _PATTERN_MULTIPLIER[p] * rng.uniform(0.9, 1.1, n)
+        pick = (rng.random(n) * _PATTERN_SIZES[p]).astype(np.int64)
+        merchant[rows] = _PATTERN_MERCHANTS[p, pick]
+        device[rows] = len(DEVICES) + rng.integers(0, len(FRAUD_DEVICES), n)
+        location[rows] = len(LOCATIONS) + rng.integers(0, len(FRAUD_LOCATIONS), n)
+        typing_speed[rows] = np.where(rng.random(n) < 0.5, rng.integers(180, 251, n), rng.integers(10, 31, n))
+        risk_score[rows] = rng.integers(75, 99, n)
+
+    seconds = day * 86400 + hour * 3600 + rng.integers(0, 3600, size)
+    order = np.argsort(seconds, kind="stable")
+
+    category = _MERCHANT_CATEGORY[merchant]
+    category[fraud] = len(CATEGORIES) - 1
+    return {
+        "transaction_id": np.arange(first_id, first_id + size),
+        "user": users[order],
+        "amount": np.round(amount, 2)[order],
+        "merchant": merchant[order],
+        "category": category[order],
+        "timestamp": np.datetime_as_string(seconds[order].astype("datetime64[s]")),
+        "device": device[order],
+        "location": location[order],
+        "typing_speed": typing_speed[order],
+        "risk_score": risk_score[order],
+        "is_fraudulent": fraud[order],
+        "fraud_pattern": pattern[order]
+    }
+
+
+def iter_chunks(num_users, num_transactions, fraud_percentage=0.2, fraud_mix=None, seed=0,
+                chunk_size=CHUNK_SIZE, days=30, end=DEFAULT_END, population=None):
+    """
+    Yield the stream as column chunks of chunk_size rows (the last may be
+    shorter). Rows are generated a day at a time and spread evenly over the
+    days before end, so timestamps never go backwards and the rows don't
+    depend on chunk_size.
+    """
+    population = population or UserPopulation(num_users, seed)
+    last_day = (end - _EPOCH).days
+    per_day, extra = divmod(num_transactions, days)
+    pending = None
+    first_id = 0
+    for i in range(days):
+        size = per_day + (i < extra)
+        if not size:
+            continue
+        columns = generate_day(population, last_day - days + i, size, first_id, fraud_percentage, fraud_mix)
+        first_id += size
+        if pending is not None:
+            columns = {name: np.concatenate([pending[name], column]) for name, column in columns.items()}
+        total = len(columns["user"])
+        full = total - total % chunk_size
+        for start in range(0, full, chunk_size):
+            yield {name: column[start:start + chunk_size] for name, column in columns.items()}
+        pending = {name: column[full:] for name, column in columns.items()} if full < total else None
+    if pending is not None:
+        yield pending
+
+
+_DEVICE_JSON = [json.dumps(d) for d in DEVICES + FRAUD_DEVICES]
+_LOCATION_JSON = [json.dumps(loc) for loc in LOCATIONS + FRAUD_LOCATIONS]
+_MERCHANT_JSON = [json.dumps(m) for m in MERCHANTS]
+_CATEGORY_JSON = [json.dumps(c) for c in CATEGORIES]
+_PATTERN_SUFFIX = [', "fraud_pattern": ' + json.dumps(p["type"]) for p in FRAUD_PATTERNS] + [""]
+
+
+def chunk_records(columns):
+    """Transaction dicts for a chunk, in the generate_transaction_history format"""
+    devices = DEVICES + FRAUD_DEVICES
+    locations = LOCATIONS + FRAUD_LOCATIONS
+    records = []
+    for tx_id, user, amount, merchant, category, timestamp, device, location, typing_speed, risk, fraud, pattern in zip(
+            *(columns[name].tolist() for name in ("transaction_id", "user", "amount", "merchant", "category",
+                                                  "timestamp", "device", "location", "typing_speed",
+                                                  "risk_score", "is_fraudulent", "fraud_pattern"))):
+        record = {
+            "transaction_id": f"tx_{tx_id}",
+            "user_id": f"user_{user}",
+            "user_name": f"User {user}",
+            "amount": amount,
+            "merchant": MERCHANTS[merchant],
+            "category": CATEGORIES[category],
+            "timestamp": timestamp,
+            "device": devices[device],
+            "location": locations[location],
+            "typing_speed": typing_speed,
+            "risk_score": risk,
+            "status": "BLOCKED" if fraud else "APPROVED",
+            "is_fraudulent": fraud
+        }
+        if fraud:
+            record["fraud_pattern"] = FRAUD_PATTERNS[pattern]["type"]
+        records.append(record)
+    return records
+
+
+def chunk_ndjson(columns):
+    """A chunk as NDJSON text, formatted directly from the columns"""
+    lines = []
+    for tx_id, user, amount, merchant, category, timestamp, device, location, typing_speed, risk, fraud, pattern in zip(
+            *(columns[name].tolist() for name in ("transaction_id", "user", "amount", "merchant", "category",
+                                                  "timestamp", "device", "location", "typing_speed",
+                                                  "risk_score", "is_fraudulent", "fraud_pattern"))):
+        lines.append(
+            f'{{"transaction_id": "tx_{tx_id}", "user_id": "user_{user}", "user_name": "User {user}", '
+            f'"amount": {amount}, "merchant": {_MERCHANT_JSON[merchant]}, "category": {_CATEGORY_JSON[category]}, '
+            f'"timestamp": "{timestamp}", "device": {_DEVICE_JSON[device]}, "location": {_LOCATION_JSON[location]}, '
+            f'"typing_speed": {typing_speed}, "risk_score": {risk}, '
+            f'"status": "{"BLOCKED" if fraud else "APPROVED"}", "is_fraudulent": {"true" if fraud else "false"}'
+            f'{_PATTERN_SUFFIX[pattern]}}}\n')
+    return "".join(lines)
+
+
+def iter_transactions(num_users, num_transactions, **options):
+    """Yield transaction dicts one at a time, generated a chunk at a time"""
+    for columns in iter_chunks(num_users, num_transactions, **options):
+        yield from chunk_records(columns)
+
+
+def write_ndjson_chunks(directory, num_users, num_transactions, prefix="transactions", **options):
+    """
+    Write the stream as numbered NDJSON files, one chunk per file, and
+    return their paths. Each file can be read with transaction_stream.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for chunk, columns in enumerate(iter_chunks(num_users, num_transactions, **options)):
+        path = os.path.join(directory, f"{prefix}-{chunk:05d}.ndjson")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(chunk_ndjson(columns))
+        os.replace(tmp_path, path)
+        paths.append(path)
+    return paths
+
+
+def _parse_mix(text):
+    """'gift_card_spree=2,midnight_shopping=1' -> {pattern: weight}"""
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a large synthetic transaction stream")
+    parser.add_argument("--users", default="1e5", help="Number of synthetic users")
+    parser.add_argument("--transactions", default="1e6", help="Number of transactions")
+    parser.add_argument("--fraud", type=float, default=0.2, help="Fraction of fraudulent transactions")
+    parser.add_argument("--mix", help="Fraud pattern weights, e.g. gift_card_spree=2,midnight_shopping=1")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--out", default="../demo_data/scale")
+    args = parser.parse_args()
+
+    num_users, num_transactions = int(float(args.users)), int(float(args.transactions))
+    print(f"🔄 Generating {num_transactions:,} transactions for {num_users:,} users...")
+    started = time.perf_counter()
+    paths = write_ndjson_chunks(args.out, num_users, num_transactions,
+                                fraud_percentage=args.fraud,
+                                fraud_mix=_parse_mix(args.mix) if args.mix else None,
+                                seed=args.seed, chunk_size=args.chunk_size, days=args.days)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Wrote {len(paths)} files to {args.out} in {elapsed:.1f}s "
+          f"({num_transactions / elapsed:,.0f} tx/s)")
@@ -0,0 +1,44 @@
+from admission import AdmissionController
+from test_ml_model import make_detector
+
+
+def test_deadline_from_header_or_default():
+    controller = AdmissionController(default_deadline_ms=250)
+    assert controller.deadline('100', now=10.0) == 10.1
+    assert controller.deadline(None, now=10.0) == 10.25
+    assert controller.deadline('soon', now=10.0) == 10.25
+    assert controller.deadline('-5', now=10.0) == 10.25
+
+
+def test_degrades_on_overload_deadline_and_latency():
+    controller = AdmissionController(max_in_flight=2, probe_every=4)
+    assert controller.check(deadline=1.0, now=0.0) is None
+    assert controller.check(deadline=1.0, now=1.0) == 'deadline'
+    
+    for _ in range(3):
+        controller.enter()
+    assert controller.overloaded() and controller.check(deadline=1.0, now=0.0) == 'overload'
+    for _ in range(3):
+        controller.leave()
+    
+    # Full scoring has been taking 50ms: a request with 20ms left degrades, bar the probes
+    for _ in range(100):
+        controller.observe(0.05, now=0.0)
+    reasons = [controller.check(deadline=1.02, now=1.0) for _ in range(8)]
+    assert reasons.count('latency') == 6 and reasons.count(None) == 2
+    assert controller.check(deadline=1.1, now=1.0) is None
+    
+    # Once the samples expire the full model gets every request again
+    assert controller.check(deadline=20.02, now=20.0) is None and controller.p99(now=20.0) is None
+    
+    stats = controller.stats()
+    assert stats['degraded'] == {'overload': 1, 'deadline': 1, 'latency': 6}
+    assert stats['admitted'] == 5 and stats['in_flight'] == 0
+
+
+def test_predict_degraded_uses_the_fallback_scorer():
+    detector, _ = make_detector()
+    transaction = {'amount': 50, 'merchant': 'Amazon', 'device': 'iPhone', 'typing_speed': 80}
+    result = detector.predict_degraded(transaction, 'sarah123')
+    assert result['degraded'] is True
+    assert 'degraded' not in detector.predict(transaction, 'sarah123')
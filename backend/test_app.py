@@ -1,5 +1,6 @@
 import sys
 import os
+import time
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import app
@@ -22,4 +23,164 @@ def test_risk_score_endpoint():
         assert response.status_code == 200
         data = response.get_json()
         assert 'risk_score' in data
-        assert 0 <= data['risk_score'] <= 100
\ No newline at end of file
+        assert 0 <= data['risk_score'] <= 100
+
+
+def test_risk_score_batch_matches_single():
+    """Batch endpoint returns the same decisions as the single endpoint"""
+    transactions = [
+        {'user_id': 'sarah123', 'amount': 85, 'device': 'iPhone', 'typing_speed': 80},
+        {'user_id': 'sarah123', 'amount': 310.5, 'device': 'Emulator', 'typing_speed': 220},
+        {'user_id': 'john_doe', 'amount': 1000, 'device': 'Windows_PC', 'typing_speed': 10},
+        {'user_id': 'nobody', 'amount': 250},
+        {'amount': 171}
+    ]
+    with app.test_client() as client:
+        response = client.post('/api/risk-score/batch', json={'transactions': transactions})
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['count'] == len(transactions)
+        
+        for tx, batch_result in zip(transactions, data['results']):
+            single = client.post('/api/risk-score', json=tx).get_json()
+            for key in ('risk_score', 'status', 'color', 'reasons'):
+                assert batch_result[key] == single[key]
+
+def test_model_reload_and_rollback(tmp_path, monkeypatch):
+    """A new snapshot is swapped in by the registry and can be rolled back"""
+    import app as app_module
+    from app import registry
+    from test_ml_model import make_detector
+    
+    detector, _ = make_detector()
+    version = detector.save(str(tmp_path / "model.fgsnap"))
+    original = registry.active
+    monkeypatch.setattr(app_module, 'MODEL_DIR', str(tmp_path))
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+    admin = {'X-Admin-Token': 'secret'}
+    
+    with app.test_client() as client:
+        before = client.get('/api/model/info').get_json()
+        
+        # Admin only, and only snapshots in the model directory, by name
+        assert client.post('/api/model/reload', json={'snapshot': 'model.fgsnap'}).status_code == 403
+        assert client.post('/api/model/reload', json={'snapshot': 'model.fgsnap'},
+                           headers={'X-Admin-Token': 'wrong'}).status_code == 403
+        for name in ('../model.fgsnap', str(tmp_path / 'model.fgsnap'), 'missing.fgsnap', '..'):
+            assert client.post('/api/model/reload', json={'snapshot': name}, headers=admin).status_code == 400
+        assert client.post('/api/model/rollback').status_code == 403
+        
+        assert client.post('/api/model/reload', json={'snapshot': 'model.fgsnap'}, headers=admin).status_code == 202
+        for _ in range(200):
+            info = client.get('/api/model/info').get_json()
+            if info['loading'] is None:
+                break
+            time.sleep(0.01)
+        assert info['active']['version'] == version
+        assert info['previous']['version'] == before['active']['version']
+        
+        data = client.post('/api/risk-score', json={'user_id': 'emma_w', 'amount': 60}).get_json()
+        assert data['model_version'] == version
+        
+        assert client.post('/api/model/rollback', headers=admin).status_code == 200
+        assert registry.active is original
+
+def test_registry_rejects_untrained_model():
+    import pytest
+    from ml_model import FraudDetector
+    from model_registry import ModelRegistry, ModelValidationError
+    
+    registry = ModelRegistry(FraudDetector())
+    with pytest.raises(ModelValidationError):
+        registry.activate(FraudDetector())
+    assert registry.info()['previous'] is None
+
+def test_metrics_endpoint():
+    import metrics
+    metrics.reset()
+    client = app.test_client()
+    client.post('/api/risk-score', json={"user_id": "nobody", "amount": 900, "device": "Emulator", "typing_speed": 300})
+    
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    assert 'fraudguard_stage_seconds_count{scorer="http",stage="json_parse"} 1' in text
+    assert 'fraudguard_rule_hits_total{scorer="calculate_risk_score",rule="unknown_user"} 1' in text
+    assert 'fraudguard_decision_seconds_count{scorer="http",status="BLOCKED"} 1' in text
+    
+    metrics.configure(False)
+    try:
+        assert metrics.timer("http") is None
+    finally:
+        metrics.configure(True)
+
+def test_retries_are_served_from_the_decision_cache():
+    from app import decision_cache
+    payload = {'transaction_id': 'tx_cache_1', 'user_id': 'emma_w', 'amount': 333, 'device': 'iPad',
+               'typing_speed': 99, 'timestamp': '2024-05-01T10:00:00'}
+    with app.test_client() as client:
+        hits = decision_cache.stats()['hits']
+        first = client.post('/api/risk-score', json=payload).get_json()
+        assert client.post('/api/risk-score', json=payload).get_json() == first
+        assert decision_cache.stats()['hits'] == hits + 1
+        
+        keyed = client.post('/api/risk-score', json=dict(payload, amount=1),
+                            headers={'Idempotency-Key': 'abc-123'}).get_json()
+        retried = client.post('/api/risk-score', json=dict(payload, amount=5000),
+                              headers={'Idempotency-Key': 'abc-123'}).get_json()
+        assert retried == keyed
+        assert 'fraudguard_decision_cache_total{result="hit"}' in client.get('/metrics').get_data(as_text=True)
+
+def test_repeated_purchases_are_all_scored():
+    """Look-alike purchases aren't cache hits, so velocity still sees the burst"""
+    from app import registry
+    from test_ml_model import make_detector
+    
+    detector, _ = make_detector()
+    registry.activate(detector)
+    payload = {'user_id': 'burst_user', 'amount': 100, 'device': 'iPhone', 'merchant': 'GiftCardMall'}
+    try:
+        with app.test_client() as client:
+            results = [client.post('/api/risk-score', json=payload).get_json() for _ in range(15)]
+        assert any('transactions in the last minute' in reason for reason in results[-1]['reasons'])
+    finally:
+        registry.rollback()
+
+def test_rules_reload_endpoint(tmp_path, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+    admin = {'X-Admin-Token': 'secret'}
+    with app.test_client() as client:
+        assert client.post('/api/rules/reload').status_code == 403
+        for name in ('missing.json', str(tmp_path / 'rules.json'), '../backend/rules.json'):
+            response = client.post('/api/rules/reload', json={'file': name}, headers=admin)
+            assert response.status_code == 400 and 'error' in response.get_json()
+        
+        response = client.post('/api/rules/reload', json={'file': 'rules.json'}, headers=admin)
+        assert response.status_code == 200
+        assert set(response.get_json()['rulesets']) == {'calculate_risk_score', 'predict'}
+        assert client.get('/api/model/info').get_json()['rules']['reloads'] >= 1
+
+def test_requests_past_their_deadline_degrade():
+    from app import admission, registry
+    from test_ml_model import make_detector
+    
+    detector, _ = make_detector()
+    original = registry.active
+    registry.activate(detector)
+    payload = {'user_id': 'sarah123', 'amount': 42, 'device': 'iPhone', 'typing_speed': 80,
+               'timestamp': '2024-05-02T10:00:00'}
+    try:
+        with app.test_client() as client:
+            before = admission.stats()['degraded']['deadline']
+            degraded = client.post('/api/risk-score', json=payload, headers={'X-Deadline-Ms': '0.001'}).get_json()
+            assert degraded['degraded'] is True
+            assert admission.stats()['degraded']['deadline'] == before + 1
+            
+            # Degraded decisions aren't cached, so the retry gets the full model
+            full = client.post('/api/risk-score', json=payload).get_json()
+            assert 'degraded' not in full
+            assert 'fraudguard_requests_degraded_total{reason="deadline"}' in client.get('/metrics').get_data(as_text=True)
+    finally:
+        registry.rollback()
+    assert registry.active is original
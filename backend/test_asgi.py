@@ -0,0 +1,159 @@
+import asyncio
+import json
+
+from app import decision_log
+from asgi import app
+
+
+def request(method, path, body=b'', query=b'', headers=()):
+    """Run one request through the ASGI app and return (status, headers, raw body)"""
+    sent = []
+    
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+    
+    async def send(message):
+        sent.append(message)
+    
+    scope = {'type': 'http', 'method': method, 'path': path, 'headers': list(headers), 'query_string': query}
+    asyncio.run(app(scope, receive, send))
+    return sent[0]['status'], dict(sent[0]['headers']), sent[1]['body']
+
+
+def call(method, path, body=b'', query=b'', headers=()):
+    """Run one request through the ASGI app and return (status, json body)"""
+    status, _, payload = request(method, path, body, query, headers)
+    return status, json.loads(payload) if payload else None
+
+
+def test_asgi_risk_score():
+    status, data = call('POST', '/api/risk-score', json.dumps({'user_id': 'test', 'amount': 100}).encode())
+    assert status == 200
+    assert 0 <= data['risk_score'] <= 100
+
+
+def test_asgi_batch_and_dashboard_routes():
+    body = json.dumps({'transactions': [{'amount': 10}, {'amount': 900}]}).encode()
+    status, data = call('POST', '/api/risk-score/batch', body)
+    assert status == 200 and data['count'] == 2
+    decision_log.flush()
+    assert call('GET', '/api/transactions')[1]['transactions']
+    assert 'tip' in call('GET', '/api/educational-tip')[1]
+    
+    assert call('GET', '/api/educational-tip', query=b'seed=42') == call('GET', '/api/educational-tip', query=b'seed=42')
+    assert len({call('GET', '/api/educational-tip')[1]['tip'] for _ in range(20)}) > 1
+
+
+def test_asgi_transaction_history():
+    body = json.dumps({'transactions': [{'user_id': 'asgi_history', 'amount': a} for a in (10, 20, 30)]}).encode()
+    call('POST', '/api/risk-score/batch', body)
+    decision_log.flush()
+    
+    status, headers, body = request('GET', '/api/transactions', query=b'user_id=asgi_history&limit=2')
+    page = json.loads(body)
+    assert status == 200 and page['count'] == 2 and page['next_cursor']
+    
+    status, _ = call('GET', '/api/transactions', query=b'user_id=asgi_history&limit=2',
+                     headers=[(b'if-none-match', headers[b'etag'])])
+    assert status == 304
+    assert call('GET', '/api/transactions', query=b'status=MAYBE')[0] == 400
+
+
+def test_asgi_errors():
+    assert call('GET', '/api/missing')[0] == 404
+    assert call('GET', '/api/risk-score')[0] == 405
+    assert call('POST', '/api/risk-score', b'{not json')[0] == 400
+
+
+def test_asgi_decision_stream():
+    async def main():
+        sent, disconnected = [], asyncio.Event()
+        requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        
+        async def receive():
+            if requests:
+                return requests.pop()
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+        
+        async def send(message):
+            sent.append(message)
+        
+        scope = {'type': 'http', 'method': 'GET', 'path': '/api/stream/decisions', 'headers': [], 'query_string': b''}
+        stream = asyncio.ensure_future(app(scope, receive, send))
+        while len(sent) < 2:
+            await asyncio.sleep(0.01)
+        await app({'type': 'http', 'method': 'POST', 'path': '/api/risk-score', 'headers': [], 'query_string': b''},
+                  lambda: asyncio.sleep(0, {'type': 'http.request', 'body': b'{"user_id": "streamer", "amount": 77}'}),
+                  lambda message: asyncio.sleep(0))
+        while len(sent) < 3:
+            await asyncio.sleep(0.01)
+        disconnected.set()
+        await asyncio.wait_for(stream, 1)
+        return sent
+    
+    sent = asyncio.run(main())
+    assert sent[0]['status'] == 200 and (b'content-type', b'text/event-stream') in sent[0]['headers']
+    assert sent[1]['body'].startswith(b'retry: ')
+    event = sent[2]['body'].decode()
+    assert 'event: decision' in event and '"user_id": "streamer"' in event
+    assert sent[-1] == {'type': 'http.response.body', 'body': b''}
+
+
+def test_asgi_rules_reload_needs_admin_token(monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+    body = json.dumps({'file': 'rules.json'}).encode()
+    assert call('POST', '/api/rules/reload', body)[0] == 403
+    assert call('POST', '/api/rules/reload', json.dumps({'file': '/etc/passwd'}).encode(),
+                headers=[(b'x-admin-token', b'secret')])[0] == 400
+    status, data = call('POST', '/api/rules/reload', body, headers=[(b'x-admin-token', b'secret')])
+    assert status == 200 and 'predict' in data['rulesets']
+
+
+def test_asgi_model_reload_info_and_rollback(tmp_path, monkeypatch):
+    import time
+    
+    import app as app_module
+    from app import registry
+    from test_ml_model import make_detector
+    
+    version = make_detector()[0].save(str(tmp_path / "model.fgsnap"))
+    original = registry.active
+    monkeypatch.setattr(app_module, 'MODEL_DIR', str(tmp_path))
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+    admin = [(b'x-admin-token', b'secret')]
+    body = json.dumps({'snapshot': 'model.fgsnap'}).encode()
+    
+    assert call('POST', '/api/model/reload', body)[0] == 403
+    assert call('POST', '/api/model/rollback')[0] == 403
+    for name in ('../model.fgsnap', str(tmp_path / 'model.fgsnap'), 'missing.fgsnap'):
+        assert call('POST', '/api/model/reload', json.dumps({'snapshot': name}).encode(), headers=admin)[0] == 400
+    
+    try:
+        assert call('POST', '/api/model/reload', body, headers=admin) == (202, {'loading': 'model.fgsnap'})
+        for _ in range(200):
+            info = call('GET', '/api/model/info')[1]
+            if info['loading'] is None:
+                break
+            time.sleep(0.01)
+        assert info['active']['version'] == version
+    finally:
+        status, data = call('POST', '/api/model/rollback', headers=admin)
+    assert status == 200 and registry.active is original
+
+
+def test_asgi_overload_answers_on_the_loop_and_records_in_the_pool(monkeypatch):
+    import time
+    
+    from app import admission
+    monkeypatch.setattr(admission, 'max_in_flight', 0)
+    shed = admission.stats()['degraded']['overload']
+    
+    status, data = call('POST', '/api/risk-score', json.dumps({'user_id': 'test', 'amount': 900}).encode())
+    assert status == 200 and data['degraded'] is True
+    for _ in range(200):
+        if admission.stats()['degraded']['overload'] > shed:
+            break
+        time.sleep(0.01)
+    assert admission.stats()['degraded']['overload'] == shed + 1
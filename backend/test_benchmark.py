@@ -0,0 +1,18 @@
+from benchmark import BENCHMARKS, compare, run_suite
+
+
+def test_run_suite_reports_every_case():
+    results = run_suite([200], [10], log=lambda line: None)
+    names = {r["name"] for r in results["results"]}
+    assert names == set(BENCHMARKS)
+    for r in results["results"]:
+        assert r["throughput_ops"] > 0 and r["p99_us"] >= r["p50_us"] and r["peak_mb"] >= 0
+
+
+def test_compare_flags_regressions():
+    case = {"name": "predict", "size": 1000, "users": 10, "throughput_ops": 1000.0, "p99_us": 10.0}
+    baseline = {"results": [case]}
+    slower = {"results": [dict(case, throughput_ops=700.0)]}
+    same = {"results": [dict(case, throughput_ops=980.0, p99_us=10.5)]}
+    assert compare(slower, baseline)[0]["regression"]
+    assert not compare(same, baseline)[0]["regression"]
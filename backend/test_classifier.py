@@ -0,0 +1,53 @@
+import time
+
+import numpy as np
+import pytest
+
+from classifier import FEATURES, FraudClassifier, feature_matrix, feature_row
+from ml_model import generate_feature_importance, generate_training_metrics
+from test_ml_model import make_detector
+
+
+def test_fit_recovers_weights_and_reports_holdout_metrics():
+    rng = np.random.default_rng(3)
+    X = rng.normal(size=(4000, len(FEATURES)))
+    true_weights = np.array([2.0, -1.0, 0.0, 0.5, 0.0])
+    y = rng.random(4000) < 1 / (1 + np.exp(-(X @ true_weights - 1)))
+
+    model = FraudClassifier.fit(X, y, l2=0.0)
+    assert np.allclose(model.weights, true_weights, atol=0.15)
+    assert abs(model.bias + 1) < 0.15
+    assert model.importance['amount_ratio'] > model.importance['hour_diff'] > model.importance['new_device']
+    assert abs(sum(model.importance.values()) - 1) < 1e-3
+    assert model.metrics['holdout_samples'] == 800 and 0.8 < model.metrics['auc'] < 1
+
+    # Batch inference matches the scalar path exactly
+    assert model.probabilities(X[:50]).tolist() == [model.probability(row) for row in X[:50].tolist()]
+    assert FraudClassifier.from_dict(model.to_dict()).weights == model.weights
+
+    with pytest.raises(ValueError):
+        FraudClassifier.fit(X, np.zeros(4000, dtype=bool))
+
+
+def test_trained_detector_exposes_real_fit():
+    detector, history = make_detector()
+    metrics = generate_training_metrics(detector)
+    assert metrics == detector.classifier.metrics and metrics['training_samples'] == 240
+    assert metrics['auc'] > 0.9
+    assert generate_feature_importance(detector) == detector.classifier.importance
+    assert detector.model_confidence == metrics['accuracy']
+
+    fraud = next(tx for tx in history if tx['is_fraudulent'] and tx['amount'] > 300)
+    assert any('Fraud model' in reason for reason in detector.predict(fraud, fraud['user_id'])['reasons'])
+
+    rows = [(50.0, 100.0, 0, True, 80, True), (900, 120.5, 6, False, 12, False)]
+    assert feature_matrix(*np.array(rows, dtype=object).T).tolist() == [list(feature_row(*r)) for r in rows]
+
+
+def test_single_row_inference_is_fast():
+    detector, _ = make_detector()
+    model = detector.classifier
+    started = time.perf_counter()
+    for i in range(10000):
+        model.probability(feature_row(100 + i, 80.0, i % 5, i % 2, 75, True))
+    assert (time.perf_counter() - started) / 10000 < 50e-6
@@ -0,0 +1,65 @@
+from decision_cache import DecisionCache
+from test_ml_model import make_detector
+
+TX = {"transaction_id": "tx_1", "amount": 120.0, "device": "iPhone", "typing_speed": 80, "timestamp": "2024-03-01T12:00:10"}
+
+
+def test_key_is_canonical_and_bucketed():
+    detector, _ = make_detector()
+    cache = DecisionCache(bucket_seconds=60)
+    key = cache.key(detector, "sarah123", TX)
+    assert key == cache.key(detector, "sarah123", dict(TX, amount=120, merchant="Ignored"))
+    assert key == cache.key(detector, "sarah123", dict(TX, timestamp="2024-03-01T12:00:50"))
+    assert key != cache.key(detector, "sarah123", dict(TX, timestamp="2024-03-01T12:01:00"))
+    assert key != cache.key(detector, "emma_w", TX)
+    assert key != cache.key(detector, "sarah123", dict(TX, transaction_id="tx_2"))
+    
+    # Look-alike purchases without an id are never answered from the cache
+    untracked = {name: value for name, value in TX.items() if name != "transaction_id"}
+    assert cache.key(detector, "sarah123", untracked) is None
+    cache.put(None, {"risk_score": 1}, "sarah123")
+    assert cache.get(None, "sarah123") is None and cache.stats()["size"] == 0
+
+
+def test_profile_and_model_changes_invalidate():
+    detector, history = make_detector()
+    cache = DecisionCache(max_size=2)
+    key = cache.key(detector, "sarah123", TX)
+    cache.put(key, {"risk_score": 1}, "sarah123", idempotency_key="retry-1")
+    assert cache.get(key, "sarah123") == {"risk_score": 1}
+    
+    # Retraining sarah123 makes her cached decisions unreachable
+    detector.partial_fit([h for h in history if h["user_id"] == "sarah123"][:5])
+    new_key = cache.key(detector, "sarah123", TX)
+    assert new_key != key and cache.get(new_key, "sarah123") is None
+    assert cache.get(new_key, "sarah123", idempotency_key="retry-1") == {"risk_score": 1}
+    # Another user reusing the key doesn't get sarah123's decision
+    assert cache.get(None, "emma_w", idempotency_key="retry-1") is None
+    
+    other, _ = make_detector()
+    cache.key(other, "sarah123", TX)
+    assert cache.get(key, "sarah123") is None and cache.stats()["model_resets"] == 2
+    # A retry still gets the answer its request was given, whichever model is active now
+    assert cache.get(None, "sarah123", idempotency_key="retry-1") == {"risk_score": 1}
+    
+    for i in range(3):
+        cache.put(cache.key(other, f"user{i}", TX), {"risk_score": i}, f"user{i}")
+    stats = cache.stats()
+    assert stats["size"] == 2 and stats["evictions"] == 1 and stats["hits"] == 1
+
+
+def test_generations_stay_bounded():
+    detector, _ = make_detector()
+    cache = DecisionCache(max_size=4)
+    key = cache.key(detector, "sarah123", TX)
+    cache.put(key, {"risk_score": 1}, "sarah123")
+    
+    cache.invalidate_users(["sarah123", "u1", "u2"])
+    assert len(cache._generations) == 3
+    cache.invalidate_users(["u3", "u4"])
+    assert len(cache._generations) == 0
+    # Also when a single call names more users than the table holds
+    cache.invalidate_users([f"u{i}" for i in range(10)])
+    assert len(cache._generations) == 0
+    # sarah123 is back on her first generation, but the decision from before the invalidation is gone
+    assert cache.key(detector, "sarah123", TX) == key and cache.get(key, "sarah123") is None
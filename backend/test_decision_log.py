@@ -0,0 +1,99 @@
+import time
+
+from decision_log import DecisionLog, train_from_log
+from ml_model import FraudDetector
+from test_ml_model import make_detector
+from transaction_store import TransactionStore
+
+
+class SlowStore:
+    """TransactionStore stand-in whose writes take a while"""
+    
+    def __init__(self, delay):
+        self.delay = delay
+        self.batches = []
+    
+    row = staticmethod(TransactionStore.row)
+    
+    def insert_many(self, rows):
+        time.sleep(self.delay)
+        self.batches.append(len(rows))
+        return len(rows)
+
+
+def decision(i):
+    return {"amount": i, "merchant": "Amazon", "timestamp": "2024-01-15T10:00:00"}, {"risk_score": 1, "status": "APPROVED"}
+
+
+def test_writes_in_bulk_by_size_and_time(tmp_path):
+    store = TransactionStore(str(tmp_path / "history.db"))
+    log = DecisionLog(store, batch_size=50, flush_interval=0.05)
+    for i in range(120):
+        log.append("u1", *decision(i))
+    log.flush()
+    assert store.count() == 120
+    # Two full batches, then the remainder once the interval ran out
+    assert log.stats()["batches"] == 3 and log.stats()["written"] == 120
+    
+    log.close()
+    assert log.append("u1", *decision(0)) is False and log.stats()["dropped"] == 1
+
+
+def test_one_bad_decision_does_not_lose_its_batch(tmp_path):
+    store = TransactionStore(str(tmp_path / "history.db"))
+    log = DecisionLog(store, batch_size=10, flush_interval=0.05)
+    decisions = [decision(i) for i in range(10)]
+    # Non-scalar client fields are stored as text; a row SQLite can't bind at all is the only loss
+    decisions[3][0]["merchant"] = {"name": "Amazon"}
+    decisions[5][0]["device"] = ["iPhone"]
+    decisions[7][1]["risk_score"] = {"bad": 1}
+    log.extend(["u1"] * 10, *zip(*decisions))
+    log.flush()
+    
+    assert store.count() == 9
+    assert log.stats()["written"] == 9 and log.stats()["errors"] == 1
+    rows = {row["amount"]: row for row in store.page(store.query())[1]["transactions"]}
+    assert rows[3]["merchant"] == "{'name': 'Amazon'}" and rows[5]["device"] == "['iPhone']"
+    log.close()
+
+
+def test_full_queue_drops_or_blocks_and_close_flushes():
+    slow = SlowStore(0.2)
+    log = DecisionLog(slow, max_queue=5, batch_size=5)
+    started = time.perf_counter()
+    kept = log.extend(["u1"] * 20, *zip(*[decision(i) for i in range(20)]))
+    # Appends never wait for the disk; what doesn't fit is counted
+    assert time.perf_counter() - started < 0.1
+    assert kept < 20 and log.stats()["dropped"] == 20 - kept
+    log.close()
+    assert sum(slow.batches) == kept
+    
+    blocking = DecisionLog(SlowStore(0.01), max_queue=5, batch_size=5, policy='block')
+    assert blocking.extend(["u1"] * 20, *zip(*[decision(i) for i in range(20)])) == 20
+    blocking.close()
+    assert sum(blocking.store.batches) == 20 and blocking.stats()["dropped"] == 0
+
+
+def test_train_from_log_matches_partial_fit(tmp_path):
+    _, history = make_detector()
+    store = TransactionStore(str(tmp_path / "history.db"))
+    log = DecisionLog(store)
+    log.extend([tx["user_id"] for tx in history], history, [{"risk_score": 0, "status": "APPROVED"}] * len(history))
+    log.close()
+    
+    direct = FraudDetector(jitter=False).partial_fit(history)
+    replayed = FraudDetector(jitter=False)
+    assert train_from_log(replayed, store, chunk_size=70) == (len(history), len(history))
+    for user_id in ('sarah123', 'emma_w'):
+        assert replayed.user_profiles.profile(user_id) == direct.user_profiles.profile(user_id)
+    
+    # Picks up where the last call stopped
+    store.add("sarah123", history[0], {"risk_score": 0, "status": "APPROVED"})
+    assert train_from_log(replayed, store, after_id=len(history)) == (1, len(history) + 1)
+    
+    # A blocked transaction leaves the victim's profile alone
+    before = replayed.user_profiles.profile("sarah123")
+    store.add("sarah123", dict(history[0], amount=4999, merchant="GiftCardMall", device="Emulator"),
+              {"risk_score": 95, "status": "BLOCKED"})
+    assert train_from_log(replayed, store, after_id=len(history) + 1) == (1, len(history) + 2)
+    assert replayed.user_profiles.profile("sarah123") == before
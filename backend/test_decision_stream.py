@@ -0,0 +1,65 @@
+import asyncio
+import json
+import threading
+
+from decision_stream import DecisionBroadcaster
+
+
+def decision(i):
+    return "u1", {"amount": i, "merchant": "Amazon", "timestamp": "2024-01-15T10:00:00"}, {"risk_score": i, "status": "APPROVED"}
+
+
+def events(chunk):
+    return [json.loads(line[6:]) for line in chunk.decode().splitlines() if line.startswith("data: ")]
+
+
+def test_fans_out_decisions_from_scoring_threads():
+    broadcaster = DecisionBroadcaster()
+    
+    async def main():
+        subscribers = [broadcaster.subscribe() for _ in range(3)]
+        thread = threading.Thread(target=lambda: [broadcaster.publish(*decision(i)) for i in range(5)])
+        thread.start()
+        thread.join()
+        received = []
+        for subscriber in subscribers:
+            got = []
+            while len(got) < 5:
+                got += events(await subscriber.next(timeout=1))
+            received.append(got)
+        assert await subscribers[0].next(timeout=0.01) == b''
+        return received
+    
+    received = asyncio.run(main())
+    assert all([e["amount"] for e in got] == [0, 1, 2, 3, 4] for got in received)
+    assert received[0][0]["timestamp"] == "2024-01-15 10:00:00" and received[0][0]["id"].endswith("-1")
+
+
+def test_slow_subscribers_are_evicted_and_resume():
+    broadcaster = DecisionBroadcaster(history_size=100, buffer_size=10)
+    
+    async def main():
+        slow = broadcaster.subscribe()
+        fast = broadcaster.subscribe()
+        for i in range(6):
+            broadcaster.publish(*decision(i))
+        await asyncio.sleep(0)
+        last_seen = events(await fast.next())[-1]["id"]
+        seen_by_slow = events(await slow.next())
+        kept_up = []
+        for i in range(6, 18):
+            broadcaster.publish(*decision(i))
+            await asyncio.sleep(0)
+            kept_up += events(await fast.next())
+        assert await slow.next() is None and slow.evicted
+        assert len(kept_up) == 12 and not fast.evicted
+        
+        # Reconnecting with the last id it saw replays what it missed
+        resumed = broadcaster.subscribe(seen_by_slow[-1]["id"])
+        assert [e["amount"] for e in events(await resumed.next())] == list(range(8, 18))
+        # Ids from another process replay nothing
+        assert await broadcaster.subscribe("0000-3").next(timeout=0.01) == b''
+        return last_seen
+    
+    assert asyncio.run(main()).endswith("-6")
+    assert broadcaster.stats()["evicted"] == 1
@@ -0,0 +1,72 @@
+import pytest
+
+from kv_profile_store import KVError, KVProfileStore
+from kv_server import KVServer
+from test_ml_model import make_detector
+
+
+@pytest.fixture
+def server():
+    server = KVServer().start()
+    yield server
+    server.stop()
+
+
+def test_detector_scores_the_same_against_the_network_store(server):
+    detector, history = make_detector()
+    store = KVProfileStore.from_url(server.url)
+    assert store.publish(detector.user_profiles) == 2
+    
+    expected = detector.predict_batch(history)
+    detector.profile_backend = store
+    assert detector.predict_batch(history) == expected
+    assert [detector.predict(tx, tx["user_id"]) for tx in history[:20]] == expected[:20]
+    assert detector.predict({"amount": 50, "device": "iPhone"}, "nobody")["risk_score"] >= 0
+    
+    # One pipelined round trip for the batch, then everything comes from the cache
+    stats = store.stats()
+    assert stats["round_trips"] == 2 and stats["connections_opened"] == 1
+    assert stats["cache_hits"] >= 20
+
+
+def test_cache_expires_and_invalidates(server):
+    detector, _ = make_detector()
+    store = KVProfileStore.from_url(server.url, ttl=60)
+    store.publish(detector.user_profiles)
+    before = store.lookup("sarah123")["avg_amount"]
+    
+    server.store.data[b"fg:profile:sarah123"] = b'{"avg_amount":1.0,"common_hours":[],"devices":[]}'
+    assert store.lookup("sarah123")["avg_amount"] == before
+    store.invalidate("sarah123")
+    assert store.lookup("sarah123")["avg_amount"] == 1.0
+    
+    store.cache.ttl = 0
+    assert store.lookup_many(["emma_w", "ghost"])[1] is None
+    assert store.round_trips == 3
+
+
+def test_server_errors_are_raised(server):
+    store = KVProfileStore.from_url(server.url)
+    with store.pool.connection() as conn:
+        assert conn.execute("PING") == "PONG"
+        with pytest.raises(KVError):
+            conn.execute("NOSUCHCOMMAND")
+        assert conn.pipeline([["SET", "a", "1"], ["GET", "a"]]) == ["OK", b"1"]
+
+
+def test_unreachable_server_scores_with_stale_or_default_profiles(server):
+    detector, history = make_detector()
+    store = KVProfileStore.from_url(server.url, timeout=0.5)
+    store.publish(detector.user_profiles)
+    detector.profile_backend = store
+    store.cache.ttl = 0
+    expected = detector.predict(history[0], history[0]["user_id"])
+    
+    server.stop()
+    store.pool.close()
+    # Expired entries still score; users never cached fall back to the default profile
+    result = detector.predict(history[0], history[0]["user_id"])
+    assert result.pop("stale_profile") is True and result == expected
+    assert store.lookup_many([history[0]["user_id"], "ghost"])[1] is None
+    assert all(r["stale_profile"] for r in detector.predict_batch(history[:5]))
+    assert store.stats()["fallbacks"] == 3
@@ -0,0 +1,202 @@
+import random
+
+import pytest
+
+from ml_model import FraudDetector
+from model_snapshot import SnapshotError
+from synthetic_data import generate_transaction_history
+
+
+def make_detector():
+    random.seed(7)
+    history = []
+    for user_id in ('sarah123', 'emma_w'):
+        history += generate_transaction_history(user_id, num_transactions=150, fraud_percentage=0.2)
+    return FraudDetector(jitter=False).train(history), history
+
+
+def test_predict_batch_matches_predict():
+    """Vectorized batch scoring gives exactly the per-transaction results"""
+    detector, history = make_detector()
+    transactions = history[:100] + [
+        {'user_id': 'ghost', 'amount': 900, 'timestamp': 'not-a-date', 'device': 'Emulator'},
+        {'user_id': 'sarah123', 'amount': 10, 'typing_speed': 300},
+        {'user_id': 'emma_w', 'amount': 5000, 'timestamp': '2024-01-15T03:10:00Z', 'typing_speed': 25}
+    ]
+    user_ids = [tx['user_id'] for tx in transactions]
+    
+    batch = detector.predict_batch(transactions, user_ids)
+    single = [detector.predict(tx, uid) for tx, uid in zip(transactions, user_ids)]
+    assert batch == single
+    assert [type(r['risk_score']) for r in batch] == [type(r['risk_score']) for r in single]
+
+
+def test_seeded_jitter_is_deterministic():
+    """With a seed (or an explicit rng) the same input always gets the same score"""
+    _, history = make_detector()
+    detector = FraudDetector(seed=3).train(history)
+    twin = FraudDetector(seed=3).train(history)
+    
+    single = [detector.predict(tx, tx['user_id']) for tx in history]
+    assert single == [detector.predict(tx, tx['user_id']) for tx in history]
+    assert single == twin.predict_batch(history)
+    assert single != FraudDetector(seed=4).train(history).predict_batch(history)
+    
+    # An explicit rng is consumed in transaction order by both paths
+    batch = detector.predict_batch(history, rng=random.Random(9))
+    rng = random.Random(9)
+    assert batch == [detector.predict(tx, tx['user_id'], rng) for tx in history]
+
+
+def test_confidence_grows_with_profile_history():
+    detector, _ = make_detector()
+    unknown = detector.predict({'amount': 50, 'device': 'iPhone'}, 'ghost')
+    known = detector.predict({'amount': 50, 'device': 'iPhone'}, 'sarah123')
+    assert unknown['model_confidence'] == 0.5
+    assert 0.5 < detector.confidence(2) < known['model_confidence'] < detector.model_confidence
+
+
+def test_predict_batch_untrained_uses_fallback():
+    detector = FraudDetector()
+    results = detector.predict_batch([{'user_id': 'x', 'amount': 500, 'device': 'Emulator'}])
+    assert results[0]['model_version'] == "0.5.0 (fallback)"
+
+
+def test_profile_store_keeps_summary_statistics():
+    """Profiles hold count/sum/min/max and common hours, not raw history"""
+    detector = FraudDetector(jitter=False)
+    detector.train([
+        {'user_id': 'u1', 'amount': 10, 'merchant': 'A', 'device': 'iPhone', 'timestamp': '2024-01-01T14:00:00'},
+        {'user_id': 'u1', 'amount': 30, 'merchant': 'B', 'device': 'iPhone', 'timestamp': '2024-01-01T09:00:00'},
+        {'user_id': 'u1', 'amount': 20, 'merchant': 'A', 'device': 'MacBook', 'timestamp': 'bad'},
+        {'user_id': 'u1', 'amount': 5, 'merchant': 'C', 'device': 'iPhone', 'timestamp': '2024-01-02T09:30:00Z'},
+    ])
+    profile = detector.user_profiles.profile('u1')
+    assert profile['transaction_count'] == 4
+    assert profile['avg_amount'] == 16.25
+    assert (profile['min_amount'], profile['max_amount']) == (5, 30)
+    # Most common first, ties in order of first appearance
+    assert profile['common_hours'] == [9, 14]
+    assert profile['devices'] == {'iPhone', 'MacBook'}
+    assert profile['merchants'] == {'A', 'B', 'C'}
+    assert detector.get_model_info()['users_trained'] == 1
+
+
+def test_partial_fit_matches_full_train():
+    """Incremental updates give the same model as one full train"""
+    _, history = make_detector()
+    full = FraudDetector(jitter=False).train(history)
+    incremental = FraudDetector(jitter=False)
+    for start in range(0, len(history), 70):
+        incremental.partial_fit(history[start:start + 70])
+    
+    for user_id in ('sarah123', 'emma_w'):
+        assert incremental.user_profiles.profile(user_id) == full.user_profiles.profile(user_id)
+    incremental.fit_classifier(*incremental.classifier_features(history))
+    assert incremental.predict_batch(history) == full.predict_batch(history)
+
+
+def test_partial_fit_decay_fades_old_behaviour():
+    detector = FraudDetector(jitter=False)
+    old = {'user_id': 'u1', 'amount': 100, 'merchant': 'A', 'timestamp': '2024-01-01T10:00:00'}
+    new = {'user_id': 'u1', 'amount': 300, 'merchant': 'A', 'timestamp': '2024-01-02T22:00:00'}
+    detector.partial_fit([old] * 3)
+    detector.partial_fit([new], decay=0.25)
+    
+    profile = detector.user_profiles.profile('u1')
+    # Old history now weighs 3 * 0.25, the new transaction 1
+    assert abs(profile['avg_amount'] - (75 + 300) / 1.75) < 1e-9
+    assert profile['common_hours'] == [22, 10]
+    assert profile['transaction_count'] == 4
+    
+    # Users the decay didn't touch lose weight too, before their rows are rewritten
+    detector.partial_fit([dict(old, user_id='u2')] * 40)
+    detector.partial_fit([new], decay=0.25)
+    row = detector.user_profiles.lookup('u2')
+    assert abs(detector.user_profiles.sample_size(row) - 10) < 1e-9
+    assert detector.confidence(detector.user_profiles.sample_size(row)) < detector.confidence(40)
+
+
+def test_snapshot_round_trip(tmp_path):
+    """A loaded snapshot predicts like the model that saved it"""
+    detector, history = make_detector()
+    path = tmp_path / "model.fgsnap"
+    version = detector.save(path)
+    
+    loaded = FraudDetector.load(path, jitter=False)
+    assert loaded.model_version == version
+    assert loaded.user_profiles.read_only
+    assert loaded.get_model_info()['snapshot']['checksum'].startswith(version.split('+')[1])
+    
+    expected = [dict(r, model_version=version) for r in detector.predict_batch(history)]
+    assert loaded.predict_batch(history) == expected
+    assert [loaded.predict(tx, tx['user_id']) for tx in history[:20]] == expected[:20]
+    
+    # Further training copies the mapped profiles into writable columns
+    loaded.partial_fit(history[:10])
+    detector.partial_fit(history[:10])
+    assert loaded.user_profiles.profile('emma_w') == detector.user_profiles.profile('emma_w')
+
+
+def test_snapshot_checksum_detects_corruption(tmp_path):
+    detector, _ = make_detector()
+    path = tmp_path / "model.fgsnap"
+    detector.save(path)
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    
+    with pytest.raises(SnapshotError):
+        FraudDetector.load(path)
+    
+    # The checksum covers the header too, so header edits are caught and change the version
+    version = detector.save(path)
+    path.write_bytes(path.read_bytes().replace(b'"model_version": "1.0.0"', b'"model_version": "9.0.0"'))
+    with pytest.raises(SnapshotError):
+        FraudDetector.load(path)
+    detector.model_confidence = 0.5
+    assert detector.save(path) != version
+    
+    # A mangled or truncated header is a rejected snapshot, not a JSON error
+    data = path.read_bytes()
+    for broken in (data.replace(b'"model_version"', b'"model_version\xff', 1), data[:20], data[:10]):
+        path.write_bytes(broken)
+        with pytest.raises(SnapshotError):
+            FraudDetector.load(path)
+
+
+def test_parallel_scorer_matches_in_process(tmp_path):
+    """Worker processes map the snapshot and give the in-process results"""
+    from parallel_scoring import ParallelScorer
+    
+    detector, history = make_detector()
+    path = tmp_path / "model.fgsnap"
+    detector.save(path)
+    model = FraudDetector.load(path, jitter=False)
+    
+    with ParallelScorer(workers=2, chunk_size=50) as scorer:
+        assert scorer.predict_batch(model, history) == model.predict_batch(history)
+        assert len(scorer.worker_memory()) >= 1
+    
+    # A snapshot replaced on disk is scored in-process instead of failing the batch
+    retrained = FraudDetector()
+    retrained.train(history[:100])
+    retrained.save(path)
+    with ParallelScorer(workers=2, chunk_size=50) as scorer:
+        assert scorer.predict_batch(model, history) == model.predict_batch(history)
+
+
+def test_rare_hours_are_flagged_once_there_is_history():
+    """rare_hour fires on hours a user with enough history (almost) never shops in"""
+    detector, _ = make_detector()
+    shares = detector.user_profiles.hour_shares(detector.user_profiles.lookup('sarah123'))
+    rare = next(hour for hour in range(24) if shares[hour] == 0)
+    usual = max(range(24), key=shares.__getitem__)
+    
+    def reasons(user_id, hour):
+        transaction = {'amount': 50, 'device': 'iPhone', 'timestamp': f'2024-01-15T{hour:02d}:30:00'}
+        return ' '.join(detector.predict(transaction, user_id)['reasons'])
+    
+    assert 'rarely shops' in reasons('sarah123', rare)
+    assert 'rarely shops' not in reasons('sarah123', usual)
+    assert 'rarely shops' not in reasons('ghost', rare)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import quantile_sketch
+from ml_model import FraudDetector
+from profile_store import ProfileStore
+
+
+def build(user_ids, amounts, hours):
+    store = ProfileStore()
+    store.update(user_ids, amounts, hours, ["iPhone"] * len(user_ids), ["Amazon"] * len(user_ids))
+    store.refresh()
+    return store
+
+
+def test_sketch_quantiles_bound_the_exact_value():
+    rng = np.random.default_rng(3)
+    amounts = rng.lognormal(4, 1.5, 5000)
+    counts = np.zeros((1, quantile_sketch.NUM_BINS))
+    np.add.at(counts[0], quantile_sketch.bins(amounts), 1)
+    
+    for q in (0.5, 0.9, 0.99):
+        exact = np.percentile(amounts, q * 100, method="inverted_cdf")
+        estimate = quantile_sketch.quantiles(counts, q)[0]
+        assert exact <= estimate <= exact * quantile_sketch.GAMMA
+    assert np.isnan(quantile_sketch.quantiles(np.zeros((1, quantile_sketch.NUM_BINS)), 0.99)[0])
+
+
+def test_merged_shards_match_one_store():
+    rng = np.random.default_rng(4)
+    user_ids = [f"u{i}" for i in rng.integers(0, 20, 2000)]
+    amounts = np.round(rng.lognormal(4, 1, 2000), 2).tolist()
+    hours = rng.integers(0, 24, 2000).tolist()
+    
+    whole = build(user_ids, amounts, hours)
+    merged = build(user_ids[:1200], amounts[:1200], hours[:1200])
+    merged.merge(build(user_ids[1200:], amounts[1200:], hours[1200:]))
+    for user_id in set(user_ids):
+        a, b = whole.lookup(user_id), merged.lookup(user_id)
+        assert merged.amount_p99(b) == whole.amount_p99(a)
+        assert merged.hour_shares(b) == pytest.approx(whole.hour_shares(a))
+        assert merged.profile(user_id)["avg_amount"] == pytest.approx(whole.profile(user_id)["avg_amount"])
+        assert merged.profile(user_id)["transaction_count"] == whole.profile(user_id)["transaction_count"]
+    
+    decayed = ProfileStore()
+    decayed.update(["u1"], [5.0], [3], ["iPhone"], ["Amazon"], decay=0.5)
+    with pytest.raises(ValueError):
+        merged.merge(decayed)
+
+
+def test_amount_above_p99_is_flagged_below_the_average_multiple():
+    history = [{'user_id': 'steady', 'amount': 50 + i % 5, 'merchant': 'Amazon', 'device': 'iPhone',
+                'timestamp': '2024-01-15T10:00:00'} for i in range(50)]
+    detector = FraudDetector(jitter=False).train(history)
+    p99 = detector.user_profiles.amount_p99(detector.user_profiles.lookup('steady'))
+    
+    usual = dict(history[0], amount=51)
+    unusual = dict(history[0], amount=100)
+    assert p99 < 100 < detector.user_profiles.profile('steady')['avg_amount'] * 2.5
+    assert not any('above 99%' in r for r in detector.predict(usual, 'steady')['reasons'])
+    assert any('above 99%' in r for r in detector.predict(unusual, 'steady')['reasons'])
+    assert detector.predict_batch([usual, unusual], ['steady'] * 2) == [
+        detector.predict(usual, 'steady'), detector.predict(unusual, 'steady')]
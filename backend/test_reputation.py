@@ -0,0 +1,53 @@
+from reputation import ReputationTracker
+from ml_model import FraudDetector
+from test_ml_model import make_detector
+
+
+def tx(device, hour, day=15, merchant="Amazon"):
+    return {"device": device, "merchant": merchant, "amount": 20, "timestamp": f"2024-01-{day}T{hour:02d}:00:00"}
+
+
+def test_distinct_users_over_a_sliding_day():
+    tracker = ReputationTracker(width=1 << 12, bloom_bits=1 << 16, use_timestamps=True)
+    for i in range(30):
+        features = tracker.observe(f"u{i}", tx("Emulator", 1))
+    assert features == {"device_users_24h": 30, "merchant_users_24h": 30, "location_users_24h": 0}
+    
+    # Repeat visits, in the same bucket or a later one, count once
+    assert tracker.observe("u0", tx("Emulator", 2))["device_users_24h"] == 30
+    assert tracker.observe("u0", tx("Emulator", 20))["device_users_24h"] == 30
+    
+    # A day later only u0, who came back at 20:00, is still within the window
+    assert tracker.observe("u99", tx("Laptop", 3, day=16))["device_users_24h"] == 1
+    assert tracker.users("device", "Emulator") == 1
+    assert tracker.observe("u99", tx("Laptop", 23, day=16))["device_users_24h"] == 1
+    assert tracker.users("device", "Emulator") == 0
+
+
+def test_future_timestamps_do_not_reset_live_counts():
+    tracker = ReputationTracker(width=1 << 12, bloom_bits=1 << 16)
+    for i in range(30):
+        tracker.observe(f"u{i}", tx("Emulator", 1))
+    tracker.observe("attacker", {"device": "Laptop", "timestamp": "2099-01-01T00:00:00"})
+    assert tracker.users("device", "Emulator") == 30
+    assert tracker.observe("u30", tx("Emulator", 2))["device_users_24h"] == 31
+
+
+def test_shared_device_rule_and_snapshot_round_trip(tmp_path):
+    single, _ = make_detector()
+    batch, _ = make_detector()
+    single.reputation, batch.reputation = ReputationTracker(), ReputationTracker()
+    # A device used by many accounts, then by a user who never used it before
+    farm = [dict(tx("Farm_07", 12), user_id=f"mule_{i}") for i in range(25)]
+    farm.append(dict(tx("Farm_07", 13), user_id="sarah123"))
+    
+    expected = [single.predict(t, t["user_id"]) for t in farm]
+    assert expected == batch.predict_batch(farm)
+    assert any("used by 26 different accounts" in r for r in expected[-1]["reasons"])
+    
+    path = str(tmp_path / "model.fgm")
+    single.save(path)
+    loaded = FraudDetector.load(path, jitter=False)
+    assert loaded.reputation.users("device", "Farm_07") == 26
+    assert loaded.reputation.observe("mule_0", tx("Farm_07", 14))["device_users_24h"] == 26
+    assert single.reputation.users("device", "Farm_07") == 26
@@ -0,0 +1,81 @@
+import copy
+import json
+
+import numpy as np
+import pytest
+
+import rule_engine
+from rule_engine import RuleEngine, RuleError, Rules
+from test_ml_model import make_detector
+
+
+def default_document():
+    with open(rule_engine.DEFAULT_RULES_PATH) as f:
+        return json.load(f)
+
+
+def test_scores_stop_at_the_cap_and_batches_match():
+    rules = Rules(default_document()).rulesets['calculate_risk_score']
+    features = {"known_user": False, "hour": 3, "normal_start": 9, "normal_end": 17,
+                "amount": 5000, "avg_amount": 100.0, "typing_speed": 300,
+                "device_changed": True, "device": "Emulator", "usual_device": ""}
+    hits = []
+    score, reasons = rules.evaluate(features, hits=hits)
+    # 40 + 18 + 40 reaches 98, the device rule caps it and the typing rule never runs
+    assert score == 100 and hits == ["unknown_user", "time_anomaly", "amount_anomaly", "new_device"]
+    assert len(reasons) == 4 and rules.status(score) == ("BLOCKED", "red")
+    
+    rows = [features, dict(features, amount=250, device_changed=False),
+            dict(features, known_user=True, hour=12, amount=50, typing_speed=80, device_changed=False)]
+    columns = {name: np.asarray([row[name] for row in rows]) for name in features}
+    raw = {name: [row[name] for row in rows] for name in ("amount", "avg_amount", "device", "usual_device")}
+    risk, is_float, batch_reasons = rules.evaluate_batch(len(rows), columns, raw)
+    for row, score, as_float, row_reasons in zip(rows, risk.tolist(), is_float.tolist(), batch_reasons):
+        expected = rules.evaluate(row)
+        assert (score if as_float else int(score), row_reasons) == expected
+        assert isinstance(expected[0], float) == as_float
+
+
+def test_invalid_rules_are_rejected():
+    for when in ["__import__('os')", "amount.real > 1", "device == 'iPhone'", "no_such_feature > 1"]:
+        document = default_document()
+        document["rulesets"]["predict"]["rules"][0]["when"] = when
+        with pytest.raises(RuleError):
+            Rules(document)
+    
+    document = default_document()
+    del document["rulesets"]["predict"]["statuses"][-1]
+    with pytest.raises(RuleError):
+        Rules(document)
+
+
+def test_reload_swaps_rules_and_keeps_them_on_errors(tmp_path):
+    path = tmp_path / "rules.json"
+    document = default_document()
+    path.write_text(json.dumps(document))
+    engine = RuleEngine(str(path))
+    assert engine.active.rulesets["predict"].params["amount_anomaly"] == 2.5
+    
+    document["rulesets"]["predict"]["params"]["amount_anomaly"] = 10
+    path.write_text(json.dumps(document))
+    engine.reload()
+    assert engine.active.rulesets["predict"].params["amount_anomaly"] == 10
+    
+    path.write_text("{not json")
+    active = engine.active
+    with pytest.raises(RuleError):
+        engine.reload()
+    assert engine.active is active and engine.last_error is not None
+
+
+def test_predict_uses_the_active_rules(monkeypatch):
+    detector, history = make_detector()
+    detector.jitter = False
+    tx = dict(history[0], amount=history[0]["amount"] * 4, typing_speed=80)
+    assert any("higher than average" in r for r in detector.predict(tx, tx["user_id"])["reasons"])
+    
+    document = copy.deepcopy(rule_engine.engine.active.document)
+    document["rulesets"]["predict"]["params"]["amount_anomaly"] = 1000
+    monkeypatch.setattr(rule_engine.engine, "active", Rules(document))
+    assert not any("higher than average" in r for r in detector.predict(tx, tx["user_id"])["reasons"])
+    assert detector.global_thresholds["amount_anomaly"] == 1000
@@ -0,0 +1,59 @@
+import json
+
+from shadow import RequestRecorder, ShadowScorer, load_model, recording_files, replay
+from test_ml_model import make_detector
+from test_rule_engine import default_document
+
+
+def strict_rules(tmp_path):
+    """Rule file that blocks anything the default rules would send to review"""
+    document = default_document()
+    document['rulesets']['predict']['statuses'][1]['below'] = 40
+    path = tmp_path / "strict_rules.json"
+    path.write_text(json.dumps(document))
+    return str(path)
+
+
+def test_recorder_rotates_and_replay_reports_flips(tmp_path):
+    detector, history = make_detector()
+    snapshot = str(tmp_path / "model.fgm")
+    detector.save(snapshot)
+
+    recorder = RequestRecorder(str(tmp_path / "recordings"), max_bytes=4096)
+    for tx in history:
+        recorder.record(tx)
+    recorder.close()
+    files = recording_files([str(tmp_path / "recordings")])
+    assert len(files) > 1 and all(len(open(f, 'rb').read()) <= 4096 for f in files)
+
+    same = replay(files, (snapshot, None), (snapshot, None), processes=1)
+    assert same['transactions'] == len(history) and same['flip_count'] == 0
+    assert same['score_delta']['max_abs'] == 0
+
+    stricter = replay(files, (snapshot, None), (snapshot, strict_rules(tmp_path)), processes=2, chunk_size=64)
+    assert stricter['transactions'] == len(history)
+    assert set(stricter['flips']) == {'REVIEW_NEEDED->BLOCKED'}
+    assert stricter['score_delta']['max_abs'] == 0 and stricter['examples']
+
+
+def test_shadow_scorer_compares_off_the_request_path(tmp_path):
+    detector, history = make_detector()
+    snapshot = str(tmp_path / "model.fgm")
+    detector.save(snapshot)
+
+    shadow = ShadowScorer(load_model(snapshot, strict_rules(tmp_path)), queue_size=len(history))
+    live = load_model(snapshot)
+    for tx in history:
+        shadow.submit(tx['user_id'], tx, live.predict(tx, tx['user_id']))
+    shadow.close(timeout=10)
+    stats = shadow.stats()
+    assert stats['transactions'] == len(history) and stats['dropped'] == 0
+    assert stats['flip_count'] == sum(r['status'] == 'REVIEW_NEEDED' and r['risk_score'] >= 40
+                                      for r in live.predict_batch(history))
+
+    # A full queue drops instead of blocking the caller
+    full = ShadowScorer(live, queue_size=1)
+    full.close()
+    full.submit('u', {}, {})
+    full.submit('u', {}, {})
+    assert full.dropped >= 1
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import socket
+from collections import Counter
+
+from ml_model import FraudDetector
+from shard_benchmark import _start, _wait_ready
+from shard_router import ShardRouter, _route
+from sharding import HashRing, parse_shards, rebalance, snapshot_path
+from synthetic_scale import write_ndjson_chunks
+from test_ml_model import make_detector
+from transaction_stream import train_from_file
+
+USERS = [f"user_{i}" for i in range(20000)]
+
+
+def test_ring_balances_users_and_adding_a_node_moves_few():
+    ring = HashRing(["c", "a", "b"])
+    assert HashRing(["a", "b", "c"]).node("user_42") == ring.node("user_42")
+    shares = Counter(map(ring.node, USERS))
+    assert all(abs(share / len(USERS) - 1 / 3) < 0.06 for share in shares.values())
+    
+    # Only the new node's share moves, and all of it comes to the new node
+    moves = ring.moves(ring.with_node("d"), USERS)
+    assert {destination for _, destination in moves} == {"d"}
+    assert 0.19 < sum(moves.values()) / len(USERS) < 0.31
+    assert ring.with_node("d").without_node("d").moves(ring, USERS) == Counter()
+    
+    groups = ring.split(["user_1", "user_2", "user_1"])
+    assert sorted(i for positions in groups.values() for i in positions) == [0, 1, 2]
+    assert parse_shards("a=http://h:1, b") == {"a": "http://h:1", "b": None}
+
+
+def test_shards_train_only_their_users(tmp_path):
+    path, = write_ndjson_chunks(str(tmp_path), 200, 4000, chunk_size=4000)
+    ring = HashRing(["a", "b"])
+    detectors = {}
+    for node in ring.nodes:
+        detectors[node] = FraudDetector()
+        train_from_file(detectors[node], path, keep=ring.owns(node))
+    users = {node: {f"user_{i}" for i in range(200) if f"user_{i}" in detectors[node].user_profiles}
+             for node in ring.nodes}
+    assert users["a"] and users["b"] and not users["a"] & users["b"]
+    assert all(ring.node(u) == node for node in ring.nodes for u in users[node])
+
+
+class FakeShard:
+    """ShardClient stand-in that scores by echoing which shard saw the transaction"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.batches = []
+    
+    async def request(self, method, path, body=b'', headers=None):
+        transactions = json.loads(body)["transactions"]
+        self.batches.append(len(transactions))
+        results = [{"shard": self.name, "amount": tx["amount"]} for tx in transactions]
+        return 200, {}, json.dumps({"results": results}).encode()
+
+
+def test_router_splits_batches_per_shard_and_keeps_order():
+    router = ShardRouter(parse_shards("a=http://127.0.0.1:1,b=http://127.0.0.1:2"))
+    router._clients = {name: FakeShard(name) for name in router.ring.nodes}
+    transactions = [{"user_id": user_id, "amount": i} for i, user_id in enumerate(USERS[:50])]
+    
+    results = asyncio.run(router.score_batch(transactions, {}))
+    assert [r["amount"] for r in results] == list(range(50))
+    assert all(r["shard"] == router.ring.node(tx["user_id"]) for r, tx in zip(results, transactions))
+    assert all(len(client.batches) == 1 for client in router._clients.values())
+    assert router.stats()["shards"]["a"]["forwarded"] == 1
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_router_reloads_and_rolls_back_every_real_shard(tmp_path):
+    """Admin calls go through the router to asgi.py shards, and every shard applies them"""
+    version = make_detector()[0].save(str(tmp_path / "model.fgsnap"))
+    ports = {"a": _free_port(), "b": _free_port()}
+    shards = ",".join(f"{name}=http://127.0.0.1:{port}" for name, port in ports.items())
+    processes = []
+    try:
+        for name, port in ports.items():
+            env = dict(os.environ, FRAUDGUARD_SHARD=name, FRAUDGUARD_SHARDS=shards,
+                       FRAUDGUARD_ADMIN_TOKEN="secret", FRAUDGUARD_MODEL_DIR=str(tmp_path),
+                       FRAUDGUARD_HISTORY_PATH=str(tmp_path / f"history-{name}.db"), FRAUDGUARD_METRICS="0")
+            processes.append(_start("asgi", port, env))
+        for port in ports.values():
+            _wait_ready(f"http://127.0.0.1:{port}/api/model/info", 60)
+        router = ShardRouter(parse_shards(shards))
+        admin = {"x-admin-token": "secret"}
+        
+        async def run(method, path, body=b'', headers=admin, query=''):
+            return await _route(router, method, path, query, headers, body)
+        
+        async def scenario():
+            reload = await run('POST', '/api/model/reload', json.dumps({"snapshot": "model.fgsnap"}).encode())
+            infos = {}
+            for _ in range(500):
+                for name in router.ring.nodes:
+                    infos[name] = json.loads((await router.forward(name, 'GET', '/api/model/info'))[2])
+                if all(info["loading"] is None for info in infos.values()):
+                    break
+                await asyncio.sleep(0.02)
+            rollback = await run('POST', '/api/model/rollback')
+            history = await run('GET', '/api/transactions', query='limit=10')
+            router.close()
+            return reload, infos, rollback, history
+        
+        reload, infos, rollback, history = asyncio.run(scenario())
+        assert reload[0] == 202
+        assert {name: reply["status"] for name, reply in json.loads(reload[1])["shards"].items()} == {"a": 202, "b": 202}
+        assert all(info["active"]["version"] == version for info in infos.values())
+        assert rollback[0] == 200 and len(json.loads(rollback[1])["shards"]) == 2
+        
+        # History is per shard, so the router won't answer for all users from one
+        assert history[0] == 400
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+def test_rebalance_moves_profiles_to_the_new_shard(tmp_path):
+    path, = write_ndjson_chunks(str(tmp_path), 200, 4000, chunk_size=4000)
+    ring = HashRing(["a", "b"])
+    whole = FraudDetector()
+    train_from_file(whole, path)
+    for node in ring.nodes:
+        detector = FraudDetector()
+        train_from_file(detector, path, keep=ring.owns(node))
+        detector.save(snapshot_path(str(tmp_path), node))
+    
+    target = ring.with_node("c")
+    users = list(whole.user_profiles.user_ids)
+    moves = rebalance(ring, target, str(tmp_path))
+    assert moves == ring.moves(target, users) and moves
+    shards = {node: FraudDetector.load(snapshot_path(str(tmp_path), node)).user_profiles for node in target.nodes}
+    for user_id in users:
+        owners = [node for node, store in shards.items() if user_id in store]
+        assert owners == [target.node(user_id)]
+        assert shards[owners[0]].profile(user_id) == whole.user_profiles.profile(user_id)
@@ -0,0 +1,36 @@
+import json
+from collections import Counter
+
+from synthetic_data import generate_transaction_history
+from synthetic_scale import iter_transactions, write_ndjson_chunks
+from transaction_stream import iter_ndjson
+
+
+def test_output_is_seeded_and_independent_of_chunk_size():
+    a = list(iter_transactions(500, 3000, seed=3, chunk_size=250))
+    b = list(iter_transactions(500, 3000, seed=3))
+    assert a == b
+    assert a != list(iter_transactions(500, 3000, seed=4))
+    timestamps = [tx["timestamp"] for tx in a]
+    assert timestamps == sorted(timestamps)
+    assert set(a[0]) >= set(generate_transaction_history("sarah123", 1)[0]) - {"sequence"}
+
+
+def test_fraud_mix():
+    transactions = list(iter_transactions(200, 20000, fraud_percentage=0.3,
+                                          fraud_mix={"gift_card_spree": 3, "midnight_shopping": 1}))
+    patterns = Counter(tx.get("fraud_pattern") for tx in transactions if tx["is_fraudulent"])
+    assert set(patterns) == {"gift_card_spree", "midnight_shopping"}
+    assert 0.27 < sum(patterns.values()) / len(transactions) < 0.33
+    assert 2.5 < patterns["gift_card_spree"] / patterns["midnight_shopping"] < 3.5
+    for tx in transactions:
+        if tx.get("fraud_pattern") == "midnight_shopping":
+            assert int(tx["timestamp"][11:13]) < 6
+
+
+def test_ndjson_chunks_match_records(tmp_path):
+    paths = write_ndjson_chunks(tmp_path, 100, 2500, chunk_size=1000, seed=1)
+    assert len(paths) == 3
+    from_files = [tx for path in paths for tx in iter_ndjson(path)]
+    assert from_files == list(iter_transactions(100, 2500, seed=1))
+    assert json.loads(open(paths[0]).readline())["transaction_id"] == "tx_0"
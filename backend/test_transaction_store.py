@@ -0,0 +1,67 @@
+import pytest
+
+from transaction_store import TransactionStore
+
+
+def fill(store, n=120):
+    statuses = ["APPROVED", "REVIEW_NEEDED", "BLOCKED"]
+    rows = [store.row(f"user_{i % 3}",
+                      {"amount": i, "merchant": "Amazon", "timestamp": f"2024-01-15T{i // 60:02d}:{i % 60:02d}:00"},
+                      {"risk_score": i % 100, "status": statuses[i % 3], "reasons": [f"r{i}"]})
+            for i in range(n)]
+    # Two rows share a timestamp, so the id has to break the tie
+    rows.append(store.row("user_0", {"amount": 999, "timestamp": "2024-01-15T01:59:00"},
+                          {"risk_score": 50, "status": "BLOCKED"}))
+    store.insert_many(rows)
+
+
+def walk(store, **params):
+    """Every row a query returns, following next_cursor page by page"""
+    rows, cursor = [], None
+    while True:
+        _, page = store.page(store.query(cursor=cursor, **params))
+        rows += page["transactions"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return rows
+
+
+def test_keyset_pages_cover_filters_in_order(tmp_path):
+    store = TransactionStore(str(tmp_path / "history.db"))
+    fill(store)
+
+    everything = walk(store, limit=7)
+    assert len(everything) == 121 and len({row["id"] for row in everything}) == 121
+    keys = [(row["timestamp"], row["id"]) for row in everything]
+    assert keys == sorted(keys, reverse=True)
+    assert everything[0]["timestamp"] == "2024-01-15 01:59:00" and everything[0]["amount"] == 999
+
+    blocked = walk(store, user_id="user_2", status="blocked", min_risk=50, max_risk=90, limit=4)
+    assert blocked and all(row["user_id"] == "user_2" and row["status"] == "BLOCKED"
+                           and 50 <= row["risk_score"] <= 90 for row in blocked)
+    assert len(blocked) == sum(1 for i in range(120) if i % 3 == 2 and 50 <= i % 100 <= 90)
+
+    for bad in ({"status": "MAYBE"}, {"limit": 0}, {"min_risk": "high"}, {"cursor": "!!"}):
+        with pytest.raises(ValueError):
+            store.query(**bad)
+
+
+def test_etag_and_page_cache_track_new_rows(tmp_path):
+    store = TransactionStore(str(tmp_path / "history.db"))
+    fill(store, 10)
+    query = store.query(status="APPROVED")
+
+    etag, page = store.page(query)
+    assert store.page(query, if_none_match=etag) == (etag, None)
+    assert store.page(query)[1] is page            # Served from the page cache
+
+    store.add("user_9", {"amount": 5, "timestamp": "2024-02-01T09:00:00"}, {"risk_score": 3, "status": "APPROVED"})
+    new_etag, new_page = store.page(query, if_none_match=etag)
+    assert new_etag != etag and new_page["transactions"][0]["user_id"] == "user_9"
+
+    # Rows a query can't show leave its ETag alone
+    other = store.query(user_id="user_1")
+    etag = store.etag(other)
+    store.add("user_9", {"amount": 6, "timestamp": "2024-02-01T10:00:00"}, {"risk_score": 3, "status": "APPROVED"})
+    assert store.page(other, if_none_match=etag) == (etag, None)
+    assert store.etag(query) != new_etag
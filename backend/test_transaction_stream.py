@@ -0,0 +1,51 @@
+import json
+import tracemalloc
+
+from ml_model import FraudDetector
+from test_ml_model import make_detector
+from transaction_stream import iter_json_array, iter_ndjson, train_from_file
+
+
+def write_ndjson(path, transactions):
+    with open(path, "w") as f:
+        for tx in transactions:
+            f.write(json.dumps(tx) + "\n")
+
+
+def test_json_array_parsed_incrementally(tmp_path):
+    """Elements split across read buffers are decoded correctly"""
+    _, history = make_detector()
+    path = tmp_path / "history.json"
+    path.write_text(json.dumps(history, indent=2))
+    assert list(iter_json_array(path, read_size=7)) == history
+
+
+def test_train_from_file_matches_train(tmp_path):
+    full, history = make_detector()
+    ndjson_path = tmp_path / "history.ndjson"
+    json_path = tmp_path / "history.json"
+    write_ndjson(ndjson_path, history)
+    json_path.write_text(json.dumps(history))
+    
+    for path in (ndjson_path, json_path):
+        detector = FraudDetector(jitter=False)
+        assert train_from_file(detector, path, chunk_size=64) == len(history)
+        assert detector.predict_batch(history) == full.predict_batch(history)
+
+
+def test_streaming_memory_stays_flat(tmp_path):
+    """Peak memory does not grow with the size of the input file"""
+    _, history = make_detector()
+    
+    def peak_for(copies):
+        path = tmp_path / f"history_{copies}.ndjson"
+        write_ndjson(path, history * copies)
+        tracemalloc.start()
+        assert sum(1 for _ in iter_ndjson(path)) == len(history) * copies
+        train_from_file(FraudDetector(), path, chunk_size=100)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+    
+    small, large = peak_for(2), peak_for(20)
+    assert large < small * 1.5
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from ml_model import FraudDetector
+from test_ml_model import make_detector
+from velocity import VelocityTracker
+
+
+def spree(user_id, start, n, every_seconds=20, **fields):
+    return [dict({"user_id": user_id, "amount": 100, "merchant": "GiftCardMall", "device": "iPhone",
+                  "timestamp": (start + timedelta(seconds=i * every_seconds)).isoformat()}, **fields)
+            for i in range(n)]
+
+
+def test_sliding_windows():
+    tracker = VelocityTracker(use_timestamps=True)
+    start = datetime(2024, 3, 1, 12, 0, 0)
+    for tx in spree("u1", start, 15):
+        features = tracker.observe("u1", tx)
+    assert features["count_1m"] == 3
+    assert features["count_1h"] == 15 and features["amount_1h"] == 1500
+    assert features["distinct_merchants"] == 1
+    
+    later = tracker.observe("u1", {"amount": 5, "merchant": "Uber", "device": "MacBook",
+                                   "timestamp": (start + timedelta(hours=2)).isoformat()})
+    assert later["count_1m"] == 1 and later["count_1h"] == 1
+    assert later["count_24h"] == 16 and later["amount_24h"] == 1505
+    assert later["distinct_devices"] == 2 and later["distinct_merchants"] == 2
+    assert tracker.features("nobody")["count_24h"] == 0
+
+
+def test_idle_and_excess_users_are_evicted():
+    tracker = VelocityTracker(max_users=3, use_timestamps=True)
+    start = datetime(2024, 3, 1)
+    for i in range(5):
+        tracker.observe(f"u{i}", spree(f"u{i}", start, 1)[0])
+    assert len(tracker) == 3 and tracker.evicted == 2
+    tracker.observe("late", spree("late", start + timedelta(days=2), 1)[0])
+    assert list(tracker.users) == ["late"]
+
+
+def test_spree_raises_risk_and_batch_matches_predict():
+    single, history = make_detector()
+    batch, _ = make_detector()
+    single.velocity, batch.velocity = VelocityTracker(), VelocityTracker()
+    transactions = spree("sarah123", datetime(2024, 3, 1, 12), 15, every_seconds=10,
+                         typing_speed=90, device=["iPhone", "Emulator", "iPad", "Android"])
+    for i, tx in enumerate(transactions):
+        tx["device"] = tx["device"][i % 4]
+    
+    expected = [single.predict(tx, "sarah123") for tx in transactions]
+    assert expected == batch.predict_batch(transactions)
+    assert any("transactions in the last minute" in r for r in expected[-1]["reasons"])
+    assert any("different devices" in r for r in expected[-1]["reasons"])
+    assert expected[-1]["risk_score"] > expected[0]["risk_score"]
+
+
+def test_live_scoring_ignores_client_timestamps():
+    tracker = VelocityTracker()
+    start = datetime(2024, 3, 1)
+    for tx in spree("u1", start, 10, every_seconds=86400):
+        features = tracker.observe("u1", tx)
+    # Ten purchases "a day apart" all arrived just now
+    assert features["count_1m"] == features["count_24h"] == 10
+    
+    tracker.observe("u2", spree("u2", datetime(2099, 1, 1), 1)[0])
+    assert "u1" in tracker.users and tracker.features("u1")["count_1m"] == 10
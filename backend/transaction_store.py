@@ -0,0 +1,275 @@
+"""
+Transaction History Store for FraudGuard Lite
+Scored transactions in an embedded SQLite database, in WAL mode so the
+dashboard's reads never wait for the writer (or the writer for them).
+
+History is read newest first with keyset pagination on (timestamp, id)
+through indexes on (user_id, timestamp), (status, timestamp) and
+timestamp, so a page costs the same on row ten as on row ten million.
+Rows are never updated, so the newest row id that a query's filters
+select identifies the state of its pages: every page's ETag is a hash of
+its query and that id, found with one lookup on an (user_id, id) or
+(status, id) index, so conditional requests that still match cost no
+more, and rendered pages are cached until rows they could show arrive.
+"""
+
+import base64
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+
+from kv_profile_store import MISSING, LRUCache
+from transaction_stream import chunked, iter_transactions
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# Rendered pages kept per process
+PAGE_CACHE_SIZE = 1024
+
+STATUSES = ("APPROVED", "REVIEW_NEEDED", "BLOCKED")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    amount REAL,
+    merchant TEXT,
+    device TEXT,
+    risk_score REAL NOT NULL,
+    status TEXT NOT NULL,
+    reasons TEXT,
+    model_version TEXT
+);
+CREATE INDEX IF NOT EXISTS transactions_user_time ON transactions (user_id, timestamp, id);
+CREATE INDEX IF NOT EXISTS transactions_status_time ON transactions (status, timestamp, id);
+CREATE INDEX IF NOT EXISTS transactions_time ON transactions (timestamp, id);
+CREATE INDEX IF NOT EXISTS transactions_user_id ON transactions (user_id, id);
+CREATE INDEX IF NOT EXISTS transactions_status_id ON transactions (status, id);
+"""
+
+COLUMNS = ("id", "user_id", "timestamp", "amount", "merchant", "device",
+           "risk_score", "status", "reasons", "model_version")
+
+
+def normalize_timestamp(timestamp):
+    """'YYYY-MM-DD HH:MM:SS' for an ISO timestamp, or None if it can't be parsed"""
+    try:
+        return datetime.fromisoformat(str(timestamp).replace('Z', '')).strftime('%Y-%m-%d %H:%M:%S')
+    except:
+        return None
+
+
+def _text(value):
+    """A client-sent field as a TEXT column value (None stays NULL)"""
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+def encode_cursor(timestamp, row_id):
+    return base64.urlsafe_b64encode(f"{timestamp}|{row_id}".encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """(timestamp, id) of a cursor from a previous page; raises ValueError"""
+    try:
+        timestamp, _, row_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").rpartition("|")
+        return timestamp, int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class TransactionStore:
+    """Scored transactions in SQLite, one connection per thread"""
+
+    def __init__(self, path, page_cache_size=PAGE_CACHE_SIZE):
+        self.path = path
+        self.pages = LRUCache(page_cache_size, ttl=float("inf"))
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._write_lock:
+            self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL commits without syncing; a crash can lose the last few, never corrupt the file
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def row(user_id, transaction, result):
+        """Table row for a user's transaction and its scoring result"""
+        timestamp = (normalize_timestamp(transaction.get('timestamp', '')) or
+                     normalize_timestamp(result.get('timestamp', '')) or
+                     datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        amount = transaction.get('amount', 0)
+        return (
+            str(user_id),
+            timestamp,
+            float(amount) if isinstance(amount, (int, float)) else None,
+            _text(transaction.get('merchant')),
+            _text(transaction.get('device')),
+            result['risk_score'],
+            result['status'],
+            json.dumps(result.get('reasons', [])),
+            result.get('model_version')
+        )
+
+    def insert_many(self, rows):
+        """Append rows (from row()) in one transaction; returns how many"""
+        conn = self._connection()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO transactions (user_id, timestamp, amount, merchant, device, "
+                    "risk_score, status, reasons, model_version) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return len(rows)
+
+    def add(self, user_id, transaction, result):
+        return self.insert_many([self.row(user_id, transaction, result)])
+
+    def iter_transactions(self, after_id=0, chunk_size=10000):
+        """
+        Rows with ids above after_id, oldest first, as lists of up to
+        chunk_size transaction dicts (NULL columns left out)
+        """
+        conn = self._connection()
+        while True:
+            rows = conn.execute(
+                "SELECT id, user_id, timestamp, amount, merchant, device, risk_score, status "
+                "FROM transactions WHERE id > ? ORDER BY id LIMIT ?", (after_id, chunk_size)).fetchall()
+            if not rows:
+                return
+            yield [{name: value for name, value in zip(COLUMNS, row) if value is not None} for row in rows]
+            after_id = rows[-1][0]
+
+    @staticmethod
+    def _filters(user_id, status, min_risk, max_risk):
+        """WHERE terms and parameters for a query's filters"""
+        where, params = [], []
+        if user_id is not None:
+            where.append("user_id = ?")
+            params.append(user_id)
+        if status is not None:
+            where.append("status = ?")
+            params.append(status)
+        if min_risk is not None:
+            where.append("risk_score >= ?")
+            params.append(min_risk)
+        if max_risk is not None:
+            where.append("risk_score <= ?")
+            params.append(max_risk)
+        return where, params
+
+    def latest_id(self, user_id=None, status=None, min_risk=None, max_risk=None):
+        """
+        Id of the newest row matching the filters (0 if none); changes
+        whenever a row they select is added
+        """
+        where, params = self._filters(user_id, status, min_risk, max_risk)
+        sql = "SELECT id FROM transactions"
+        if user_id is not None:
+            sql += " INDEXED BY transactions_user_id"
+        elif status is not None:
+            sql += " INDEXED BY transactions_status_id"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        row = self._connection().execute(sql + " ORDER BY id DESC LIMIT 1", params).fetchone()
+        return row[0] if row else 0
+
+    def count(self):
+        return self._connection().execute("SELECT count(*) FROM transactions").fetchone()[0]
+
+    @staticmethod
+    def query(user_id=None, status=None, min_risk=None, max_risk=None, cursor=None, limit=None):
+        """Validated, canonical page query from request parameters; raises ValueError"""
+        try:
+            limit = int(limit) if limit not in (None, '') else DEFAULT_LIMIT
+            min_risk = float(min_risk) if min_risk not in (None, '') else None
+            max_risk = float(max_risk) if max_risk not in (None, '') else None
+        except (TypeError, ValueError):
+            raise ValueError("limit, min_risk and max_risk must be numbers")
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+        if status:
+            status = status.upper()
+            if status not in STATUSES:
+                raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+        if cursor:
+            decode_cursor(cursor)
+        return (user_id or None, status or None, min_risk, max_risk, cursor or None, limit)
+
+    def etag(self, query):
+        latest_id = self.latest_id(*query[:4])
+        digest = hashlib.blake2b(repr((query, latest_id)).encode("utf-8"), digest_size=8).hexdigest()
+        return f'"{digest}"'
+
+    def page(self, query, if_none_match=None):
+        """
+        (etag, page) for a query from query(). page is None when
+        if_none_match (an If-None-Match header) still matches. Pages are
+        cached under their ETag, so an unchanged page is only read once.
+        """
+        etag = self.etag(query)
+        if if_none_match and (if_none_match.strip() == "*" or
+                              etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]):
+            return etag, None
+        page = self.pages.get(etag)
+        if page is MISSING:
+            page = self._read_page(*query)
+            self.pages.put(etag, page)
+        return etag, page
+
+    def _read_page(self, user_id, status, min_risk, max_risk, cursor, limit):
+        # Each index ends in (timestamp, id), so rows come back in page order without a sort
+        where, params = self._filters(user_id, status, min_risk, max_risk)
+        if cursor is not None:
+            where.append("(timestamp, id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+        sql = f"SELECT {', '.join(COLUMNS)} FROM transactions"
+        if user_id is not None:
+            # A user's rows are few; without statistics SQLite may prefer the status index
+            sql += " INDEXED BY transactions_user_time"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        rows = self._connection().execute(sql, params + [limit + 1]).fetchall()
+
+        transactions = [dict(zip(COLUMNS, row[:8]), reasons=json.loads(row[8] or "[]"), model_version=row[9])
+                        for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = transactions[-1]
+            next_cursor = encode_cursor(last["timestamp"], last["id"])
+        return {"transactions": transactions, "count": len(transactions), "next_cursor": next_cursor}
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# Load scored transactions (NDJSON/JSON with risk_score and status) from the command line
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python transaction_store.py <history.db> <scored.ndjson|.json>")
+        sys.exit(1)
+
+    store = TransactionStore(sys.argv[1])
+    total = 0
+    for chunk in chunked(iter_transactions(sys.argv[2]), 10000):
+        total += store.insert_many([store.row(tx.get('user_id', 'sarah123'), tx, tx) for tx in chunk])
+    print(f"✅ Loaded {total:,} transactions into {sys.argv[1]} ({store.count():,} total)")
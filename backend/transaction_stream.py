@@ -0,0 +1,160 @@
+"""
+Streaming Transaction Ingestion for FraudGuard Lite
+Reads NDJSON or JSON-array transaction exports from disk in fixed-size
+chunks and feeds them to FraudDetector with bounded memory.
+"""
+
+import json
+import random
+import sys
+from itertools import islice
+
+import numpy as np
+
+# Characters read from disk at a time when parsing JSON arrays
+READ_SIZE = 1 << 16
+
+# Transactions handed to FraudDetector.partial_fit at a time
+CHUNK_SIZE = 10000
+
+# Labelled transactions (at most) the fraud classifier is fit on
+CLASSIFIER_SAMPLE = 100000
+
+_WHITESPACE = " \t\r\n"
+
+
+def iter_ndjson(path):
+    """Yield one transaction per non-empty line of an NDJSON file"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_json_array(path, read_size=READ_SIZE):
+    """
+    Yield the elements of a top-level JSON array one at a time.
+    Only the element being decoded (plus one read buffer) is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def fill():
+            nonlocal buffer, pos, eof
+            data = f.read(read_size)
+            if not data:
+                eof = True
+            buffer = buffer[pos:] + data
+            pos = 0
+
+        def skip(chars):
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in chars:
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return
+                fill()
+
+        skip(_WHITESPACE)
+        if buffer[pos:pos + 1] != "[":
+            raise ValueError(f"{path} does not contain a JSON array")
+        pos += 1
+
+        while True:
+            skip(_WHITESPACE + ",")
+            if pos >= len(buffer):
+                raise ValueError(f"Unexpected end of JSON array in {path}")
+            if buffer[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+                # A value touching the end of the buffer may be cut short
+                if end == len(buffer) and not eof:
+                    raise json.JSONDecodeError("Truncated value", buffer, end)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            pos = end
+            yield item
+
+
+def iter_transactions(path):
+    """Yield transactions from an NDJSON file or a JSON array file"""
+    with open(path, encoding="utf-8") as f:
+        first = f.read(READ_SIZE).lstrip(_WHITESPACE)[:1]
+    if first == "[":
+        return iter_json_array(path)
+    return iter_ndjson(path)
+
+
+def chunked(iterable, size=CHUNK_SIZE):
+    """Group an iterable into lists of at most size items"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def train_from_file(detector, path, chunk_size=CHUNK_SIZE, decay=None,
+                    classifier_sample=CLASSIFIER_SAMPLE, seed=0, keep=None):
+    """
+    Train detector on a transaction export without loading it whole.
+    A second pass fits the fraud classifier on a uniform sample of up to
+    classifier_sample labelled transactions (all of them if there are
+    fewer, in which case it matches train()). With keep, only the
+    transactions it returns true for are used (e.g. one shard's users).
+    Returns the number of transactions trained on.
+    """
+    def read():
+        transactions = iter_transactions(path)
+        return transactions if keep is None else filter(keep, transactions)
+    
+    total = 0
+    for chunk in chunked(read(), chunk_size):
+        detector.partial_fit(chunk, decay)
+        total += len(chunk)
+    
+    # Reservoir sample of classifier inputs, measured against the final profiles
+    sample = None
+    labels = np.zeros(classifier_sample, dtype=bool)
+    seen = 0
+    rng = random.Random(seed)
+    for chunk in chunked(read(), chunk_size):
+        features, chunk_labels = detector.classifier_features(chunk)
+        if sample is None:
+            sample = np.empty((classifier_sample, features.shape[1]))
+        for row, label in zip(features, chunk_labels):
+            slot = seen if seen < classifier_sample else rng.randrange(seen + 1)
+            if slot < classifier_sample:
+                sample[slot] = row
+                labels[slot] = label
+            seen += 1
+    
+    kept = min(seen, classifier_sample)
+    if kept and len(np.unique(labels[:kept])) == 2:
+        detector.fit_classifier(sample[:kept], labels[:kept])
+    return total
+
+
+# Train on an export from the command line
+if __name__ == "__main__":
+    from ml_model import FraudDetector
+
+    if len(sys.argv) < 2:
+        print("Usage: python transaction_stream.py <transactions.ndjson|.json> [chunk_size]")
+        sys.exit(1)
+
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else CHUNK_SIZE
+    detector = FraudDetector()
+    print(f"🤖 Streaming transactions from {sys.argv[1]}...")
+    count = train_from_file(detector, sys.argv[1], chunk_size)
+    print(f"✅ Model trained on {count} transactions for {len(detector.user_profiles)} users")
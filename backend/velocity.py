@@ -0,0 +1,202 @@
+"""
+Velocity Features for FraudGuard Lite
+Per-user sliding-window counters: how many transactions a user made and
+how much they spent over the last minute, hour and day, plus how many
+distinct merchants and devices they used in the last day.
+
+Each window is a ring of time buckets with running totals, so recording
+a transaction and reading a window are O(1) amortized and every user
+costs a fixed amount of memory. Users idle for longer than the largest
+window are evicted, and the tracker never holds more than max_users.
+
+Live scoring records transactions at the server's clock: the timestamp
+in a request is the client's word, and trusting it would let a caller
+spread a spree over fake days, or move the clock years ahead and evict
+every user. Replays of recorded traffic and other offline runs pass
+use_timestamps=True to place transactions at their own timestamps.
+"""
+
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+
+# (name, length in seconds, buckets); counts are exact to one bucket width
+WINDOWS = (
+    ('1m', 60, 12),
+    ('1h', 3600, 60),
+    ('24h', 86400, 24),
+)
+
+# Window the distinct merchant/device counts cover
+DISTINCT_WINDOW = 86400
+
+# Merchants/devices remembered per user; the least recent is dropped beyond this
+MAX_DISTINCT = 32
+
+MAX_USERS = 1000000
+
+
+def parse_time(timestamp):
+    """Seconds since the epoch for an ISO timestamp, or None"""
+    try:
+        return datetime.fromisoformat(timestamp.replace('Z', '')).timestamp()
+    except:
+        return None
+
+
+def event_time(transaction, use_timestamps=False):
+    """When to record a transaction: now, or its own timestamp (if it has one) when use_timestamps"""
+    if use_timestamps:
+        stamped = parse_time(transaction.get('timestamp', '') or '')
+        if stamped is not None:
+            return stamped
+    return time.time()
+
+
+class UserVelocity:
+    """Bucket rings and recently seen merchants/devices for one user"""
+
+    __slots__ = ('last_seen', 'heads', 'counts', 'sums', 'totals', 'merchants', 'devices')
+
+    def __init__(self, windows=WINDOWS):
+        self.last_seen = 0.0
+        self.heads = [0] * len(windows)
+        self.counts = [array('I', bytes(4 * buckets)) for _, _, buckets in windows]
+        self.sums = [array('d', bytes(8 * buckets)) for _, _, buckets in windows]
+        self.totals = [[0, 0.0] for _ in windows]
+        self.merchants = {}
+        self.devices = {}
+
+    def _advance(self, w, epoch, buckets):
+        """Move window w's head to epoch, expiring the buckets it passes"""
+        head = self.heads[w]
+        if epoch <= head:
+            return
+        counts, sums, total = self.counts[w], self.sums[w], self.totals[w]
+        if epoch - head >= buckets:
+            for i in range(buckets):
+                counts[i] = 0
+                sums[i] = 0.0
+            total[0], total[1] = 0, 0.0
+        else:
+            for e in range(head + 1, epoch + 1):
+                i = e % buckets
+                total[0] -= counts[i]
+                total[1] -= sums[i]
+                counts[i] = 0
+                sums[i] = 0.0
+        self.heads[w] = epoch
+
+    def add(self, now, amount, windows=WINDOWS):
+        for w, (_, length, buckets) in enumerate(windows):
+            epoch = int(now // (length / buckets))
+            self._advance(w, epoch, buckets)
+            if epoch <= self.heads[w] - buckets:
+                continue  # Older than the whole window
+            i = epoch % buckets
+            self.counts[w][i] += 1
+            self.sums[w][i] += amount
+            self.totals[w][0] += 1
+            self.totals[w][1] += amount
+
+    def window(self, w, now, windows=WINDOWS):
+        """(count, amount) over window w as of now"""
+        _, length, buckets = windows[w]
+        self._advance(w, int(now // (length / buckets)), buckets)
+        count, total = self.totals[w]
+        # Running sums drift by float error; nothing left means exactly zero
+        return count, (round(total, 2) if count else 0.0)
+
+
+def _remember(seen, key, now):
+    seen.pop(key, None)
+    seen[key] = now
+    if len(seen) > MAX_DISTINCT:
+        # Dicts keep insertion order, so the first key is the least recently seen
+        del seen[next(iter(seen))]
+
+
+def _distinct(seen, now):
+    cutoff = now - DISTINCT_WINDOW
+    return sum(1 for t in seen.values() if t > cutoff)
+
+
+class VelocityTracker:
+    """
+    Sliding-window velocity features for every active user.
+    Safe to share between scoring threads.
+    """
+
+    def __init__(self, windows=WINDOWS, max_users=MAX_USERS, idle_seconds=None, use_timestamps=False):
+        self.windows = windows
+        self.max_users = max_users
+        self.use_timestamps = use_timestamps
+        self.idle_seconds = idle_seconds or max(length for _, length, _ in windows)
+        self.users = OrderedDict()    # Least recently active first
+        self.evicted = 0
+        self.clock = 0.0              # Latest transaction time seen
+        self._keys = [(f'count_{name}', f'amount_{name}') for name, _, _ in windows]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.users)
+
+    def observe(self, user_id, transaction):
+        """
+        Record a transaction and return the user's velocity features
+        including it, at the server clock (or, with use_timestamps, at the
+        transaction's timestamp when it has one)
+        """
+        now = event_time(transaction, self.use_timestamps)
+        amount = transaction.get('amount', 0)
+        with self._lock:
+            state = self.users.get(user_id)
+            if state is None:
+                state = self.users[user_id] = UserVelocity(self.windows)
+            else:
+                self.users.move_to_end(user_id)
+            state.last_seen = max(state.last_seen, now)
+            state.add(now, amount, self.windows)
+            _remember(state.merchants, transaction.get('merchant', 'unknown'), now)
+            _remember(state.devices, transaction.get('device', 'unknown'), now)
+
+            # add() just brought every window up to date, so the running totals are current
+            features = {}
+            for (count_key, amount_key), (count, total) in zip(self._keys, state.totals):
+                features[count_key] = count
+                features[amount_key] = round(total, 2) if count else 0.0
+            features['distinct_merchants'] = _distinct(state.merchants, now)
+            features['distinct_devices'] = _distinct(state.devices, now)
+
+            self.clock = max(self.clock, now)
+            self._evict()
+        return features
+
+    def features(self, user_id, now=None):
+        """Velocity features for a user without recording anything"""
+        now = self.clock if now is None else now
+        with self._lock:
+            state = self.users.get(user_id)
+            features = {}
+            for w, (count_key, amount_key) in enumerate(self._keys):
+                count, amount = state.window(w, now, self.windows) if state is not None else (0, 0.0)
+                features[count_key], features[amount_key] = count, amount
+            features['distinct_merchants'] = _distinct(state.merchants, now) if state is not None else 0
+            features['distinct_devices'] = _distinct(state.devices, now) if state is not None else 0
+        return features
+
+    def _evict(self):
+        """Drop users idle for idle_seconds, and the least recent beyond max_users"""
+        users = self.users
+        cutoff = self.clock - self.idle_seconds
+        while users:
+            user_id, state = next(iter(users.items()))
+            if state.last_seen > cutoff and len(users) <= self.max_users:
+                break
+            del users[user_id]
+            self.evicted += 1
+
+    def stats(self):
+        return {"tracked_users": len(self.users), "evicted_users": self.evicted}
@@ -13,10 +13,24 @@ function App() {
     // Fetch initial data
     fetchTransactions();
     
-    // Simulate real-time updates every 30 seconds
-    const interval = setInterval(fetchTransactions, 30000);
+    // New decisions are pushed by the backend; EventSource reconnects and resumes by itself
+    let interval = null;
+    const stream = new EventSource('http://localhost:5000/api/stream/decisions');
+    stream.addEventListener('decision', (event) => {
+      const decision = JSON.parse(event.data);
+      setTransactions((current) => [decision, ...current].slice(0, 50));
+    });
+    stream.onerror = () => {
+      // A closed stream was refused (the Flask server has no stream), so poll like before
+      if (stream.readyState === EventSource.CLOSED && interval === null) {
+        interval = setInterval(fetchTransactions, 30000);
+      }
+    };
     
-    return () => clearInterval(interval);
+    return () => {
+      stream.close();
+      clearInterval(interval);
+    };
   }, []);
 
   const fetchTransactions = async () => {